@@ -1,24 +1,70 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Header, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from fastapi.encoders import jsonable_encoder
+from fastapi.concurrency import run_in_threadpool
+from datetime import date
 from typing import List, Optional
+import os
 import uvicorn
 
 from app.models.schemas import (
     Policy, PolicyCreate, ImpactAnalysis, RiskPrediction, 
-    Recommendation, ExecutiveReport, DashboardMetrics
+    Recommendation, ExecutiveReport, DashboardMetrics, Job, JobCreate, ScenarioGrid, ScenarioSweep,
+    SimilarPolicy, SimilarPolicies, SimilarityQuery,
+    ObservationBatch, ObservationIngestResult, PolicyObservations
 )
 from app.services.data_service import DataService
+from app.services.policy_store import PolicyRecord
 from app.services.impact_analyzer import ImpactAnalyzer
 from app.services.risk_predictor import RiskPredictor
+from app.services.feature_store import RiskFeatureStore
 from app.services.recommendation_engine import RecommendationEngine
+from app.services.scenario_analyzer import ScenarioAnalyzer
+from app.services.similarity_index import SimilarityIndex
+from app.services.observation_store import ObservationStore
 from app.services.report_generator import ReportGenerator
+from app.services.job_service import JobService, JobResultStore
+from app.services.analytics_cache import AnalyticsCache
+from app.services.precompute_scheduler import PrecomputeScheduler
+from app.services.dashboard_broadcaster import DashboardBroadcaster
+from app.services.single_flight import SingleFlight
+from app.services.arrow_encoder import ARROW_STREAM, ArrowEncoder, accepts_arrow
+from app.services.snapshot_store import SnapshotStore, SnapshotSync
+from app.services.source_sync import SourceSync
+from app.services.metrics import metrics
+from app.middleware.timing import TimedRoute, TimingMiddleware
+from app.middleware.profiling import ProfilingMiddleware
+from app.middleware.admission import AdmissionMiddleware
+from app.services.admission import AdmissionController
+from app.services.profiler import RequestProfiler
 
 app = FastAPI(
     title="Policy Impact & Risk Analytics API",
     description="Platform for analyzing policy impact, predicting risks, and generating insights",
     version="1.0.0"
 )
+app.router.route_class = TimedRoute
+
+# Admission control (innermost, so rejections still get CORS headers and timing);
+# ADMISSION_MAX_CONCURRENCY=0 turns it off
+admission_controller = None
+if int(os.getenv("ADMISSION_MAX_CONCURRENCY", "32")) > 0:
+    admission_controller = AdmissionController(
+        max_concurrency=int(os.getenv("ADMISSION_MAX_CONCURRENCY", "32")),
+        client_rate=float(os.getenv("ADMISSION_CLIENT_RATE", "0")),
+        client_burst=float(os.getenv("ADMISSION_CLIENT_BURST", "100")),
+        client_header=os.getenv("ADMISSION_CLIENT_HEADER")
+    )
+    app.add_middleware(AdmissionMiddleware, controller=admission_controller)
+    metrics.callback(
+        "admission_queue_depth", "Requests waiting for a slot by cost class",
+        admission_controller.queue_depths, labelnames=["cost_class"]
+    )
+    metrics.callback(
+        "admission_in_flight", "Admitted requests in progress by cost class",
+        admission_controller.in_flight_by_class, labelnames=["cost_class"]
+    )
 
 # CORS middleware
 app.add_middleware(
@@ -29,25 +75,201 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# On-demand request profiling, triggered by the admin token header or a sampling rate
+request_profiler = RequestProfiler(
+    admin_token=os.getenv("PROFILE_ADMIN_TOKEN"),
+    sample_rate=float(os.getenv("PROFILE_SAMPLE_RATE", "0")),
+    max_profiles=int(os.getenv("PROFILE_MAX_PROFILES", "50"))
+)
+app.add_middleware(ProfilingMiddleware, profiler=request_profiler)
+
+# Request timing middleware (outermost, so it covers the whole request)
+app.add_middleware(TimingMiddleware)
+
 # Initialize services
 data_service = DataService()
 impact_analyzer = ImpactAnalyzer()
-risk_predictor = RiskPredictor()
+# With SNAPSHOT_DIR set, workers serve one shared memory-mapped snapshot instead of private copies
+snapshot_store = SnapshotStore(os.getenv("SNAPSHOT_DIR")) if os.getenv("SNAPSHOT_DIR") else None
+shared_snapshot = snapshot_store.load() if snapshot_store else None
+risk_predictor = RiskPredictor(model_path=os.getenv("RISK_MODEL_PATH"), load_model=shared_snapshot is None)
+if shared_snapshot:
+    risk_predictor.use_model(shared_snapshot.attribution, shared_snapshot.scaler, shared_snapshot.manifest["model_metadata"])
 recommendation_engine = RecommendationEngine()
 report_generator = ReportGenerator()
+scenario_analyzer = ScenarioAnalyzer(
+    impact_analyzer, risk_predictor, max_scenarios=int(os.getenv("SCENARIO_MAX_SCENARIOS", "100000"))
+)
+# Subscribes before the precompute scheduler so features are current when it recomputes
+risk_predictor.feature_store = RiskFeatureStore(data_service, risk_predictor.scaler)
+snapshot_sync = SnapshotSync(
+    snapshot_store, data_service, risk_predictor,
+    poll_interval=float(os.getenv("SNAPSHOT_POLL_SECONDS", "1.0")),
+    batch_window=float(os.getenv("SNAPSHOT_WRITE_BATCH_MS", "0")) / 1000
+) if snapshot_store else None
+if snapshot_sync:
+    snapshot_sync.start()
+similarity_index = SimilarityIndex(
+    data_service, risk_predictor.feature_store,
+    max_delta=int(os.getenv("SIMILARITY_MAX_DELTA", "2048"))
+)
+observation_store = ObservationStore(
+    data_service,
+    ewma_alpha=float(os.getenv("OBSERVATION_EWMA_ALPHA", "0.1")),
+    z_threshold=float(os.getenv("OBSERVATION_Z_THRESHOLD", "4.0")),
+    target_tolerance=float(os.getenv("OBSERVATION_TARGET_TOLERANCE", "0.25"))
+)
+# With SOURCE_DATA_DIR set, /api/data/refresh syncs policies from the CSV/XLSX extracts dropped there
+source_sync = SourceSync(
+    data_service, os.getenv("SOURCE_DATA_DIR"), chunk_size=int(os.getenv("SOURCE_SYNC_CHUNK_ROWS", "100000"))
+) if os.getenv("SOURCE_DATA_DIR") else None
+analytics_cache = AnalyticsCache(max_entries=int(os.getenv("ANALYTICS_CACHE_MAX_ENTRIES", "10000")))
+precompute_scheduler = PrecomputeScheduler(
+    data_service, impact_analyzer, risk_predictor, recommendation_engine, report_generator, analytics_cache,
+    max_policies_per_second=float(os.getenv("PRECOMPUTE_MAX_POLICIES_PER_SECOND", "200"))
+)
+
+dashboard_broadcaster = DashboardBroadcaster(
+    data_service,
+    tick_interval=float(os.getenv("DASHBOARD_TICK_SECONDS", "1.0")),
+    max_subscribers=int(os.getenv("DASHBOARD_MAX_SUBSCRIBERS", "10000"))
+)
+
+metrics.callback(
+    "precompute_pending_policies", "Changed policies waiting to be recomputed",
+    lambda: precompute_scheduler.status()["pending_policies"]
+)
+metrics.callback(
+    "precompute_freshness_lag_seconds", "Age of the oldest change not yet reflected in warmed results",
+    lambda: precompute_scheduler.status()["current_freshness_lag_seconds"]
+)
+metrics.callback("analytics_cache_entries", "Entries in the analytics cache", lambda: analytics_cache.stats()["entries"])
+
+# Identical concurrent analytics requests share one computation
+single_flight = SingleFlight()
+metrics.callback("single_flight_in_flight", "Analytics computations currently running", single_flight.in_flight)
+metrics.callback(
+    "single_flight_coalescing_ratio", "Share of analytics calls served by another call's computation",
+    single_flight.coalescing_ratio
+)
+
+def _cached(kind: str, policy: PolicyRecord, compute):
+    """Return a warmed result for the policy's current version, computing it on a miss"""
+    version = data_service.get_policy_version(policy.id)
+    result = analytics_cache.get(kind, policy.id, version)
+    if result is None:
+        result = compute(policy)
+        analytics_cache.put(kind, policy.id, version, result)
+    return result
+
+def _compute_and_store(kind: str, policy: PolicyRecord, version: int, compute):
+    result = compute(policy)
+    analytics_cache.put(kind, policy.id, version, result)
+    return result
+
+async def _analytics(kind: str, policy: PolicyRecord, compute):
+    """Like _cached, but misses compute in the threadpool and identical concurrent misses share one computation"""
+    version = data_service.get_policy_version(policy.id)
+    result = analytics_cache.get(kind, policy.id, version)
+    if result is None:
+        # Already counted as a miss here, so the shared computation stores without looking again
+        result = await single_flight.do(kind, (policy.id, version), _compute_and_store, kind, policy, version, compute)
+    return result
+
+def _build_report(policy: PolicyRecord) -> ExecutiveReport:
+    impact = _cached("impact", policy, impact_analyzer.analyze)
+    risk = _cached("risk", policy, risk_predictor.predict)
+    recommendations = _cached("recommendations", policy, recommendation_engine.generate)
+    return report_generator.generate(policy, impact, risk, recommendations)
+
+def _regional_comparison(policy: PolicyRecord) -> dict:
+    return data_service.get_regional_comparison(policy.id)
+
+def _regional_recommendations(policy: PolicyRecord):
+    regional_impact = _cached("regional_impact", policy, impact_analyzer.get_regional_impact)
+    return recommendation_engine.generate_regional_recommendations(policy, regional_impact)
+
+def _failure_probability(policy: PolicyRecord) -> dict:
+    failure_prob = risk_predictor.predict_failure_probability(policy)
+    return {
+        "policy_id": policy.id,
+        "failure_probability": failure_prob,
+        "success_probability": round(100 - failure_prob, 2),
+        "risk_assessment": "High Risk" if failure_prob > 60 else "Medium Risk" if failure_prob > 30 else "Low Risk"
+    }
+
+def _report_chunk(policy_ids: List[int]) -> List[dict]:
+    """Generate executive reports for a chunk of policies"""
+    results = []
+    for policy_id in policy_ids:
+        policy = data_service.get_policy(policy_id)
+        if not policy:
+            continue
+        results.append(jsonable_encoder(_cached("report", policy, _build_report)))
+    return results
+
+def _impact_chunk(policy_ids: List[int]) -> List[dict]:
+    """Run impact analysis for a chunk of policies"""
+    policies = [p for p in (data_service.get_policy(policy_id) for policy_id in policy_ids) if p]
+    return [jsonable_encoder(a) for a in impact_analyzer.analyze_batch(policies)]
+
+def _risk_chunk(policy_ids: List[int]) -> List[dict]:
+    """Run risk prediction for a chunk of policies"""
+    policies = [p for p in (data_service.get_policy(policy_id) for policy_id in policy_ids) if p]
+    return [jsonable_encoder(r) for r in risk_predictor.predict_batch(policies)]
+
+# Arrow IPC responses for clients sending Accept: application/vnd.apache.arrow.stream
+arrow_encoder = ArrowEncoder(batch_rows=int(os.getenv("ARROW_BATCH_ROWS", "65536")))
+
+def _arrow(chunks) -> StreamingResponse:
+    return StreamingResponse(chunks, media_type=ARROW_STREAM, headers={"Vary": "Accept"})
+
+def _arrow_table(result: dict, table_field: str) -> StreamingResponse:
+    """Stream one field's region/row dicts as the table, with the remaining fields as metadata"""
+    rows = result[table_field]
+    metadata = {key: value for key, value in result.items() if key != table_field}
+    return _arrow(arrow_encoder.records(list(rows.values()) if isinstance(rows, dict) else rows, metadata))
+
+job_service = JobService(
+    handlers={"report": _report_chunk, "impact": _impact_chunk, "risk": _risk_chunk},
+    policy_ids_provider=data_service.get_policy_ids,
+    store=JobResultStore(os.getenv("JOB_STORE_DIR"), max_entries=int(os.getenv("JOB_STORE_MAX_ENTRIES", "200"))),
+    max_workers=int(os.getenv("JOB_WORKERS", "2"))
+)
+
+@app.on_event("startup")
+async def startup():
+    precompute_scheduler.start()
+    dashboard_broadcaster.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    if snapshot_sync:
+        snapshot_sync.stop()
+    job_service.shutdown()
+    precompute_scheduler.stop()
+    await dashboard_broadcaster.stop()
 
 @app.get("/")
 async def root():
     return {"message": "Policy Impact & Risk Analytics Platform API"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus metrics"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/api/health")
 async def health_check():
     return {"status": "healthy"}
 
 @app.get("/api/policies", response_model=List[Policy])
-async def get_policies():
+async def get_policies(accept: Optional[str] = Header(None)):
     """Get all policies"""
-    return data_service.get_all_policies()
+    if accepts_arrow(accept):
+        table = data_service.table
+        return _arrow(arrow_encoder.policies(table, table.alive_rows()))
+    return [p.to_policy() for p in data_service.get_all_policies()]
 
 @app.get("/api/policies/{policy_id}", response_model=Policy)
 async def get_policy(policy_id: int):
@@ -55,21 +277,33 @@ async def get_policy(policy_id: int):
     policy = data_service.get_policy(policy_id)
     if not policy:
         raise HTTPException(status_code=404, detail="Policy not found")
-    return policy
+    return policy.to_policy()
 
 @app.post("/api/policies", response_model=Policy)
 async def create_policy(policy: PolicyCreate):
     """Create a new policy"""
-    return data_service.create_policy(policy)
+    if snapshot_sync:
+        record = await run_in_threadpool(snapshot_sync.write, lambda: data_service.create_policy(policy))
+        return record.to_policy()
+    return data_service.create_policy(policy).to_policy()
 
 @app.get("/api/policies/{policy_id}/impact", response_model=ImpactAnalysis)
-async def get_impact_analysis(policy_id: int):
-    """Get impact analysis for a policy"""
+async def get_impact_analysis(policy_id: int, accept: Optional[str] = Header(None)):
+    """Get impact analysis for a policy (as Arrow: one row per trend period)"""
     policy = data_service.get_policy(policy_id)
     if not policy:
         raise HTTPException(status_code=404, detail="Policy not found")
     
-    analysis = impact_analyzer.analyze(policy)
+    analysis = await _analytics("impact", policy, impact_analyzer.analyze)
+    if accepts_arrow(accept):
+        result = analysis.model_dump()
+        trend = result["trend_data"]
+        periods = max((len(values) for values in trend.values()), default=0)
+        result["trend_data"] = [
+            {"period": i, **{metric: values[i] for metric, values in trend.items() if i < len(values)}}
+            for i in range(periods)
+        ]
+        return _arrow_table(result, "trend_data")
     return analysis
 
 @app.post("/api/policies/{policy_id}/predict-risk", response_model=RiskPrediction)
@@ -79,9 +313,75 @@ async def predict_risk(policy_id: int):
     if not policy:
         raise HTTPException(status_code=404, detail="Policy not found")
     
-    prediction = risk_predictor.predict(policy)
+    prediction = await _analytics("risk", policy, risk_predictor.predict)
     return prediction
 
+@app.post("/api/policies/{policy_id}/scenarios", response_model=ScenarioSweep)
+async def sweep_scenarios(policy_id: int, grid: ScenarioGrid):
+    """Score every combination of budget, end-date and metric-target changes for a policy"""
+    policy = data_service.get_policy(policy_id)
+    if not policy:
+        raise HTTPException(status_code=404, detail="Policy not found")
+    if scenario_analyzer.count(grid) > scenario_analyzer.max_scenarios:
+        raise HTTPException(status_code=400, detail=f"At most {scenario_analyzer.max_scenarios} scenarios per sweep")
+    
+    try:
+        return await run_in_threadpool(scenario_analyzer.sweep, policy, grid)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _similar(policy_ids: List[int], k: int) -> List[Optional[List[SimilarPolicy]]]:
+    results = []
+    for neighbours in similarity_index.similar(policy_ids, k):
+        if neighbours is None:
+            results.append(None)
+            continue
+        records = [(data_service.get_policy(policy_id), distance) for policy_id, distance in neighbours]
+        results.append([
+            SimilarPolicy.model_construct(policy=record.to_policy(), distance=round(distance, 4))
+            for record, distance in records if record is not None
+        ])
+    return results
+
+@app.get("/api/policies/{policy_id}/similar", response_model=List[SimilarPolicy])
+async def get_similar_policies(policy_id: int, k: int = Query(10, ge=1, le=100)):
+    """Get the k policies closest to a policy by risk features and category"""
+    similar = _similar([policy_id], k)[0]
+    if similar is None:
+        raise HTTPException(status_code=404, detail="Policy not found")
+    return similar
+
+@app.post("/api/policies/similar", response_model=List[SimilarPolicies])
+async def find_similar_policies(query: SimilarityQuery):
+    """Get the nearest peers of many policies in one batched query; unknown ids are skipped"""
+    results = _similar(query.policy_ids, query.k)
+    return [
+        SimilarPolicies(policy_id=policy_id, similar=similar)
+        for policy_id, similar in zip(query.policy_ids, results) if similar is not None
+    ]
+
+@app.post("/api/observations", response_model=ObservationIngestResult)
+async def ingest_observations(batch: ObservationBatch):
+    """Ingest a columnar batch of observed metric values and report anomalies"""
+    n = len(batch.values)
+    if any(len(column) != n for column in (batch.policy_ids, batch.regions, batch.metrics, batch.timestamps)):
+        raise HTTPException(status_code=400, detail="All observation columns must have the same length")
+    try:
+        return observation_store.ingest(batch.policy_ids, batch.regions, batch.metrics, batch.timestamps, batch.values)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/policies/{policy_id}/observations", response_model=PolicyObservations)
+async def get_policy_observations(policy_id: int, limit: int = Query(100, ge=1, le=10000)):
+    """Get online statistics of a policy's observed metrics and its recent anomalies"""
+    if not data_service.get_policy(policy_id):
+        raise HTTPException(status_code=404, detail="Policy not found")
+    return {
+        "policy_id": policy_id,
+        "series": observation_store.series(policy_id),
+        "recent_anomalies": observation_store.anomalies_for(policy_id, limit)
+    }
+
 @app.get("/api/policies/{policy_id}/recommendations", response_model=List[Recommendation])
 async def get_recommendations(policy_id: int):
     """Get recommendations for a policy"""
@@ -89,7 +389,7 @@ async def get_recommendations(policy_id: int):
     if not policy:
         raise HTTPException(status_code=404, detail="Policy not found")
     
-    recommendations = recommendation_engine.generate(policy)
+    recommendations = await _analytics("recommendations", policy, recommendation_engine.generate)
     return recommendations
 
 @app.get("/api/policies/{policy_id}/report", response_model=ExecutiveReport)
@@ -99,39 +399,44 @@ async def get_executive_report(policy_id: int):
     if not policy:
         raise HTTPException(status_code=404, detail="Policy not found")
     
-    impact = impact_analyzer.analyze(policy)
-    risk = risk_predictor.predict(policy)
-    recommendations = recommendation_engine.generate(policy)
-    
-    report = report_generator.generate(policy, impact, risk, recommendations)
+    report = await _analytics("report", policy, _build_report)
     return report
 
 @app.get("/api/policies/{policy_id}/regional-impact")
-async def get_regional_impact(policy_id: int):
+async def get_regional_impact(policy_id: int, accept: Optional[str] = Header(None)):
     """Get regional impact breakdown for a policy"""
     policy = data_service.get_policy(policy_id)
     if not policy:
         raise HTTPException(status_code=404, detail="Policy not found")
     
-    return impact_analyzer.get_regional_impact(policy)
+    regional_impact = await _analytics("regional_impact", policy, impact_analyzer.get_regional_impact)
+    if accepts_arrow(accept):
+        return _arrow(arrow_encoder.records(list(regional_impact.values())))
+    return regional_impact
 
 @app.get("/api/policies/{policy_id}/regional-risks")
-async def get_regional_risks(policy_id: int):
+async def get_regional_risks(policy_id: int, accept: Optional[str] = Header(None)):
     """Get regional risk analysis for a policy"""
     policy = data_service.get_policy(policy_id)
     if not policy:
         raise HTTPException(status_code=404, detail="Policy not found")
     
-    return risk_predictor.get_regional_risks(policy)
+    regional_risks = await _analytics("regional_risks", policy, risk_predictor.get_regional_risks)
+    if accepts_arrow(accept):
+        return _arrow(arrow_encoder.records(list(regional_risks.values())))
+    return regional_risks
 
 @app.get("/api/policies/{policy_id}/regional-comparison")
-async def get_regional_comparison(policy_id: int):
-    """Get comparative analysis across regions"""
+async def get_regional_comparison(policy_id: int, accept: Optional[str] = Header(None)):
+    """Get comparative analysis across regions (as Arrow: one row per region)"""
     policy = data_service.get_policy(policy_id)
     if not policy:
         raise HTTPException(status_code=404, detail="Policy not found")
     
-    return data_service.get_regional_comparison(policy_id)
+    comparison = await _analytics("regional_comparison", policy, _regional_comparison)
+    if accepts_arrow(accept):
+        return _arrow_table(comparison, "regional_breakdown")
+    return comparison
 
 @app.get("/api/policies/{policy_id}/regional-recommendations")
 async def get_regional_recommendations(policy_id: int):
@@ -140,8 +445,7 @@ async def get_regional_recommendations(policy_id: int):
     if not policy:
         raise HTTPException(status_code=404, detail="Policy not found")
     
-    regional_impact = impact_analyzer.get_regional_impact(policy)
-    return recommendation_engine.generate_regional_recommendations(policy, regional_impact)
+    return await _analytics("regional_recommendations", policy, _regional_recommendations)
 
 @app.get("/api/policies/{policy_id}/failure-probability")
 async def get_failure_probability(policy_id: int):
@@ -150,13 +454,7 @@ async def get_failure_probability(policy_id: int):
     if not policy:
         raise HTTPException(status_code=404, detail="Policy not found")
     
-    failure_prob = risk_predictor.predict_failure_probability(policy)
-    return {
-        "policy_id": policy_id,
-        "failure_probability": failure_prob,
-        "success_probability": round(100 - failure_prob, 2),
-        "risk_assessment": "High Risk" if failure_prob > 60 else "Medium Risk" if failure_prob > 30 else "Low Risk"
-    }
+    return await _analytics("failure_probability", policy, _failure_probability)
 
 @app.post("/api/policies/filter")
 async def filter_policies(
@@ -164,44 +462,72 @@ async def filter_policies(
     status: Optional[str] = None,
     min_budget: Optional[float] = None,
     max_budget: Optional[float] = None,
-    search_term: Optional[str] = None
+    search_term: Optional[str] = None,
+    active_on: Optional[date] = None,
+    ending_within_days: Optional[int] = Query(None, ge=0),
+    accept: Optional[str] = Header(None)
 ):
-    """Filter policies with advanced criteria"""
-    return data_service.filter_policies(category, status, min_budget, max_budget, search_term)
+    """Filter policies with advanced criteria (active_on: running that day; ending_within_days: ending from now until then)"""
+    criteria = (category, status, min_budget, max_budget, search_term, active_on, ending_within_days)
+    if accepts_arrow(accept):
+        table, rows = data_service.filter_rows(*criteria)
+        return _arrow(arrow_encoder.policies(table, rows))
+    policies = data_service.filter_policies(*criteria)
+    return [p.to_policy() for p in policies]
 
 @app.get("/api/policies/by-category/{category}", response_model=List[Policy])
-async def get_policies_by_category(category: str):
+async def get_policies_by_category(category: str, accept: Optional[str] = Header(None)):
     """Get all policies in a specific category"""
-    return data_service.get_policies_by_category(category)
+    if accepts_arrow(accept):
+        return _arrow(arrow_encoder.policies(*data_service.filter_rows(category=category)))
+    return [p.to_policy() for p in data_service.get_policies_by_category(category)]
 
 @app.get("/api/policies/by-status/{status}", response_model=List[Policy])
-async def get_policies_by_status(status: str):
+async def get_policies_by_status(status: str, accept: Optional[str] = Header(None)):
     """Get all policies with a specific status"""
-    return data_service.get_policies_by_status(status)
+    if accepts_arrow(accept):
+        return _arrow(arrow_encoder.policies(*data_service.filter_rows(status=status)))
+    return [p.to_policy() for p in data_service.get_policies_by_status(status)]
 
 @app.get("/api/dashboard/metrics", response_model=DashboardMetrics)
-async def get_dashboard_metrics():
-    """Get dashboard metrics"""
-    policies = data_service.get_all_policies()
-    return data_service.get_dashboard_metrics(policies)
+async def get_dashboard_metrics(accept: Optional[str] = Header(None)):
+    """Get dashboard metrics (as Arrow: one row per status and category count)"""
+    dashboard = data_service.get_dashboard_metrics()
+    if accepts_arrow(accept):
+        result = dashboard.model_dump()
+        result["breakdown"] = [
+            {"group": group, "name": name, "policies": count}
+            for group in ("status", "category")
+            for name, count in result.pop(f"policies_by_{group}").items()
+        ]
+        return _arrow_table(result, "breakdown")
+    return dashboard
+
+@app.get("/api/dashboard/stream")
+async def stream_dashboard(last_event_id: Optional[str] = Header(None)):
+    """Server-sent events: a snapshot of metrics and policies, then incremental updates"""
+    subscription = dashboard_broadcaster.subscribe()
+    if subscription is None:
+        raise HTTPException(status_code=503, detail="Too many dashboard subscribers")
+    return StreamingResponse(
+        dashboard_broadcaster.stream(subscription, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @app.get("/api/dashboard/executive-overview")
 async def get_executive_overview():
     """Get executive-level overview of all policies"""
-    policies = data_service.get_all_policies()
-    
     # Calculate aggregate metrics
-    total_budget = sum(p.budget for p in policies)
-    active_count = len([p for p in policies if p.status.value == "active"])
-    draft_count = len([p for p in policies if p.status.value == "draft"])
-    completed_count = len([p for p in policies if p.status.value == "completed"])
+    total_budget = data_service.get_total_budget()
+    status_counts = data_service.get_status_counts()
     
     # Calculate average metrics across all policies
     avg_impact_scores = []
     avg_rois = []
     avg_risk_scores = []
     
-    for policy in policies[:5]:  # Sample first 5 for performance
+    for policy in data_service.head(5):  # Sample first 5 for performance
         impact = impact_analyzer.analyze(policy)
         risk = risk_predictor.predict(policy)
         avg_impact_scores.append(impact.overall_impact_score)
@@ -209,22 +535,71 @@ async def get_executive_overview():
         avg_risk_scores.append(risk.risk_score)
     
     return {
-        "total_policies": len(policies),
+        "total_policies": data_service.count(),
         "total_budget": round(total_budget, 2),
-        "active_policies": active_count,
-        "draft_policies": draft_count,
-        "completed_policies": completed_count,
+        "active_policies": status_counts["active"],
+        "draft_policies": status_counts["draft"],
+        "completed_policies": status_counts["completed"],
         "average_impact_score": round(sum(avg_impact_scores) / len(avg_impact_scores), 2) if avg_impact_scores else 0,
         "average_roi": round(sum(avg_rois) / len(avg_rois), 2) if avg_rois else 0,
         "average_risk_score": round(sum(avg_risk_scores) / len(avg_risk_scores), 2) if avg_risk_scores else 0,
         "policies_by_category": {}  # Will be populated by get_dashboard_metrics
     }
 
+@app.post("/api/jobs", response_model=Job, status_code=202)
+async def create_job(job_create: JobCreate):
+    """Queue a long-running report or analysis job"""
+    return job_service.submit(job_create)
+
+@app.get("/api/jobs/{job_id}", response_model=Job)
+async def get_job(job_id: str):
+    """Get job status, progress and result"""
+    job = job_service.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/api/precompute/status")
+async def get_precompute_status():
+    """Get precompute queue depth, freshness lag and cache statistics"""
+    return precompute_scheduler.status()
+
+def _require_admin(token: Optional[str]):
+    if not request_profiler.is_admin(token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+@app.get("/api/admin/profiles")
+async def list_profiles(x_admin_token: Optional[str] = Header(None)):
+    """List captured request profiles, newest first"""
+    _require_admin(x_admin_token)
+    return request_profiler.list()
+
+@app.get("/api/admin/profiles/{profile_id}")
+async def get_profile(profile_id: str, format: str = "speedscope", x_admin_token: Optional[str] = Header(None)):
+    """Get a captured profile as speedscope JSON or collapsed stacks (format=collapsed)"""
+    _require_admin(x_admin_token)
+    profile = request_profiler.get(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "collapsed":
+        return PlainTextResponse(profile.to_collapsed())
+    if format != "speedscope":
+        raise HTTPException(status_code=400, detail="format must be 'speedscope' or 'collapsed'")
+    return profile.to_speedscope()
+
 @app.get("/api/data/refresh")
 async def refresh_data():
-    """Refresh data from sources"""
-    data_service.refresh_data()
-    return {"message": "Data refreshed successfully"}
+    """Refresh data from sources: apply the differences between the source extracts and the portfolio"""
+    if source_sync is None:
+        return {"message": "No data source configured"}
+    try:
+        if snapshot_sync:
+            summary = await run_in_threadpool(snapshot_sync.write, source_sync.sync)
+        else:
+            summary = await run_in_threadpool(source_sync.sync)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"message": "Data refreshed successfully", **summary}
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
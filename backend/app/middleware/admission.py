@@ -0,0 +1,41 @@
+from time import perf_counter
+
+from starlette.responses import JSONResponse
+
+from app.middleware.timing import record_stage
+from app.services.admission import AdmissionController
+
+
+class AdmissionMiddleware:
+    """ASGI middleware admitting, queueing or rejecting requests through an AdmissionController"""
+
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        cost_class = self.controller.classify(scope["method"], scope["path"])
+        if cost_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        queued_at = perf_counter()
+        rejection = await self.controller.acquire(cost_class, self.controller.client_key(scope))
+        record_stage("queue", perf_counter() - queued_at)
+        if rejection is not None:
+            response = JSONResponse(
+                {"detail": rejection.detail}, status_code=rejection.status,
+                headers={"Retry-After": str(rejection.retry_after)}
+            )
+            await response(scope, receive, send)
+            return
+
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(cost_class, perf_counter() - start)
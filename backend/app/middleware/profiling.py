@@ -0,0 +1,46 @@
+import sys
+
+from app.services.profiler import RequestProfiler
+
+PROFILE_HEADER = b"x-profile-token"
+
+
+class ProfilingMiddleware:
+    """ASGI middleware capturing a stack-sampled profile for opted-in requests"""
+
+    def __init__(self, app, profiler: RequestProfiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = None
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                token = value.decode("latin-1")
+                break
+        if not self.profiler.should_profile(token):
+            await self.app(scope, receive, send)
+            return
+
+        session = self.profiler.begin(scope["method"], scope["path"], sys._getframe())
+        if session is None:
+            await self.app(scope, receive, send)
+            return
+        profile, sampler = session
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile.id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            profile.route = route.path if route is not None else None
+            self.profiler.end(profile, sampler)
@@ -0,0 +1,105 @@
+import asyncio
+import functools
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Callable, Dict, Optional
+
+from fastapi.routing import APIRoute
+
+from app.services.metrics import metrics
+
+REQUESTS = metrics.counter("http_requests_total", "HTTP requests by route and status", ["method", "route", "status"])
+REQUEST_SECONDS = metrics.histogram("http_request_duration_seconds", "HTTP request latency by route", ["method", "route"])
+IN_FLIGHT = metrics.gauge("http_requests_in_flight", "HTTP requests currently being processed")
+REQUEST_STAGE_SECONDS = metrics.histogram(
+    "http_request_stage_duration_seconds",
+    "Per-route split of request time: endpoint handler, FastAPI validation/serialization, "
+    "admission queue wait, and the rest (other middleware, sending the response)",
+    ["route", "stage"]
+)
+
+# Holder for the current request's stage times, shared between the middleware, TimedRoute and admission
+_stage_seconds: ContextVar[Optional[Dict[str, float]]] = ContextVar("stage_seconds", default=None)
+
+
+def record_stage(stage: str, seconds: float):
+    """Add time spent in a stage to the current request's split, if it is being timed"""
+    holder = _stage_seconds.get()
+    if holder is not None:
+        holder[stage] = holder.get(stage, 0.0) + seconds
+
+
+def _time_endpoint(endpoint: Callable) -> Callable:
+    if not asyncio.iscoroutinefunction(endpoint):
+        return endpoint
+
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        start = perf_counter()
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            record_stage("handler", perf_counter() - start)
+    return wrapper
+
+
+class TimedRoute(APIRoute):
+    """APIRoute that records how long the endpoint function itself takes, and the route as a whole
+    (request parsing and validation, the endpoint, and serializing its response)"""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, _time_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        route_handler = super().get_route_handler()
+
+        async def timed_route_handler(request):
+            start = perf_counter()
+            try:
+                return await route_handler(request)
+            finally:
+                record_stage("route", perf_counter() - start)
+        return timed_route_handler
+
+
+class TimingMiddleware:
+    """ASGI middleware exporting per-route latency, status counts and in-flight requests"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        holder: Dict[str, float] = {}
+        token = _stage_seconds.set(holder)
+        IN_FLIGHT.inc()
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = perf_counter() - start
+            IN_FLIGHT.dec()
+            _stage_seconds.reset(token)
+
+            route = scope.get("route")
+            path = route.path if route is not None else "unmatched"
+            REQUEST_SECONDS.labels(scope["method"], path).observe(elapsed)
+            REQUESTS.labels(scope["method"], path, str(status)).inc()
+            if "handler" in holder and "route" in holder:
+                queued = holder.get("queue", 0.0)
+                REQUEST_STAGE_SECONDS.labels(path, "handler").observe(holder["handler"])
+                REQUEST_STAGE_SECONDS.labels(path, "serialization").observe(max(0.0, holder["route"] - holder["handler"]))
+                if "queue" in holder:
+                    REQUEST_STAGE_SECONDS.labels(path, "queue").observe(queued)
+                REQUEST_STAGE_SECONDS.labels(path, "other").observe(max(0.0, elapsed - holder["route"] - queued))
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import Annotated, List, Optional, Dict, Any
 from datetime import datetime
 from enum import Enum
 
@@ -66,6 +66,84 @@ class RiskPrediction(BaseModel):
     confidence: float = Field(..., ge=0, le=1)
     predicted_at: datetime
 
+class ScenarioGrid(BaseModel):
+    # Every combination of these perturbations is scored (1.0 / 0 = unchanged)
+    budget_multipliers: List[Annotated[float, Field(ge=0)]] = Field([1.0], min_length=1)
+    end_date_shift_days: List[Annotated[int, Field(ge=-36500, le=36500)]] = Field([0], min_length=1)  # +/- 100 years
+    metric_target_multipliers: List[Annotated[float, Field(ge=0)]] = Field([1.0], min_length=1)
+
+class ScenarioResult(BaseModel):
+    budget_multiplier: float
+    end_date_shift_days: int
+    metric_target_multiplier: float
+    budget: float
+    end_date: Optional[datetime] = None
+    days_remaining: Optional[int] = None
+    overall_impact_score: float = Field(..., ge=0, le=100)
+    roi: float
+    risk_level: RiskLevel
+    risk_score: float = Field(..., ge=0, le=100)
+    failure_probability: float = Field(..., ge=0, le=100)
+
+class ScenarioSweep(BaseModel):
+    policy_id: int
+    scenario_count: int
+    scenarios: List[ScenarioResult]
+    generated_at: datetime
+
+class SimilarPolicy(BaseModel):
+    policy: Policy
+    distance: float
+
+class SimilarPolicies(BaseModel):
+    policy_id: int
+    similar: List[SimilarPolicy]
+
+class SimilarityQuery(BaseModel):
+    policy_ids: List[int] = Field(..., min_length=1, max_length=1000)
+    k: int = Field(10, ge=1, le=100)
+
+class ObservationBatch(BaseModel):
+    # Columnar: the i-th entry of every list together is one observation
+    policy_ids: List[int]
+    regions: List[str]
+    metrics: List[str]
+    timestamps: List[float]  # epoch seconds
+    values: List[float]
+
+class ObservationAnomaly(BaseModel):
+    kind: str  # "outlier" or "off_target"
+    policy_id: int
+    region: str
+    metric: str
+    timestamp: float
+    value: float
+    expected: float
+    score: float
+
+class ObservationIngestResult(BaseModel):
+    accepted: int
+    rejected: int
+    series: int
+    anomaly_count: int
+    anomalies: List[ObservationAnomaly]
+
+class ObservationSeries(BaseModel):
+    region: str
+    metric: str
+    count: int
+    mean: float
+    std: float
+    ewma: float
+    target: Optional[float] = None
+    off_target: bool
+    last_timestamp: float
+
+class PolicyObservations(BaseModel):
+    policy_id: int
+    series: List[ObservationSeries]
+    recent_anomalies: List[ObservationAnomaly]
+
 class Recommendation(BaseModel):
     title: str
     description: str
@@ -93,3 +171,32 @@ class DashboardMetrics(BaseModel):
     policies_by_status: Dict[str, int]
     policies_by_category: Dict[str, int]
     recent_activities: List[Dict[str, Any]]
+
+class JobType(str, Enum):
+    REPORT = "report"
+    IMPACT = "impact"
+    RISK = "risk"
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+class JobCreate(BaseModel):
+    job_type: JobType
+    policy_ids: Optional[List[int]] = None  # None means the whole portfolio
+    chunk_size: int = Field(50, ge=1, le=1000)
+
+class Job(BaseModel):
+    id: str
+    job_type: JobType
+    status: JobStatus
+    progress: float = Field(..., ge=0, le=1)
+    processed: int
+    total: int
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    error: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
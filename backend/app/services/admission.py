@@ -0,0 +1,248 @@
+import asyncio
+import math
+import re
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+
+from app.services.metrics import metrics
+
+DECISIONS = metrics.counter(
+    "admission_decisions_total", "Admission decisions by cost class and outcome (admitted, queued, throttled, shed)",
+    ["cost_class", "outcome"]
+)
+QUEUE_WAIT_SECONDS = metrics.histogram(
+    "admission_queue_wait_seconds", "Time queued requests waited for a slot", ["cost_class"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+
+
+class CostClass:
+    """A group of routes sharing a cost, a scheduling priority and queueing limits.
+
+    Lower priority values are served first. Queued requests that cannot
+    start within `max_wait` seconds are shed, and so are new ones when the
+    queue holds `max_queue` or the estimated wait already exceeds
+    `max_wait`. `max_in_flight` caps how many slots the class may hold at
+    once, so expensive routes cannot take every slot.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        cost: float,
+        priority: int,
+        max_queue: int,
+        max_wait: float,
+        max_in_flight: Optional[int] = None,
+        service_seconds: float = 0.05
+    ):
+        self.name = name
+        self.cost = cost
+        self.priority = priority
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.max_in_flight = max_in_flight
+        self.service_seconds = service_seconds  # moving average of handling time
+        self.in_flight = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+
+
+class Rejection:
+    """Why a request was turned away, and when the client may retry"""
+
+    def __init__(self, status: int, detail: str, retry_after: float):
+        self.status = status
+        self.detail = detail
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+def default_classes(max_concurrency: int) -> List[CostClass]:
+    return [
+        CostClass("cheap", cost=1, priority=0, max_queue=1000, max_wait=1.0, service_seconds=0.005),
+        CostClass("standard", cost=2, priority=1, max_queue=500, max_wait=2.0),
+        CostClass("heavy", cost=10, priority=2, max_queue=100, max_wait=5.0,
+                  max_in_flight=max(1, max_concurrency // 2), service_seconds=0.25)
+    ]
+
+
+# (methods or None for any, path pattern, cost class or None to bypass admission), first match wins
+DEFAULT_RULES: List[Tuple[Optional[Sequence[str]], str, Optional[str]]] = [
+    (None, r"/api/health|/metrics", None),
+    (None, r"/api/dashboard/stream", None),  # long-lived; capped by its own subscriber limit
+    (None, r"/api/policies/[^/]+/(report|regional-[a-z]+|scenarios)", "heavy"),
+    (None, r"/api/dashboard/executive-overview|/api/policies/similar|/api/data/refresh", "heavy"),
+    # Whole-portfolio lists cost the most to serialize
+    (("GET", "HEAD"), r"/api/policies|/api/policies/by-(category|status)/[^/]+", "heavy"),
+    (None, r"/api/policies/filter", "heavy"),
+    (("GET", "HEAD"), r"/|/api/policies/[^/]+|/api/dashboard/metrics|/api/jobs/[^/]+|/api/precompute/status", "cheap"),
+]
+
+
+class AdmissionController:
+    """Admission control for requests: per-client rate limits, bounded priority queues and load shedding.
+
+    Each request is classified by route into a cost class (or bypasses
+    admission entirely, e.g. health checks). A per-client token bucket,
+    refilled at `client_rate` tokens/s up to `client_burst`, pays the
+    class's cost; clients out of tokens get a 429. Admitted requests then
+    take one of `max_concurrency` slots, or wait in their class's queue;
+    freed slots go to the waiting class with the best priority, so cheap
+    reads overtake queued reports. A request whose estimated or actual
+    wait exceeds its class's deadline is shed with a 503. Both rejections
+    carry a Retry-After. Runs on the event loop, so it needs no locks.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 32,
+        classes: Optional[List[CostClass]] = None,
+        rules: Optional[List[Tuple[Optional[Sequence[str]], str, Optional[str]]]] = None,
+        default_class: str = "standard",
+        client_rate: float = 0.0,
+        client_burst: float = 0.0,
+        client_header: Optional[str] = None,
+        max_clients: int = 10000
+    ):
+        self.max_concurrency = max_concurrency
+        self.classes: Dict[str, CostClass] = {c.name: c for c in classes or default_classes(max_concurrency)}
+        self._by_priority = sorted(self.classes.values(), key=lambda c: c.priority)
+        self._rules = [
+            (frozenset(methods) if methods else None, re.compile(pattern), name)
+            for methods, pattern, name in (DEFAULT_RULES if rules is None else rules)
+        ]
+        self.default_class = self.classes[default_class]
+        self.client_rate = client_rate  # 0 disables per-client limits
+        self.client_burst = max(client_burst, max(c.cost for c in self.classes.values()))
+        self.client_header = client_header.lower().encode("latin-1") if client_header else None
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()  # client -> [tokens, updated_at]
+        self.in_flight = 0
+
+    def classify(self, method: str, path: str) -> Optional[CostClass]:
+        """The cost class of a request, or None if it bypasses admission"""
+        for methods, pattern, name in self._rules:
+            if (methods is None or method in methods) and pattern.fullmatch(path):
+                return self.classes[name] if name is not None else None
+        return self.default_class
+
+    def client_key(self, scope) -> str:
+        """Identify the client: the configured header (first hop) if present, else the peer address"""
+        if self.client_header is not None:
+            for name, value in scope["headers"]:
+                if name == self.client_header:
+                    return value.decode("latin-1").split(",")[0].strip()
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    def _throttle(self, client: str, cost: float) -> float:
+        """Take cost tokens from the client's bucket; returns 0, or the seconds until it could pay"""
+        if self.client_rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = [self.client_burst, now]
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+            bucket[0] = min(self.client_burst, bucket[0] + (now - bucket[1]) * self.client_rate)
+            bucket[1] = now
+        if bucket[0] < cost:
+            return (cost - bucket[0]) / self.client_rate
+        bucket[0] -= cost
+        return 0.0
+
+    def _has_room(self, cost_class: CostClass) -> bool:
+        return self.in_flight < self.max_concurrency and (
+            cost_class.max_in_flight is None or cost_class.in_flight < cost_class.max_in_flight
+        )
+
+    def _estimated_wait(self, cost_class: CostClass) -> float:
+        """Rough time until a request joining this class's queue would start"""
+        # Work queued ahead of it (its own class and better priorities), spread over every slot
+        ahead = sum(
+            len(c.waiters) * c.service_seconds for c in self._by_priority if c.priority <= cost_class.priority
+        ) + cost_class.service_seconds
+        residual = sum(c.in_flight * c.service_seconds for c in self._by_priority) / 2
+        wait = (ahead + residual) / self.max_concurrency
+        if cost_class.max_in_flight is not None:
+            wait = max(wait, (len(cost_class.waiters) + 1) * cost_class.service_seconds / cost_class.max_in_flight)
+        return wait
+
+    def _start(self, cost_class: CostClass):
+        cost_class.in_flight += 1
+        self.in_flight += 1
+
+    async def acquire(self, cost_class: CostClass, client: str) -> Optional[Rejection]:
+        """Wait for a slot; returns None once admitted (then call release), or why it was rejected"""
+        retry_after = self._throttle(client, cost_class.cost)
+        if retry_after:
+            DECISIONS.labels(cost_class.name, "throttled").inc()
+            return Rejection(429, "Rate limit exceeded", retry_after)
+
+        queued_ahead = any(c.waiters for c in self._by_priority if c.priority <= cost_class.priority)
+        if not queued_ahead and self._has_room(cost_class):
+            self._start(cost_class)
+            DECISIONS.labels(cost_class.name, "admitted").inc()
+            return None
+
+        estimate = self._estimated_wait(cost_class)
+        if len(cost_class.waiters) >= cost_class.max_queue or estimate > cost_class.max_wait:
+            DECISIONS.labels(cost_class.name, "shed").inc()
+            return Rejection(503, "Server overloaded", estimate)
+
+        DECISIONS.labels(cost_class.name, "queued").inc()
+        waiter = asyncio.get_running_loop().create_future()
+        cost_class.waiters.append(waiter)
+        self._dispatch()  # a slot may be free with only better-priority requests queued for a capped class
+        queued_at = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), cost_class.max_wait)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            # Client went away: hand back a slot granted meanwhile, or leave the queue
+            if not self._leave_queue(cost_class, waiter):
+                self.release(cost_class)
+            raise
+        if not self._leave_queue(cost_class, waiter):
+            QUEUE_WAIT_SECONDS.labels(cost_class.name).observe(time.perf_counter() - queued_at)
+            return None
+        DECISIONS.labels(cost_class.name, "shed").inc()
+        return Rejection(503, "Server overloaded", self._estimated_wait(cost_class))
+
+    @staticmethod
+    def _leave_queue(cost_class: CostClass, waiter: asyncio.Future) -> bool:
+        """Withdraw a waiter not yet granted a slot; False if it already holds one"""
+        if waiter.done():
+            return False
+        waiter.cancel()
+        cost_class.waiters.remove(waiter)
+        return True
+
+    def release(self, cost_class: CostClass, seconds: Optional[float] = None):
+        """Free a request's slot, recording how long it held it, and start the next waiter"""
+        cost_class.in_flight -= 1
+        self.in_flight -= 1
+        if seconds is not None:
+            cost_class.service_seconds += 0.2 * (seconds - cost_class.service_seconds)
+        self._dispatch()
+
+    def _dispatch(self):
+        """Hand free slots to waiters, best priority first"""
+        for cost_class in self._by_priority:
+            waiters = cost_class.waiters
+            while waiters and self._has_room(cost_class):
+                waiter = waiters.popleft()
+                self._start(cost_class)
+                waiter.set_result(None)
+            if self.in_flight >= self.max_concurrency:
+                return
+
+    def queue_depths(self) -> Dict[Tuple[str, ...], float]:
+        return {(c.name,): len(c.waiters) for c in self._by_priority}
+
+    def in_flight_by_class(self) -> Dict[Tuple[str, ...], float]:
+        return {(c.name,): c.in_flight for c in self._by_priority}
@@ -0,0 +1,56 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.services.metrics import metrics
+
+CACHE_REQUESTS = metrics.counter("analytics_cache_requests_total", "Analytics cache lookups by kind and result", ["kind", "result"])
+
+
+class AnalyticsCache:
+    """Bounded LRU cache of analytics results keyed by (kind, policy id, policy version)"""
+
+    def __init__(self, max_entries: int = 10000, max_age_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[int, float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, kind: str, policy_id: int, version: int) -> Optional[Any]:
+        """Get a cached result, or None if missing, stale or computed for an older version"""
+        key = (kind, policy_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version or time.time() - entry[1] > self.max_age_seconds:
+                self.misses += 1
+                CACHE_REQUESTS.labels(kind, "miss").inc()
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        CACHE_REQUESTS.labels(kind, "hit").inc()
+        return entry[2]
+
+    def put(self, kind: str, policy_id: int, version: int, value: Any):
+        """Store a result unless a newer version is already cached"""
+        key = (kind, policy_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > version:
+                return
+            self._entries[key] = (version, time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0
+            }
@@ -0,0 +1,180 @@
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+
+from app.services.metrics import metrics
+from app.services.policy_store import NO_END, STATUSES, PolicyTable, StringColumn
+
+try:
+    import pyarrow as pa
+except ImportError:  # optional: without pyarrow every response stays JSON
+    pa = None
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+ARROW_BATCHES = metrics.counter("arrow_record_batches_total", "Arrow record batches streamed")
+ARROW_BYTES = metrics.counter("arrow_stream_bytes_total", "Bytes of Arrow IPC streams sent")
+
+
+def accepts_arrow(accept: Optional[str]) -> bool:
+    """Whether an Accept header prefers an Arrow IPC stream over JSON (and pyarrow is available)"""
+    if pa is None or not accept:
+        return False
+    quality: Dict[str, float] = {}
+    for media_range in accept.split(","):
+        media, *params = media_range.split(";")
+        q = 1.0
+        for param in params:
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        quality[media.strip().lower()] = q
+    arrow = quality.get(ARROW_STREAM, 0.0)
+    json_quality = quality.get("application/json")
+    return arrow > json_quality if json_quality is not None else arrow > 0
+
+
+class _Chunks:
+    """File-like sink collecting what the IPC writer emits, so it can be streamed out as it is written"""
+
+    closed = False
+
+    def __init__(self):
+        self.parts: List[bytes] = []
+
+    def write(self, data) -> int:
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+class ArrowEncoder:
+    """Encodes list and analytics responses as Arrow IPC streams.
+
+    Policy lists are built straight from the PolicyTable columns, one
+    record batch of `batch_rows` rows at a time, so the response starts
+    flowing before the whole list is encoded. Categories, statuses and
+    the much-repeated descriptions become dictionary arrays (pandas
+    categoricals), dates UTC timestamps and target metrics a map column.
+    Analytics results are turned into a table of their tabular part
+    (regions, trend periods, breakdowns); every other field rides along
+    as JSON in the schema metadata.
+    """
+
+    def __init__(self, batch_rows: int = 65536):
+        self.batch_rows = batch_rows
+
+    def policies(self, table: PolicyTable, rows: np.ndarray) -> Iterator[bytes]:
+        """Stream the policies in the given table rows"""
+        categories = pa.array(table.categories.names, type=pa.string())
+        statuses = pa.array([status.value for status in STATUSES], type=pa.string())
+        metric_names = pa.array(table.metric_vocab.names[:table.metrics.shape[1]], type=pa.string())
+        names, descriptions = self._string_source(table.names), self._string_source(table.descriptions)
+        batches = (
+            self._policy_batch(
+                table, rows[start:start + self.batch_rows], names, descriptions, categories, statuses, metric_names
+            )
+            for start in range(0, len(rows), self.batch_rows)
+        )
+        return self._stream(self._policy_schema(), batches)
+
+    @staticmethod
+    def _policy_schema() -> "pa.Schema":
+        timestamp = pa.timestamp("s", tz="UTC")
+        return pa.schema([
+            ("id", pa.int64()),
+            ("name", pa.string()),
+            ("description", pa.dictionary(pa.int32(), pa.string())),
+            ("category", pa.dictionary(pa.int32(), pa.string())),
+            ("start_date", timestamp),
+            ("end_date", timestamp),
+            ("budget", pa.float64()),
+            ("target_metrics", pa.map_(pa.string(), pa.float64())),
+            ("status", pa.dictionary(pa.int8(), pa.string())),
+            ("created_at", timestamp),
+            ("updated_at", timestamp)
+        ])
+
+    def _policy_batch(
+        self, table: PolicyTable, rows: np.ndarray, names, descriptions, categories, statuses, metric_names
+    ) -> "pa.RecordBatch":
+        timestamp = pa.timestamp("s", tz="UTC")
+        end_ts = table.end_ts[rows]
+
+        metric_values = table.metrics[rows]
+        present = ~np.isnan(metric_values)
+        offsets = np.zeros(len(rows) + 1, dtype=np.int32)
+        np.cumsum(present.sum(axis=1), out=offsets[1:])
+        target_metrics = pa.MapArray.from_arrays(
+            pa.array(offsets), metric_names.take(pa.array(np.nonzero(present)[1])), pa.array(metric_values[present])
+        )
+
+        return pa.RecordBatch.from_arrays(
+            [
+                pa.array(table.ids[rows]),
+                self._strings(names, rows),
+                self._strings(descriptions, rows).dictionary_encode(),
+                pa.DictionaryArray.from_arrays(pa.array(table.category[rows]), categories),
+                pa.array(table.start_ts[rows], type=timestamp),
+                pa.array(end_ts, type=timestamp, mask=end_ts == NO_END),
+                pa.array(table.budget[rows]),
+                target_metrics,
+                pa.DictionaryArray.from_arrays(pa.array(table.status[rows]), statuses),
+                pa.array(table.created_ts[rows], type=timestamp),
+                pa.array(table.updated_ts[rows], type=timestamp)
+            ],
+            schema=self._policy_schema()
+        )
+
+    @staticmethod
+    def _string_source(column):
+        if isinstance(column, StringColumn) and not column.modified:
+            # Wrap the blob and its offsets as one Arrow array, without decoding every string
+            offsets = np.zeros(len(column) + 1, dtype=np.int64)
+            offsets[1:] = column.offsets
+            return pa.LargeStringArray.from_buffers(len(column), pa.py_buffer(offsets), pa.py_buffer(column.blob))
+        return column
+
+    @staticmethod
+    def _strings(source, rows: np.ndarray) -> "pa.Array":
+        if isinstance(source, pa.LargeStringArray):
+            return source.take(pa.array(rows)).cast(pa.string())
+        return pa.array([source[row] for row in rows.tolist()], type=pa.string())
+
+    def records(self, records: List[Dict[str, Any]], metadata: Optional[Dict[str, Any]] = None) -> Iterator[bytes]:
+        """Stream a list of flat (or nested) dicts as a table, with optional JSON metadata"""
+        table = pa.Table.from_pylist(jsonable_encoder(records))
+        if metadata:
+            table = table.replace_schema_metadata(
+                {key: json.dumps(jsonable_encoder(value)) for key, value in metadata.items()}
+            )
+        return self._stream(table.schema, table.to_batches(max_chunksize=self.batch_rows))
+
+    @staticmethod
+    def _stream(schema: "pa.Schema", batches: Iterable["pa.RecordBatch"]) -> Iterator[bytes]:
+        sink = _Chunks()
+        with pa.ipc.new_stream(sink, schema) as writer:
+            for batch in batches:
+                writer.write_batch(batch)
+                ARROW_BATCHES.inc()
+                data = sink.take()
+                ARROW_BYTES.inc(len(data))
+                yield data
+        data = sink.take()
+        ARROW_BYTES.inc(len(data))
+        yield data
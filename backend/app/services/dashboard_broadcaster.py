@@ -0,0 +1,183 @@
+import asyncio
+import json
+from typing import Any, AsyncIterator, Dict, Optional, Set
+
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+
+from app.services.data_service import DataService
+from app.services.metrics import metrics
+
+SUBSCRIBERS = metrics.gauge("dashboard_stream_subscribers", "Open dashboard event streams")
+EVENTS = metrics.counter("dashboard_stream_events_total", "Dashboard events computed, by type", ["event"])
+DROPPED = metrics.counter("dashboard_stream_dropped_total", "Subscribers disconnected for falling behind")
+
+KEEPALIVE = b": keepalive\n\n"
+_CLOSE = None  # queue sentinel: end this subscriber's stream
+
+
+class Subscription:
+    def __init__(self, queue_size: int):
+        self.queue: "asyncio.Queue[Optional[bytes]]" = asyncio.Queue(maxsize=queue_size)
+
+
+class DashboardBroadcaster:
+    """Pushes dashboard updates to many subscribers from one computation per tick.
+
+    Once per tick, if the data version moved, the broadcaster computes the
+    changed DashboardMetrics fields and the changed policies, encodes the
+    event once and puts the same bytes on every subscriber's bounded
+    queue. A subscriber whose queue is full is disconnected; its
+    EventSource reconnects and gets a fresh snapshot.
+    """
+
+    def __init__(
+        self,
+        data_service: DataService,
+        tick_interval: float = 1.0,
+        queue_size: int = 16,
+        max_subscribers: int = 10000,
+        max_delta_policies: int = 500,
+        keepalive_interval: float = 15.0
+    ):
+        self.data_service = data_service
+        self.tick_interval = tick_interval
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.max_delta_policies = max_delta_policies
+        self.keepalive_interval = keepalive_interval
+
+        self.subscribers: Set[Subscription] = set()
+        self.version = data_service.version
+        self._metrics: Dict[str, Any] = {}
+        self._snapshot: Optional[bytes] = None
+        self._snapshot_version = -1
+        self._snapshot_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self.version = self.data_service.version
+            self._metrics = jsonable_encoder(self.data_service.get_dashboard_metrics())
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for subscription in list(self.subscribers):
+            self._close(subscription)
+
+    def subscribe(self) -> Optional[Subscription]:
+        """Open a subscription, or None when at capacity"""
+        if len(self.subscribers) >= self.max_subscribers:
+            return None
+        subscription = Subscription(self.queue_size)
+        self.subscribers.add(subscription)
+        SUBSCRIBERS.set(len(self.subscribers))
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self.subscribers.discard(subscription)
+        SUBSCRIBERS.set(len(self.subscribers))
+
+    async def stream(self, subscription: Subscription, last_event_id: Optional[str] = None) -> AsyncIterator[bytes]:
+        """Server-sent events for one subscriber: a snapshot (unless already current), then updates"""
+        try:
+            if last_event_id != str(self.version):
+                yield await self.snapshot()
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscription.queue.get(), self.keepalive_interval)
+                except asyncio.TimeoutError:
+                    yield KEEPALIVE
+                    continue
+                if message is _CLOSE:
+                    return
+                yield message
+        finally:
+            self.unsubscribe(subscription)
+
+    async def snapshot(self) -> bytes:
+        """Full metrics and policy list for the current version, encoded once per version"""
+        if self._snapshot_lock is None:
+            self._snapshot_lock = asyncio.Lock()
+        # Subscribers connecting together wait for one computation instead of each starting their own
+        async with self._snapshot_lock:
+            version = self.data_service.version
+            if self._snapshot_version != version:
+                payload = await run_in_threadpool(self._snapshot_payload, version)
+                self._snapshot = _event("snapshot", version, payload)
+                self._snapshot_version = version
+                EVENTS.labels("snapshot").inc()
+            return self._snapshot
+
+    def _snapshot_payload(self, version: int) -> Dict[str, Any]:
+        return {
+            "version": version,
+            "metrics": jsonable_encoder(self.data_service.get_dashboard_metrics()),
+            "policies": jsonable_encoder([p.to_policy() for p in self.data_service.get_all_policies()])
+        }
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.tick_interval)
+            if self.data_service.version == self.version:
+                continue
+            try:
+                payload = await run_in_threadpool(self._update_payload, self.version)
+            except Exception:
+                EVENTS.labels("error").inc()
+                continue
+            self.version = payload["version"]
+            EVENTS.labels("update").inc()
+            self.publish(_event("update", payload["version"], payload))
+
+    def _update_payload(self, since_version: int) -> Dict[str, Any]:
+        """Changed metric fields and upserted/deleted policies since a version"""
+        data_service = self.data_service
+        version = data_service.version
+        changes = data_service.get_changes_since(since_version)
+
+        current = jsonable_encoder(data_service.get_dashboard_metrics())
+        changed_metrics = {key: value for key, value in current.items() if self._metrics.get(key) != value}
+        self._metrics = current
+
+        payload: Dict[str, Any] = {"version": version, "metrics": changed_metrics}
+        policy_ids = {policy_id for _, policy_id, _ in changes}
+        if len(policy_ids) > self.max_delta_policies:
+            # Too many changes to ship as a delta; clients refetch the list
+            payload["policies_reset"] = True
+            return payload
+
+        upserted, deleted = [], []
+        for policy_id in sorted(policy_ids):
+            policy = data_service.get_policy(policy_id)
+            if policy is None:
+                deleted.append(policy_id)
+            else:
+                upserted.append(policy.to_policy())
+        payload["upserted"] = jsonable_encoder(upserted)
+        payload["deleted"] = deleted
+        return payload
+
+    def publish(self, message: bytes):
+        """Fan one encoded event out to every subscriber"""
+        for subscription in list(self.subscribers):
+            try:
+                subscription.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                DROPPED.inc()
+                self._close(subscription)
+
+    def _close(self, subscription: Subscription):
+        queue = subscription.queue
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(_CLOSE)
+        self.unsubscribe(subscription)
+
+
+def _event(name: str, version: int, payload: Dict[str, Any]) -> bytes:
+    data = json.dumps(payload, separators=(",", ":"))
+    return f"id: {version}\nevent: {name}\ndata: {data}\n\n".encode()
@@ -1,15 +1,33 @@
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
-from typing import List, Optional, Dict, Any
+from datetime import date, datetime, timedelta
+from typing import Callable, List, Optional, Dict, Any, Tuple
+import bisect
 import random
+import threading
+import time
 
 from app.models.schemas import Policy, PolicyCreate, PolicyStatus, DashboardMetrics
+from app.services.metrics import timed
+from app.services.policy_store import PolicyTable, PolicyRecord, SECONDS_PER_DAY, STATUS_CODES, STATUSES, to_epoch
+from app.services.interval_index import IntervalIndex
 
 class DataService:
     def __init__(self):
-        self.policies: List[Policy] = []
+        self.table = PolicyTable()
         self.regions = ["North", "South", "East", "West", "Central"]
+        
+        # Change tracking: the data version increases on every write, and each
+        # policy remembers the version at which it last changed
+        self.version = 0
+        self._policy_versions: Dict[int, int] = {}
+        self._change_log: List[Tuple[int, int, float]] = []  # (version, policy_id, changed_at)
+        self._change_log_floor = 0  # changes at or below this version were trimmed from the log
+        self.max_change_log = 100000
+        self._listeners: List[Callable[[List[int]], None]] = []
+        self._lock = threading.RLock()
+        self.intervals = IntervalIndex()  # start/end dates, for date filters
+        
         self._initialize_mock_data()
     
     def _initialize_mock_data(self):
@@ -17,6 +35,7 @@ class DataService:
         categories = ["Healthcare", "Education", "Infrastructure", "Environment", "Economic"]
         statuses = [PolicyStatus.ACTIVE, PolicyStatus.COMPLETED, PolicyStatus.DRAFT]
         
+        policies = []
         for i in range(1, 21):
             start_date = datetime.now() - timedelta(days=random.randint(30, 365))
             end_date = start_date + timedelta(days=random.randint(90, 730)) if random.random() > 0.3 else None
@@ -38,69 +57,210 @@ class DataService:
                 created_at=start_date - timedelta(days=30),
                 updated_at=datetime.now() - timedelta(days=random.randint(0, 30))
             )
-            self.policies.append(policy)
+            policies.append(policy)
+        
+        self.load_policies(policies)
+    
+    def load_policies(self, policies: List[Policy]):
+        """Replace the whole portfolio with the given policies"""
+        table = PolicyTable(capacity=max(1024, len(policies)))
+        for policy in policies:
+            table.append(policy)
+        self.load_table(table)
     
-    def get_all_policies(self) -> List[Policy]:
+    def load_table(self, table: PolicyTable, changed_ids: Optional[List[int]] = None):
+        """Replace the whole portfolio with a prebuilt table, e.g. generated data or a shared snapshot
+        
+        Pass changed_ids when the new table differs from the current one only in those policies.
+        """
+        with self._lock:
+            self.table = table
+            if changed_ids is None:
+                changed_ids = table.ids[table.alive_rows()].tolist()
+            self._mark_changed(changed_ids)
+    
+    def get_all_policies(self) -> List[PolicyRecord]:
         """Get all policies"""
-        return self.policies
+        return self.table.records(self.table.alive_rows())
+    
+    def get_policy_ids(self) -> List[int]:
+        """Get the ids of all policies"""
+        table = self.table
+        return table.ids[table.alive_rows()].tolist()
+    
+    def count(self) -> int:
+        """Number of policies"""
+        return len(self.table)
+    
+    def head(self, n: int) -> List[PolicyRecord]:
+        """Get the first n policies"""
+        return self.table.records(self.table.alive_rows()[:n])
     
-    def get_policy(self, policy_id: int) -> Optional[Policy]:
+    @timed("data.get_policy")
+    def get_policy(self, policy_id: int) -> Optional[PolicyRecord]:
         """Get a specific policy by ID"""
-        return next((p for p in self.policies if p.id == policy_id), None)
+        row = self.table.row_of.get(policy_id)
+        return self.table.record(row) if row is not None else None
     
-    def create_policy(self, policy_create: PolicyCreate) -> Policy:
+    def create_policy(self, policy_create: PolicyCreate) -> PolicyRecord:
         """Create a new policy"""
-        new_id = max([p.id for p in self.policies], default=0) + 1
-        policy = Policy(
-            id=new_id,
-            **policy_create.dict(),
-            status=PolicyStatus.DRAFT,
-            created_at=datetime.now(),
-            updated_at=datetime.now()
-        )
-        self.policies.append(policy)
-        return policy
+        with self._lock:
+            table = self.table
+            new_id = int(table.ids[table.alive_rows()].max(initial=0)) + 1
+            policy = Policy(
+                id=new_id,
+                **policy_create.dict(),
+                status=PolicyStatus.DRAFT,
+                created_at=datetime.now(),
+                updated_at=datetime.now()
+            )
+            row = table.append(policy)
+            self._mark_changed([new_id])
+        return table.record(row)
+    
+    def subscribe(self, listener: Callable[[List[int]], None]):
+        """Register a callback invoked with the ids of changed policies after each write"""
+        self._listeners.append(listener)
+    
+    def get_policy_version(self, policy_id: int) -> int:
+        """Get the data version at which a policy last changed (0 if unknown)"""
+        return self._policy_versions.get(policy_id, 0)
+    
+    def get_changes_since(self, version: int) -> List[Tuple[int, int, float]]:
+        """Get (version, policy_id, changed_at) for every policy changed after a data version"""
+        with self._lock:
+            if version < self._change_log_floor:
+                # The log no longer covers that far back; report everything as changed
+                now = time.time()
+                return [(self._policy_versions.get(policy_id, 0), policy_id, now) for policy_id in self.get_policy_ids()]
+            
+            start = bisect.bisect_right(self._change_log, (version, float("inf")))
+            latest = {}
+            for entry in self._change_log[start:]:
+                latest[entry[1]] = entry
+            return list(latest.values())
+    
+    def _mark_changed(self, policy_ids: List[int]):
+        """Bump the data version for changed policies and notify listeners"""
+        with self._lock:
+            self.version += 1
+            changed_at = time.time()
+            for policy_id in policy_ids:
+                self._policy_versions[policy_id] = self.version
+                self._change_log.append((self.version, policy_id, changed_at))
+            
+            overflow = len(self._change_log) - self.max_change_log
+            if overflow > 0:
+                self._change_log_floor = self._change_log[overflow - 1][0]
+                del self._change_log[:overflow]
+            
+            self.intervals.changed(self.table, policy_ids)
+        
+        for listener in list(self._listeners):
+            listener(policy_ids)
     
-    def get_policies_by_category(self, category: str) -> List[Policy]:
+    def get_policies_by_category(self, category: str) -> List[PolicyRecord]:
         """Get policies by category"""
-        return [p for p in self.policies if p.category == category]
+        return self.filter_policies(category=category)
     
-    def get_policies_by_status(self, status: str) -> List[Policy]:
+    def get_policies_by_status(self, status: str) -> List[PolicyRecord]:
         """Get policies by status"""
-        return [p for p in self.policies if p.status.value == status]
+        return self.filter_policies(status=status)
     
-    def get_active_policies(self) -> List[Policy]:
+    def get_active_policies(self) -> List[PolicyRecord]:
         """Get all active policies"""
-        return [p for p in self.policies if p.status == PolicyStatus.ACTIVE]
+        return self.filter_policies(status=PolicyStatus.ACTIVE.value)
     
+    @timed("data.filter_policies")
     def filter_policies(
         self, 
         category: Optional[str] = None,
         status: Optional[str] = None,
         min_budget: Optional[float] = None,
         max_budget: Optional[float] = None,
-        search_term: Optional[str] = None
-    ) -> List[Policy]:
+        search_term: Optional[str] = None,
+        active_on: Optional[date] = None,
+        ending_within_days: Optional[int] = None
+    ) -> List[PolicyRecord]:
         """Advanced filtering of policies"""
-        filtered = self.policies
+        table, rows = self.filter_rows(
+            category, status, min_budget, max_budget, search_term, active_on, ending_within_days
+        )
+        return table.records(rows)
+    
+    def filter_rows(
+        self, 
+        category: Optional[str] = None,
+        status: Optional[str] = None,
+        min_budget: Optional[float] = None,
+        max_budget: Optional[float] = None,
+        search_term: Optional[str] = None,
+        active_on: Optional[date] = None,
+        ending_within_days: Optional[int] = None
+    ) -> Tuple[PolicyTable, np.ndarray]:
+        """Like filter_policies, but returns the table read and the matching rows in it
+        
+        active_on keeps policies running at any time on that day; ending_within_days
+        keeps those whose end date falls between now and that many days ahead.
+        """
+        table = self.table
+        no_rows = np.zeros(0, dtype=np.int64)
+        
+        # Date filters come from the interval index, so the other filters only check its hits
+        candidates = None
+        if active_on is not None:
+            # Local midnight of the very first or last day can fall outside datetime's range in UTC
+            active_on = min(max(active_on, date(1, 1, 2)), date(9999, 12, 30))
+            day_start = to_epoch(datetime.combine(active_on, datetime.min.time()))
+            candidates = self.intervals.overlapping(table, day_start, day_start + SECONDS_PER_DAY - 1)
+        if ending_within_days is not None:
+            now = int(time.time())
+            ending = self.intervals.ending_between(table, now, now + ending_within_days * SECONDS_PER_DAY)
+            candidates = ending if candidates is None else np.intersect1d(candidates, ending, assume_unique=True)
+        
+        if candidates is None:
+            column = lambda values: values[:table.size]
+            mask = table.alive[:table.size].copy()
+        else:
+            column = lambda values: values[candidates]
+            mask = table.alive[candidates]
         
         if category:
-            filtered = [p for p in filtered if p.category == category]
+            code = table.categories.lookup(category)
+            if code is None:
+                return table, no_rows
+            mask &= column(table.category) == code
         
         if status:
-            filtered = [p for p in filtered if p.status.value == status]
+            code = STATUS_CODES.get(status)
+            if code is None:
+                return table, no_rows
+            mask &= column(table.status) == code
         
         if min_budget is not None:
-            filtered = [p for p in filtered if p.budget >= min_budget]
+            mask &= column(table.budget) >= min_budget
         
         if max_budget is not None:
-            filtered = [p for p in filtered if p.budget <= max_budget]
+            mask &= column(table.budget) <= max_budget
+        
+        rows = np.flatnonzero(mask) if candidates is None else candidates[mask]
         
         if search_term:
             search_lower = search_term.lower()
-            filtered = [p for p in filtered if search_lower in p.name.lower() or search_lower in p.description.lower()]
+            names, descriptions = table.names, table.descriptions
+            # Descriptions are interned, so each distinct one is only checked once
+            description_hits = {}
+            matches = []
+            for row in rows.tolist():
+                description = descriptions[row]
+                hit = description_hits.get(description)
+                if hit is None:
+                    hit = description_hits[description] = search_lower in description.lower()
+                if hit or search_lower in names[row].lower():
+                    matches.append(row)
+            rows = np.array(matches, dtype=np.int64)
         
-        return filtered
+        return table, rows
     
     def get_regional_performance_data(self, policy_id: int) -> Dict[str, Any]:
         """Generate regional performance data for a policy"""
@@ -138,11 +298,26 @@ class DataService:
             "regional_variance": round(np.std(impact_scores), 2)
         }
     
-    def get_dashboard_metrics(self, policies: List[Policy]) -> DashboardMetrics:
+    def get_status_counts(self) -> Dict[str, int]:
+        """Count policies per status"""
+        table = self.table
+        counts = np.bincount(table.status[table.alive_rows()], minlength=len(STATUSES))
+        return {status.value: int(counts[code]) for code, status in enumerate(STATUSES)}
+    
+    def get_total_budget(self) -> float:
+        """Sum of all policy budgets"""
+        table = self.table
+        return float(table.budget[table.alive_rows()].sum())
+    
+    @timed("data.dashboard_metrics")
+    def get_dashboard_metrics(self) -> DashboardMetrics:
         """Calculate dashboard metrics"""
-        total_policies = len(policies)
-        active_policies = len([p for p in policies if p.status == PolicyStatus.ACTIVE])
-        total_budget = sum(p.budget for p in policies)
+        table = self.table
+        rows = table.alive_rows()
+        total_policies = len(rows)
+        policies_by_status = self.get_status_counts()
+        active_policies = policies_by_status[PolicyStatus.ACTIVE.value]
+        total_budget = self.get_total_budget()
         
         # Mock average ROI calculation
         average_roi = np.random.uniform(120, 250)
@@ -150,14 +325,14 @@ class DataService:
         # Mock high risk count (would come from risk predictor in real scenario)
         high_risk_policies = random.randint(2, 5)
         
-        policies_by_status = {}
-        for status in PolicyStatus:
-            policies_by_status[status.value] = len([p for p in policies if p.status == status])
-        
-        policies_by_category = {}
-        for policy in policies:
-            policies_by_category[policy.category] = policies_by_category.get(policy.category, 0) + 1
+        category_counts = np.bincount(table.category[rows], minlength=len(table.categories))
+        policies_by_category = {
+            name: int(count) for name, count in zip(table.categories.names, category_counts) if count
+        }
         
+        # Five most recently updated policies (stable, like sorted() on the records)
+        updated = table.updated_ts[rows]
+        recent_rows = rows[np.argsort(-updated, kind="stable")[:5]]
         recent_activities = [
             {
                 "policy_id": p.id,
@@ -165,7 +340,7 @@ class DataService:
                 "action": "Updated",
                 "timestamp": p.updated_at.isoformat()
             }
-            for p in sorted(policies, key=lambda x: x.updated_at, reverse=True)[:5]
+            for p in table.records(recent_rows)
         ]
         
         return DashboardMetrics(
@@ -179,7 +354,16 @@ class DataService:
             recent_activities=recent_activities
         )
     
-    def refresh_data(self):
-        """Refresh data from external sources (mock implementation)"""
-        # In production, this would fetch from databases, APIs, etc.
-        pass
+    def apply_changes(self, changes: PolicyTable, deleted_ids: List[int]) -> List[int]:
+        """Upsert the policies in a table of changes and delete others, atomically; returns the changed ids
+        
+        The merged table is built aside and swapped in as one write, so readers see
+        all of the changes or none and caches and indexes are invalidated once.
+        """
+        with self._lock:
+            table = self.table
+            deleted_ids = [policy_id for policy_id in deleted_ids if policy_id in table.row_of]
+            changed_ids = changes.ids[changes.alive_rows()].tolist() + deleted_ids
+            if changed_ids:
+                self.load_table(table.merged(changes, deleted_ids), changed_ids)
+        return changed_ids
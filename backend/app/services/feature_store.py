@@ -0,0 +1,152 @@
+import threading
+import time
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+from sklearn.preprocessing import StandardScaler
+
+from app.services.data_service import DataService
+from app.services.metrics import stage
+from app.services.policy_store import SECONDS_PER_DAY, NO_END, STATUS_CODES, PolicyTable
+
+# Model feature columns, in the order the risk model was trained on
+FEATURE_NAMES = ["budget", "days_running", "metrics_count", "budget_per_metric", "status"]
+BUDGET, DAYS_RUNNING, METRICS_COUNT, BUDGET_PER_METRIC, STATUS = range(len(FEATURE_NAMES))
+N_FEATURES = len(FEATURE_NAMES)
+
+# Status encoding used as model feature 5, indexed by status code
+STATUS_FEATURES = [0.5] * len(STATUS_CODES)
+for _status, _value in {"draft": 0.2, "active": 0.5, "completed": 0.8, "archived": 0.1}.items():
+    STATUS_FEATURES[STATUS_CODES[_status]] = _value
+
+
+def budget_features(budget: np.ndarray, metrics_count: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Budget and budget-per-metric feature values for arrays of budgets and metric counts"""
+    return np.minimum(1.0, budget / 5000000), np.minimum(1.0, budget / np.maximum(1, metrics_count) / 1000000)
+
+
+class RiskFeatureStore:
+    """Risk model features for every policy, kept as a contiguous scaled matrix.
+
+    Rows line up with the rows of the DataService's PolicyTable. Static
+    features (budget, metric count, budget per metric, status) are updated
+    when policies are written; the time-dependent ones (days running and
+    days remaining) are recomputed for all rows in one vectorized pass
+    whenever the day changes.
+
+    A store can also adopt arrays published by another process (see
+    SnapshotStore); it is then read-only and follows the snapshot instead
+    of recomputing.
+    """
+
+    def __init__(self, data_service: DataService, scaler: StandardScaler):
+        self.data_service = data_service
+        self.scaler = scaler
+        self.table: Optional[PolicyTable] = None
+        self.size = 0
+        self.raw = np.zeros((0, N_FEATURES))
+        # float32 is what the forest predicts on, so inference needs no conversion
+        self.scaled = np.zeros((0, N_FEATURES), dtype=np.float32)
+        self.days_remaining = np.zeros(0)  # NaN for open-ended policies
+        self.as_of_day = None
+        self.as_of_ts = 0
+        self.read_only = False
+        self._status_features = np.array(STATUS_FEATURES)
+        self._lock = threading.Lock()
+
+        self.rebuild()
+        data_service.subscribe(self._on_change)
+
+    def rebuild(self):
+        """Recompute every row from the current table"""
+        with self._lock:
+            table = self.data_service.table
+            self.table = table
+            self.size = table.size
+            self.read_only = False
+            capacity = max(table.capacity, 1)
+            self.raw = np.zeros((capacity, N_FEATURES))
+            self.scaled = np.zeros((capacity, N_FEATURES), dtype=np.float32)
+            self.days_remaining = np.full(capacity, np.nan)
+            rows = slice(0, table.size)
+            self._write_static(rows)
+            self._write_time(rows, time.time())
+
+    def adopt(self, table: PolicyTable, scaled: np.ndarray, days_remaining: np.ndarray, as_of_ts: int):
+        """Serve precomputed features for a table (e.g. memory-mapped) instead of computing them"""
+        with self._lock:
+            self.table = table
+            self.size = table.size
+            self.raw = None
+            self.scaled = scaled
+            self.days_remaining = days_remaining
+            self.as_of_ts = int(as_of_ts)
+            self.as_of_day = self.as_of_ts // SECONDS_PER_DAY
+            self.read_only = True
+
+    def _on_change(self, policy_ids: List[int]):
+        if self.data_service.table is not self.table:
+            self.rebuild()
+            return
+        if self.read_only:
+            return
+        with self._lock:
+            table = self.table
+            if table.capacity > len(self.raw):
+                self._grow(table.capacity)
+            row_of = table.row_of
+            rows = np.array([row_of[i] for i in policy_ids if i in row_of], dtype=np.int64)
+            self.size = table.size
+            if len(rows):
+                self._write_static(rows)
+                self._write_time(rows, self.as_of_ts)
+
+    def _grow(self, capacity: int):
+        raw = np.zeros((capacity, N_FEATURES))
+        raw[:self.size] = self.raw[:self.size]
+        scaled = np.zeros((capacity, N_FEATURES), dtype=np.float32)
+        scaled[:self.size] = self.scaled[:self.size]
+        days_remaining = np.full(capacity, np.nan)
+        days_remaining[:self.size] = self.days_remaining[:self.size]
+        self.raw, self.scaled, self.days_remaining = raw, scaled, days_remaining
+
+    def _write_static(self, rows: Union[np.ndarray, slice]):
+        table = self.table
+        budget = table.budget[rows]
+        metrics_count = (~np.isnan(table.metrics[rows])).sum(axis=1)
+        raw = self.raw
+        raw[rows, BUDGET], raw[rows, BUDGET_PER_METRIC] = budget_features(budget, metrics_count)
+        raw[rows, METRICS_COUNT] = np.minimum(1.0, metrics_count / 5)
+        raw[rows, STATUS] = self._status_features[table.status[rows]]
+
+    def _write_time(self, rows: Union[np.ndarray, slice], now_ts: float):
+        table = self.table
+        now_ts = int(now_ts)
+        days_running = (now_ts - table.start_ts[rows]) // SECONDS_PER_DAY
+        self.raw[rows, DAYS_RUNNING] = np.minimum(1.0, days_running / 365)
+        end_ts = table.end_ts[rows]
+        self.days_remaining[rows] = np.where(end_ts == NO_END, np.nan, (end_ts - now_ts) // SECONDS_PER_DAY)
+        self.scaled[rows] = self.scaler.transform(self.raw[rows])
+        self.as_of_ts = now_ts
+        self.as_of_day = now_ts // SECONDS_PER_DAY
+
+    def refresh_time_features(self, now_ts: Optional[float] = None):
+        """Daily pass: recompute days running/remaining and rescale all rows"""
+        with self._lock, stage("risk.feature_refresh"):
+            self._write_time(slice(0, self.size), time.time() if now_ts is None else now_ts)
+
+    def _ensure_current(self):
+        # Adopted features are refreshed by whoever publishes them
+        if not self.read_only and int(time.time()) // SECONDS_PER_DAY != self.as_of_day:
+            self.refresh_time_features()
+
+    def rows(self, policy_ids: List[int]) -> Optional[np.ndarray]:
+        """Feature rows for the given policies, or None if any is not in the store"""
+        if self.data_service.table is not self.table:
+            return None
+        self._ensure_current()
+        row_of = self.table.row_of
+        rows = [row_of.get(policy_id) for policy_id in policy_ids]
+        if None in rows or max(rows, default=-1) >= self.size:
+            return None
+        return np.array(rows, dtype=np.int64)
@@ -1,22 +1,25 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Tuple
 
-from app.models.schemas import Policy, ImpactAnalysis, MetricComparison
+from app.models.schemas import ImpactAnalysis, MetricComparison
+from app.services.policy_store import PolicyRecord
+from app.services.metrics import timed
 
 class ImpactAnalyzer:
     def __init__(self):
         self.regions = ["North", "South", "East", "West", "Central"]
     
-    def analyze(self, policy: Policy) -> ImpactAnalysis:
+    @timed("impact.analyze")
+    def analyze(self, policy: PolicyRecord) -> ImpactAnalysis:
         """Analyze policy impact (before vs after)"""
         
         # Generate mock before/after data
         metrics_comparison = []
         trend_data = {}
         
-        for metric_name, target_value in policy.target_metrics.items():
+        for metric_name, target_value in zip(policy.metric_names, policy.metric_values):
             # Simulate before value (lower than target)
             before_value = target_value * np.random.uniform(0.6, 0.85)
             # Simulate after value (closer to or exceeding target)
@@ -60,7 +63,35 @@ class ImpactAnalyzer:
             generated_at=datetime.now()
         )
     
-    def get_regional_impact(self, policy: Policy) -> Dict[str, Dict]:
+    def analyze_batch(self, policies: List[PolicyRecord]) -> List[ImpactAnalysis]:
+        """Analyze impact for many policies"""
+        return [self.analyze(policy) for policy in policies]
+    
+    def analyze_scenarios(self, policy: PolicyRecord, budgets: np.ndarray, metric_multipliers: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Overall impact score and ROI for many budget / metric-target variants of a policy at once
+        
+        The simulated before/after outcomes are drawn once and shared by every
+        variant, so differences between scenarios come from the perturbations alone.
+        """
+        targets = np.asarray(policy.metric_values, dtype=np.float64)
+        if not len(targets):
+            return np.zeros(len(budgets)), np.zeros(len(budgets))
+        before_factor = np.random.uniform(0.6, 0.85, len(targets))
+        after_factor = np.random.uniform(0.9, 1.15, len(targets))
+        
+        # (scenarios, metrics) matrices, the same arithmetic as analyze()
+        scaled_targets = metric_multipliers[:, None] * targets[None, :]
+        before = scaled_targets * before_factor
+        after = scaled_targets * after_factor
+        change_absolute = after - before
+        with np.errstate(divide="ignore", invalid="ignore"):
+            change_percentage = np.where(before > 0, change_absolute / before * 100, 0.0)
+            roi = np.where(budgets > 0, change_absolute.sum(axis=1) / budgets * 100, 0.0)
+        impact_scores = np.minimum(100, np.abs(change_percentage).mean(axis=1) * 0.8)
+        return impact_scores, roi
+    
+    @timed("impact.regional_impact")
+    def get_regional_impact(self, policy: PolicyRecord) -> Dict[str, Dict]:
         """Analyze impact breakdown by region"""
         regional_impact = {}
         
@@ -68,7 +99,7 @@ class ImpactAnalyzer:
             # Generate region-specific metrics
             metrics_comparison = []
             
-            for metric_name, target_value in policy.target_metrics.items():
+            for metric_name, target_value in zip(policy.metric_names, policy.metric_values):
                 # Regional performance varies
                 before_value = target_value * np.random.uniform(0.5, 0.8)
                 after_value = target_value * np.random.uniform(0.85, 1.1)
@@ -96,14 +127,14 @@ class ImpactAnalyzer:
         
         return regional_impact
     
-    def calculate_cost_per_beneficiary(self, policy: Policy, beneficiaries: int = None) -> float:
+    def calculate_cost_per_beneficiary(self, policy: PolicyRecord, beneficiaries: int = None) -> float:
         """Calculate cost per beneficiary"""
         if beneficiaries is None:
             beneficiaries = round(np.random.uniform(10000, 100000))
         
         return round(policy.budget / beneficiaries, 2) if beneficiaries > 0 else 0
     
-    def get_efficiency_score(self, policy: Policy, impact_score: float, roi: float) -> float:
+    def get_efficiency_score(self, policy: PolicyRecord, impact_score: float, roi: float) -> float:
         """Calculate efficiency score based on impact and ROI"""
         efficiency = (impact_score * 0.6 + min(100, roi / 2) * 0.4)
         return round(min(100, efficiency), 2)
@@ -0,0 +1,165 @@
+import threading
+from typing import List, Optional, Set
+
+import numpy as np
+
+from app.services.metrics import metrics, stage
+from app.services.policy_store import NO_END, PolicyTable
+
+INDEX_REBUILDS = metrics.counter("interval_index_rebuilds_total", "Policy date interval index rebuilds")
+
+# Open-ended policies end "never"
+OPEN_END = np.iinfo(np.int64).max
+
+
+class IntervalIndex:
+    """Finds the table rows of policies active during a period, or ending within one.
+
+    A centered interval tree over the [start, end] intervals, laid out
+    implicitly over their sorted distinct endpoints: node i (1-based) has
+    key endpoints[i - 1], its children are i -/+ half its lowest set bit,
+    and each interval sits at the highest node whose key it spans. Each
+    node's intervals are kept sorted by start and by end, so a stabbing
+    query walks one root-to-leaf path taking a contiguous slice at each
+    node: O(log n + k). Starts and ends are also kept sorted on their own
+    for range queries.
+
+    Writes since the build go to a delta of rows that queries check
+    directly, and those rows' built entries are marked stale. The index is
+    rebuilt on the next query once the delta outgrows `max_delta` or the
+    table is swapped. Results are rows of the table as it is now; deleted
+    rows are left to the caller's alive check.
+    """
+
+    def __init__(self, max_delta: int = 4096):
+        self.max_delta = max_delta
+        self._table: Optional[PolicyTable] = None
+        self._delta: Set[int] = set()
+        self._stale = np.zeros(0, dtype=bool)
+        self._lock = threading.Lock()
+
+    def changed(self, table: PolicyTable, policy_ids: List[int]):
+        """Record written policies (called by the data service after every write)"""
+        with self._lock:
+            if table is not self._table:
+                self._table = None  # swapped: rebuild on the next query
+                return
+            built = len(self._stale)
+            row_of = table.row_of
+            for policy_id in policy_ids:
+                row = row_of.get(policy_id)
+                if row is None:
+                    continue  # deleted: its row is no longer alive
+                if row < built:
+                    self._stale[row] = True
+                self._delta.add(row)
+            if len(self._delta) > self.max_delta:
+                self._table = None
+
+    def _build(self, table: PolicyTable):
+        rows = np.arange(table.size, dtype=np.int64)
+        starts = table.start_ts[:table.size].copy()
+        ends = table.end_ts[:table.size].copy()
+        ends[ends == NO_END] = OPEN_END
+
+        with stage("intervals.rebuild"):
+            closed = np.flatnonzero(ends != OPEN_END)
+            order = closed[np.argsort(ends[closed], kind="stable")]
+            self._sorted_ends, self._by_end = ends[order], rows[order]
+
+            # Intervals ending before they start are never active
+            valid = ends >= starts
+            starts, ends, rows = starts[valid], ends[valid], rows[valid]
+            order = np.argsort(starts, kind="stable")
+            self._sorted_starts, self._by_start = starts[order], rows[order]
+
+            keys = np.unique(np.concatenate([starts, ends]))
+            self._keys = keys
+            self._root = 1 << (max(len(keys), 1).bit_length() - 1)
+            nodes = self._nodes(np.searchsorted(keys, starts) + 1, np.searchsorted(keys, ends) + 1)
+
+            order = np.lexsort((starts, nodes))
+            self._node_starts, self._node_by_start = starts[order], rows[order]
+            order = np.lexsort((-ends, nodes))
+            self._node_neg_ends, self._node_by_end = -ends[order], rows[order]
+            self._node_offsets = np.searchsorted(nodes[order], np.arange(2 * self._root + 1))
+
+        self._table = table
+        self._stale = np.zeros(table.size, dtype=bool)
+        self._delta = set()
+        INDEX_REBUILDS.inc()
+
+    @staticmethod
+    def _nodes(lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+        """The highest node with a key index in [lo, hi]: the one with the most trailing zero bits"""
+        differing = lo ^ hi
+        # Position of the highest bit where lo and hi differ (frexp is exact for these small integers)
+        top = np.maximum(np.frexp(differing.astype(np.float64))[1] - 1, 0).astype(np.int64)
+        # hi with the bits below that cleared, unless lo itself is a multiple of 2^(top+1)
+        lo_wins = (differing == 0) | ((lo & ((np.int64(2) << top) - 1)) == 0)
+        return np.where(lo_wins, lo, (hi >> top) << top)
+
+    def _current(self, table: PolicyTable):
+        if table is not self._table:
+            self._build(table)
+
+    def _stabbing(self, ts: int) -> List[np.ndarray]:
+        """Built rows whose interval contains ts, as slices"""
+        keys, offsets = self._keys, self._node_offsets
+        parts = []
+        node, half = self._root, self._root >> 1
+        while True:
+            begin, end = offsets[node], offsets[node + 1]
+            key = keys[node - 1] if node <= len(keys) else OPEN_END
+            if ts < key:
+                # Every interval here ends at or after the key; those starting by ts contain it
+                count = np.searchsorted(self._node_starts[begin:end], ts, "right")
+                parts.append(self._node_by_start[begin:begin + count])
+                node -= half
+            elif ts > key:
+                # Every interval here starts at or before the key; those ending at or after ts contain it
+                count = np.searchsorted(self._node_neg_ends[begin:end], -ts, "right")
+                parts.append(self._node_by_end[begin:begin + count])
+                node += half
+            else:
+                parts.append(self._node_by_start[begin:end])
+                break
+            if half == 0:
+                break
+            half >>= 1
+        return parts
+
+    def _finish(self, table: PolicyTable, parts: List[np.ndarray], delta_hits) -> np.ndarray:
+        rows = np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+        rows = rows[~self._stale[rows]]
+        if self._delta:
+            delta = np.fromiter(self._delta, dtype=np.int64, count=len(self._delta))
+            rows = np.concatenate([rows, delta[delta_hits(table, delta)]])
+        return np.sort(rows)
+
+    def overlapping(self, table: PolicyTable, start_ts: int, end_ts: int) -> np.ndarray:
+        """Sorted rows of policies active at some point in [start_ts, end_ts]"""
+        def hits(table: PolicyTable, rows: np.ndarray) -> np.ndarray:
+            starts, ends = table.start_ts[rows], table.end_ts[rows]
+            ends = np.where(ends == NO_END, OPEN_END, ends)
+            return (starts <= end_ts) & (ends >= start_ts) & (ends >= starts)
+
+        with self._lock:
+            self._current(table)
+            # Intervals containing start_ts, plus those starting later in the period
+            parts = self._stabbing(start_ts)
+            first, last = np.searchsorted(self._sorted_starts, [start_ts, end_ts], "right")
+            parts.append(self._by_start[first:last])
+            return self._finish(table, parts, hits)
+
+    def ending_between(self, table: PolicyTable, start_ts: int, end_ts: int) -> np.ndarray:
+        """Sorted rows of policies whose end date falls in [start_ts, end_ts]"""
+        def hits(table: PolicyTable, rows: np.ndarray) -> np.ndarray:
+            ends = table.end_ts[rows]
+            return (ends >= start_ts) & (ends <= end_ts) & (ends != NO_END)
+
+        with self._lock:
+            self._current(table)
+            first = np.searchsorted(self._sorted_ends, start_ts, "left")
+            last = np.searchsorted(self._sorted_ends, end_ts, "right")
+            return self._finish(table, [self._by_end[first:last]], hits)
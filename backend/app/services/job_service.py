@@ -0,0 +1,199 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from app.models.schemas import Job, JobCreate, JobStatus
+
+# A chunk handler receives a list of policy ids and returns one JSON-ready result per policy
+ChunkHandler = Callable[[List[int]], List[Dict[str, Any]]]
+
+
+class JobResultStore:
+    """Bounded on-disk store for job records: the job's status, and its result once completed.
+
+    Records are shared through the directory, so any worker process can
+    answer for a job, and they outlive the in-memory job registry.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_entries: int = 200):
+        self.directory = directory or os.path.join(tempfile.gettempdir(), "policy_jobs")
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.directory, f"{job_id}.json")
+
+    def save(self, job_id: str, record: Dict[str, Any]):
+        """Write a record atomically and evict the oldest entries beyond the bound"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(record, f)
+        os.replace(tmp_path, self._path(job_id))
+        self._evict()
+
+    def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Load a stored record, or None if it was never written or has been evicted"""
+        try:
+            with open(self._path(job_id)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _evict(self):
+        with self._lock:
+            entries = [
+                os.path.join(self.directory, name)
+                for name in os.listdir(self.directory)
+                if name.endswith(".json")
+            ]
+            if len(entries) <= self.max_entries:
+                return
+            entries.sort(key=os.path.getmtime)
+            for path in entries[:len(entries) - self.max_entries]:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+
+class JobService:
+    """Runs long portfolio computations on a worker pool, outside the HTTP request.
+
+    Job state is changed under the lock and handed out as copies. Every
+    state change (progress at most once per `persist_interval` seconds) is
+    also written to the store, which answers for jobs this process has
+    forgotten or never ran.
+    """
+
+    def __init__(
+        self,
+        handlers: Dict[str, ChunkHandler],
+        policy_ids_provider: Callable[[], List[int]],
+        store: Optional[JobResultStore] = None,
+        max_workers: int = 2,
+        max_jobs: int = 1000,
+        persist_interval: float = 1.0
+    ):
+        self.handlers = handlers
+        self.policy_ids_provider = policy_ids_provider
+        self.store = store or JobResultStore()
+        self.max_jobs = max_jobs
+        self.persist_interval = persist_interval
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job-worker")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._in_flight: Dict[str, str] = {}  # dedup key -> job id
+        self._lock = threading.Lock()
+
+    def submit(self, job_create: JobCreate) -> Job:
+        """Queue a job, or return the identical job that is already queued or running"""
+        policy_ids = job_create.policy_ids
+        if policy_ids is None:
+            policy_ids = self.policy_ids_provider()
+        policy_ids = sorted(set(policy_ids))
+        key = self._dedup_key(job_create.job_type.value, policy_ids)
+
+        with self._lock:
+            existing_id = self._in_flight.get(key)
+            if existing_id is not None:
+                return self._jobs[existing_id].model_copy()
+
+            job = Job(
+                id=uuid.uuid4().hex,
+                job_type=job_create.job_type,
+                status=JobStatus.QUEUED,
+                progress=0.0,
+                processed=0,
+                total=len(policy_ids),
+                created_at=datetime.now()
+            )
+            self._jobs[job.id] = job
+            self._in_flight[key] = job.id
+            self._trim_jobs()
+            record = job.model_dump(mode="json")
+
+        self.store.save(job.id, {"job": record})
+        self.executor.submit(self._run, job.id, key, policy_ids, job_create.chunk_size)
+        return job.model_copy()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Get job status, with the stored result attached once completed"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job = job.model_copy()
+
+        if job is None or job.status == JobStatus.COMPLETED:
+            # Forgotten here, or run by another worker: the store has the last recorded state
+            record = self.store.load(job_id)
+            if record is None or "job" not in record:
+                return job
+            if job is None:
+                job = Job(**record["job"])
+            job.result = record.get("result")
+        return job
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job_id: str, key: str, policy_ids: List[int], chunk_size: int):
+        job = self._jobs[job_id]
+        handler = self.handlers[job.job_type.value]
+        self._update(job, status=JobStatus.RUNNING, started_at=datetime.now())
+
+        try:
+            results: List[Dict[str, Any]] = []
+            persisted_at = time.monotonic()
+            for start in range(0, len(policy_ids), chunk_size):
+                chunk = policy_ids[start:start + chunk_size]
+                results.extend(handler(chunk))
+                processed = min(len(policy_ids), start + len(chunk))
+                persist = time.monotonic() - persisted_at >= self.persist_interval
+                self._update(job, persist=persist, processed=processed, progress=round(processed / len(policy_ids), 4))
+                if persist:
+                    persisted_at = time.monotonic()
+
+            self._update(
+                job, result={"count": len(results), "results": results},
+                progress=1.0, status=JobStatus.COMPLETED, completed_at=datetime.now()
+            )
+        except Exception as e:
+            self._update(job, status=JobStatus.FAILED, error=str(e), completed_at=datetime.now())
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def _update(self, job: Job, persist: bool = True, result: Optional[Dict[str, Any]] = None, **fields):
+        """Change a job's fields, writing the new state (and result) to the store before it shows here"""
+        if persist:
+            with self._lock:
+                record = {"job": job.model_copy(update=fields).model_dump(mode="json")}
+            if result is not None:
+                record["result"] = result
+            self.store.save(job.id, record)
+        with self._lock:
+            for name, value in fields.items():
+                setattr(job, name, value)
+
+    def _trim_jobs(self):
+        """Forget the oldest finished jobs once the in-memory registry is full"""
+        if len(self._jobs) <= self.max_jobs:
+            return
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.max_jobs:
+                break
+            if self._jobs[job_id].status in (JobStatus.COMPLETED, JobStatus.FAILED):
+                del self._jobs[job_id]
+
+    @staticmethod
+    def _dedup_key(job_type: str, policy_ids: List[int]) -> str:
+        payload = json.dumps({"job_type": job_type, "policy_ids": policy_ids})
+        return hashlib.sha1(payload.encode()).hexdigest()
@@ -0,0 +1,303 @@
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.data_service import DataService
+from app.services.metrics import metrics, stage
+from app.services.policy_store import Vocabulary
+
+OBSERVATIONS = metrics.counter("observations_ingested_total", "Metric observations ingested")
+REJECTED = metrics.counter(
+    "observations_rejected_total", "Observations rejected (unknown or out-of-range policy, or non-finite value)"
+)
+ANOMALIES = metrics.counter("observation_anomalies_total", "Anomalies flagged, by kind", ["kind"])
+SERIES = metrics.gauge("observation_series", "Distinct (policy, region, metric) series tracked")
+
+# A series key packs (policy id, region code, metric code) into one int64
+_CODE_BITS = 16
+_CODE_LIMIT = 1 << _CODE_BITS
+_MAX_POLICY_ID = (1 << (63 - 2 * _CODE_BITS)) - 1
+
+
+class ObservationStore:
+    """Online statistics for observed metric values, one series per (policy, region, metric).
+
+    Per-series state lives in parallel numpy arrays: count, Welford mean
+    and M2, EWMA, last timestamp, target and an off-target flag. A batch
+    is sorted by series once; its per-series count, mean and M2 come from
+    bincounts and are merged into the running state with Chan's parallel
+    update, and the EWMA advances by a closed form over each series' new
+    points in time order. No Python code runs per observation.
+
+    Two kinds of anomaly are flagged:
+      - outlier: a value more than `z_threshold` standard deviations from
+        its series' mean as of the start of the batch (after `min_count` points)
+      - off_target: a series' EWMA moving further than `target_tolerance`
+        (relative) from the policy's target for that metric
+    """
+
+    def __init__(
+        self,
+        data_service: DataService,
+        ewma_alpha: float = 0.1,
+        z_threshold: float = 4.0,
+        min_count: int = 30,
+        target_tolerance: float = 0.25,
+        max_recent_anomalies: int = 10000,
+        max_reported_anomalies: int = 1000,
+        capacity: int = 1024
+    ):
+        self.data_service = data_service
+        self.ewma_alpha = ewma_alpha
+        self.z_threshold = z_threshold
+        self.min_count = min_count
+        self.target_tolerance = target_tolerance
+        self.max_reported_anomalies = max_reported_anomalies
+
+        self.regions = Vocabulary()
+        self.metric_names = Vocabulary()
+        self.size = 0
+        self.capacity = 0
+        self.keys = np.zeros(0, dtype=np.int64)
+        self.policy_id = np.zeros(0, dtype=np.int64)
+        self.region = np.zeros(0, dtype=np.int32)
+        self.metric = np.zeros(0, dtype=np.int32)
+        self.count = np.zeros(0, dtype=np.int64)
+        self.mean = np.zeros(0)
+        self.m2 = np.zeros(0)
+        self.ewma = np.zeros(0)
+        self.last_ts = np.zeros(0)
+        self.target = np.zeros(0)  # NaN when the policy has no target for the metric
+        self.off_target = np.zeros(0, dtype=bool)
+        self._reserve(capacity)
+
+        # Sorted series keys for vectorized lookup
+        self._sorted_keys = np.zeros(0, dtype=np.int64)
+        self._sorted_slots = np.zeros(0, dtype=np.int64)
+        self.recent_anomalies: Deque[Dict[str, Any]] = deque(maxlen=max_recent_anomalies)
+        self._lock = threading.Lock()
+
+        data_service.subscribe(self._on_change)
+
+    _COLUMNS = ("keys", "policy_id", "region", "metric", "count", "mean", "m2", "ewma", "last_ts", "target", "off_target")
+
+    def _reserve(self, capacity: int):
+        if capacity <= self.capacity:
+            return
+        capacity = max(capacity, self.capacity * 2)
+        for column in self._COLUMNS:
+            old = getattr(self, column)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, column, new)
+        self.capacity = capacity
+
+    def _targets(self, policy_ids: np.ndarray, metric_codes: np.ndarray) -> np.ndarray:
+        """Each series' target from its policy's target_metrics (NaN if none)"""
+        table = self.data_service.table
+        targets = np.full(len(policy_ids), np.nan)
+        lookups = [table.metric_vocab.lookup(name) for name in self.metric_names.names]
+        columns = np.array([-1 if column is None else column for column in lookups], dtype=np.int64)[metric_codes]
+        unique_ids, inverse = np.unique(policy_ids, return_inverse=True)
+        rows = np.array([table.row_of.get(policy_id, -1) for policy_id in unique_ids.tolist()], dtype=np.int64)[inverse]
+        found = (rows >= 0) & (columns >= 0)
+        targets[found] = table.metrics[rows[found], columns[found]]
+        return targets
+
+    def _slots(self, keys: np.ndarray, policy_ids: np.ndarray, region_codes: np.ndarray, metric_codes: np.ndarray) -> np.ndarray:
+        """Series slot for every observation, creating slots for new series"""
+        positions = np.searchsorted(self._sorted_keys, keys)
+        found = positions < len(self._sorted_keys)
+        found[found] = self._sorted_keys[positions[found]] == keys[found]
+        if not found.all():
+            new_keys, first = np.unique(keys[~found], return_index=True)
+            missing = np.flatnonzero(~found)[first]
+            start, count = self.size, len(new_keys)
+            self._reserve(start + count)
+            new = slice(start, start + count)
+            self.keys[new] = new_keys
+            self.policy_id[new] = policy_ids[missing]
+            self.region[new] = region_codes[missing]
+            self.metric[new] = metric_codes[missing]
+            self.target[new] = self._targets(policy_ids[missing], metric_codes[missing])
+            self.size += count
+            # Merge the (sorted) new keys into the sorted index
+            insert_at = np.searchsorted(self._sorted_keys, new_keys)
+            self._sorted_keys = np.insert(self._sorted_keys, insert_at, new_keys)
+            self._sorted_slots = np.insert(self._sorted_slots, insert_at, np.arange(start, start + count))
+            SERIES.set(self.size)
+            positions = np.searchsorted(self._sorted_keys, keys)
+        return self._sorted_slots[positions]
+
+    def ingest(
+        self,
+        policy_ids: np.ndarray,
+        regions: List[str],
+        metric_names: List[str],
+        timestamps: np.ndarray,
+        values: np.ndarray
+    ) -> Dict[str, Any]:
+        """Fold a batch of observations into the series statistics and report anomalies"""
+        policy_ids, in_range = self._policy_ids(policy_ids)
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64)
+
+        with self._lock, stage("observations.ingest"):
+            # Unknown or out-of-range policies and non-finite values are dropped
+            unique_ids, inverse = np.unique(policy_ids, return_inverse=True)
+            row_of = self.data_service.table.row_of
+            known = np.array([policy_id in row_of for policy_id in unique_ids.tolist()], dtype=bool)[inverse]
+            valid = in_range & known & np.isfinite(values) & np.isfinite(timestamps)
+            rejected = int((~valid).sum())
+            if rejected:
+                policy_ids, timestamps, values = policy_ids[valid], timestamps[valid], values[valid]
+            # Only names from accepted rows are added, and only once the whole batch is known to fit
+            region_names = self._distinct(regions, valid)
+            metric_names = self._distinct(metric_names, valid)
+            for vocabulary, (distinct, _) in ((self.regions, region_names), (self.metric_names, metric_names)):
+                added = sum(vocabulary.lookup(name) is None for name in distinct.tolist())
+                if len(vocabulary) + added > _CODE_LIMIT:
+                    raise ValueError(f"At most {_CODE_LIMIT} distinct regions and metrics")
+            region_codes = self._codes(self.regions, *region_names)
+            metric_codes = self._codes(self.metric_names, *metric_names)
+
+            keys = (policy_ids << (2 * _CODE_BITS)) | (region_codes.astype(np.int64) << _CODE_BITS) | metric_codes
+            slots = self._slots(keys, policy_ids, region_codes, metric_codes)
+            anomalies = self._update(slots, timestamps, values)
+
+        OBSERVATIONS.inc(len(values))
+        if rejected:
+            REJECTED.inc(rejected)
+        return {
+            "accepted": int(len(values)),
+            "rejected": rejected,
+            "series": self.size,
+            "anomaly_count": len(anomalies),
+            "anomalies": anomalies[:self.max_reported_anomalies]
+        }
+
+    @staticmethod
+    def _policy_ids(policy_ids) -> Tuple[np.ndarray, np.ndarray]:
+        """Policy ids as int64, and which of them a series key can hold (0 to _MAX_POLICY_ID)"""
+        try:
+            ids = np.asarray(policy_ids, dtype=np.int64)
+        except OverflowError:  # ids beyond int64; they cannot be known policies
+            ids = np.array([i if 0 <= i <= _MAX_POLICY_ID else -1 for i in policy_ids], dtype=np.int64)
+        return ids, (ids >= 0) & (ids <= _MAX_POLICY_ID)
+
+    @staticmethod
+    def _distinct(names: List[str], valid: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """The distinct names of the valid rows, and which of them each valid row has"""
+        # Batches repeat a few names many times, so each distinct name is only looked at once
+        distinct, inverse = np.unique(np.asarray(names, dtype=object)[valid], return_inverse=True)
+        return distinct, inverse.ravel()
+
+    @staticmethod
+    def _codes(vocabulary: Vocabulary, distinct: np.ndarray, inverse: np.ndarray) -> np.ndarray:
+        return np.array([vocabulary.code(name) for name in distinct.tolist()], dtype=np.int32)[inverse]
+
+    def _update(self, slots: np.ndarray, timestamps: np.ndarray, values: np.ndarray) -> List[Dict[str, Any]]:
+        if not len(values):
+            return []
+        order = np.lexsort((timestamps, slots))  # by series, then time
+        slots, timestamps, values = slots[order], timestamps[order], values[order]
+        touched, starts, batch_count = np.unique(slots, return_index=True, return_counts=True)
+        group = np.repeat(np.arange(len(touched)), batch_count)
+
+        count_a, mean_a, m2_a = self.count[touched], self.mean[touched], self.m2[touched]
+
+        # Outliers against each series' statistics before this batch
+        std_a = np.sqrt(m2_a / np.maximum(count_a - 1, 1))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            z = np.abs(values - mean_a[group]) / std_a[group]
+        outliers = np.flatnonzero((count_a[group] >= self.min_count) & (std_a[group] > 0) & (z > self.z_threshold))
+
+        # Chan et al.: merge the batch's count/mean/M2 into the running ones
+        batch_mean = np.bincount(group, weights=values) / batch_count
+        batch_m2 = np.bincount(group, weights=(values - batch_mean[group]) ** 2)
+        count = count_a + batch_count
+        delta = batch_mean - mean_a
+        self.mean[touched] = mean_a + delta * batch_count / count
+        self.m2[touched] = m2_a + batch_m2 + delta ** 2 * count_a * batch_count / count
+        self.count[touched] = count
+
+        # EWMA over the new points in order: decay^n * ewma + sum(alpha * decay^(n-1-i) * x_i)
+        alpha, decay = self.ewma_alpha, 1 - self.ewma_alpha
+        rank = np.arange(len(values)) - starts[group]
+        weights = alpha * decay ** (batch_count[group] - 1 - rank)
+        previous = np.where(count_a > 0, self.ewma[touched], values[starts])  # a new series starts at its first value
+        self.ewma[touched] = decay ** batch_count * previous + np.bincount(group, weights=weights * values)
+        self.last_ts[touched] = np.maximum(self.last_ts[touched], timestamps[starts + batch_count - 1])
+
+        # Off-target transitions: alert when a series' EWMA leaves the tolerance band around its target
+        target = self.target[touched]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            deviation = np.abs(self.ewma[touched] - target) / np.abs(target)
+        off = np.nan_to_num(deviation, nan=0.0) > self.target_tolerance
+        entered = np.flatnonzero(off & ~self.off_target[touched])
+        self.off_target[touched] = off
+
+        anomalies = []
+        for i in outliers.tolist():
+            slot = int(slots[i])
+            anomalies.append(self._anomaly("outlier", slot, timestamps[i], values[i], mean_a[group[i]], z[i]))
+        for j in entered.tolist():
+            slot = int(touched[j])
+            anomalies.append(self._anomaly("off_target", slot, self.last_ts[slot], self.ewma[slot], target[j], deviation[j]))
+        if len(outliers):
+            ANOMALIES.labels("outlier").inc(len(outliers))
+        if len(entered):
+            ANOMALIES.labels("off_target").inc(len(entered))
+        self.recent_anomalies.extend(anomalies)
+        return anomalies
+
+    def _anomaly(self, kind: str, slot: int, timestamp: float, value: float, expected: float, score: float) -> Dict[str, Any]:
+        return {
+            "kind": kind,
+            "policy_id": int(self.policy_id[slot]),
+            "region": self.regions.names[self.region[slot]],
+            "metric": self.metric_names.names[self.metric[slot]],
+            "timestamp": float(timestamp),
+            "value": round(float(value), 4),
+            "expected": round(float(expected), 4),
+            # z-score for outliers, relative deviation from target for off_target
+            "score": round(float(score), 4)
+        }
+
+    def _on_change(self, policy_ids: List[int]):
+        """Pick up edited target metrics for the changed policies' series"""
+        if not self.size:
+            return
+        with self._lock:
+            slots = np.flatnonzero(np.isin(self.policy_id[:self.size], policy_ids))
+            if len(slots):
+                self.target[slots] = self._targets(self.policy_id[slots], self.metric[slots])
+
+    def series(self, policy_id: int) -> List[Dict[str, Any]]:
+        """Current statistics of every series observed for a policy"""
+        with self._lock:
+            slots = np.flatnonzero(self.policy_id[:self.size] == policy_id)
+            count = self.count[slots]
+            variance = np.where(count > 1, self.m2[slots] / np.maximum(count - 1, 1), 0.0)
+            return [
+                {
+                    "region": self.regions.names[self.region[slot]],
+                    "metric": self.metric_names.names[self.metric[slot]],
+                    "count": int(self.count[slot]),
+                    "mean": round(float(self.mean[slot]), 4),
+                    "std": round(float(np.sqrt(variance[i])), 4),
+                    "ewma": round(float(self.ewma[slot]), 4),
+                    "target": None if np.isnan(self.target[slot]) else float(self.target[slot]),
+                    "off_target": bool(self.off_target[slot]),
+                    "last_timestamp": float(self.last_ts[slot])
+                }
+                for i, slot in enumerate(slots.tolist())
+            ]
+
+    def anomalies_for(self, policy_id: Optional[int] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Most recent anomalies first, optionally for one policy"""
+        with self._lock:
+            recent = [a for a in reversed(self.recent_anomalies) if policy_id is None or a["policy_id"] == policy_id]
+        return recent[:limit]
@@ -0,0 +1,504 @@
+import sys
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from app.models.schemas import Policy, PolicyStatus
+
+# Status enum codes, in PolicyStatus declaration order
+STATUSES: Tuple[PolicyStatus, ...] = tuple(PolicyStatus)
+STATUS_CODES: Dict[str, int] = {status.value: code for code, status in enumerate(STATUSES)}
+DRAFT = STATUS_CODES["draft"]
+ACTIVE = STATUS_CODES["active"]
+COMPLETED = STATUS_CODES["completed"]
+ARCHIVED = STATUS_CODES["archived"]
+
+# Sentinel end timestamp for open-ended policies
+NO_END = np.iinfo(np.int64).min
+
+SECONDS_PER_DAY = 86400
+
+
+def to_epoch(value: datetime) -> int:
+    return int(value.timestamp())
+
+
+def from_epoch(value: int) -> datetime:
+    return datetime.fromtimestamp(int(value))
+
+
+class Vocabulary:
+    """Interned strings with stable integer codes"""
+
+    def __init__(self, names: Iterable[str] = ()):
+        self.names: List[str] = []
+        self._codes: Dict[str, int] = {}
+        for name in names:
+            self.code(name)
+
+    def code(self, name: str) -> int:
+        """Get the code for a string, adding it if new"""
+        code = self._codes.get(name)
+        if code is None:
+            code = len(self.names)
+            name = sys.intern(name)
+            self.names.append(name)
+            self._codes[name] = code
+        return code
+
+    def lookup(self, name: str) -> Optional[int]:
+        """Get the code for a string without adding it"""
+        return self._codes.get(name)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+
+class StringColumn:
+    """Strings stored as one UTF-8 blob plus end offsets, e.g. memory-mapped from a snapshot.
+
+    The blob and offsets are never written to: strings set or appended
+    later are kept in a small overlay, so a writable copy of a mapped
+    table can share its arrays instead of decoding every string.
+    """
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self.blob = blob  # uint8
+        self.offsets = offsets  # int64 end offset of each string
+        self._changed: Dict[int, str] = {}  # row -> string set over the blob
+        self._appended: List[str] = []
+
+    @staticmethod
+    def encode(strings: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Encode strings into (blob, offsets) arrays"""
+        encoded = [s.encode() for s in strings]
+        offsets = np.cumsum([len(e) for e in encoded], dtype=np.int64)
+        return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+    @property
+    def modified(self) -> bool:
+        """Whether strings have been set or appended since the blob was built"""
+        return bool(self._changed or self._appended)
+
+    def __getitem__(self, row: int) -> str:
+        if self._changed or self._appended:
+            if row >= len(self.offsets):
+                return self._appended[row - len(self.offsets)]
+            if row in self._changed:
+                return self._changed[row]
+        start = int(self.offsets[row - 1]) if row else 0
+        return self.blob[start:int(self.offsets[row])].tobytes().decode()
+
+    def __setitem__(self, row: int, value: str):
+        if row >= len(self.offsets):
+            self._appended[row - len(self.offsets)] = value
+        else:
+            self._changed[row] = value
+
+    def append(self, value: str):
+        self._appended.append(value)
+
+    def __len__(self) -> int:
+        return len(self.offsets) + len(self._appended)
+
+    def take(self, rows: np.ndarray, chunk_rows: int = 65536) -> "StringColumn":
+        """A new column of the strings in `rows`, with the overlay folded into its blob"""
+        rows = np.asarray(rows, dtype=np.int64)
+        n = len(self.offsets)
+        if not self._changed and np.array_equal(rows, np.arange(len(self))):
+            if not self._appended:
+                return StringColumn(self.blob, self.offsets)
+            # Every row, only appended to: the blob is extended, not gathered
+            extra_blob, extra_offsets = StringColumn.encode(self._appended)
+            end = int(self.offsets[-1]) if n else 0
+            return StringColumn(
+                np.concatenate([self.blob[:end], extra_blob]), np.concatenate([self.offsets, end + extra_offsets])
+            )
+        starts = np.concatenate([np.zeros(1, dtype=np.int64), self.offsets[:-1]]) if n else np.zeros(0, dtype=np.int64)
+        lengths = self.offsets - starts
+        source = self.blob
+        if self.modified:
+            # Point overlay rows at their encoded bytes, placed after the blob
+            extra_rows = sorted(self._changed) + list(range(n, len(self)))
+            extra_blob, extra_offsets = StringColumn.encode([self[row] for row in extra_rows])
+            starts = np.concatenate([starts, np.zeros(len(self._appended), dtype=np.int64)])
+            lengths = np.concatenate([lengths, np.zeros(len(self._appended), dtype=np.int64)])
+            extra_lengths = np.diff(extra_offsets, prepend=0)
+            starts[extra_rows] = len(self.blob) + extra_offsets - extra_lengths
+            lengths[extra_rows] = extra_lengths
+            source = np.concatenate([self.blob, extra_blob])
+
+        taken_lengths = lengths[rows]
+        offsets = np.cumsum(taken_lengths, dtype=np.int64)
+        blob = np.empty(int(offsets[-1]) if len(offsets) else 0, dtype=np.uint8)
+        for first in range(0, len(rows), chunk_rows):
+            chunk = slice(first, first + chunk_rows)
+            chunk_lengths = taken_lengths[chunk]
+            out_start = int(offsets[first] - taken_lengths[first]) if len(chunk_lengths) else 0
+            out_ends = offsets[chunk] - out_start
+            # Byte i of the chunk comes from its string's source start plus its place in the string
+            shift = np.repeat(starts[rows[chunk]] - (out_ends - chunk_lengths), chunk_lengths)
+            blob[out_start:out_start + len(shift)] = source[np.arange(len(shift)) + shift]
+        return StringColumn(blob, offsets)
+
+
+class SortedRowIndex:
+    """Read-only id -> row mapping over sorted arrays, a dict stand-in that can be memory-mapped"""
+
+    def __init__(self, sorted_ids: np.ndarray, rows: np.ndarray):
+        self.sorted_ids = sorted_ids
+        self.rows = rows
+
+    @classmethod
+    def build(cls, ids: np.ndarray) -> "SortedRowIndex":
+        order = np.argsort(ids, kind="stable")
+        return cls(ids[order], order)
+
+    def get(self, policy_id: int, default: Optional[int] = None) -> Optional[int]:
+        i = int(np.searchsorted(self.sorted_ids, policy_id))
+        if i < len(self.sorted_ids) and self.sorted_ids[i] == policy_id:
+            return int(self.rows[i])
+        return default
+
+    def __contains__(self, policy_id: int) -> bool:
+        return self.get(policy_id) is not None
+
+    def __getitem__(self, policy_id: int) -> int:
+        row = self.get(policy_id)
+        if row is None:
+            raise KeyError(policy_id)
+        return row
+
+    def __len__(self) -> int:
+        return len(self.sorted_ids)
+
+
+class PolicyRecord:
+    """Compact, read-only view of one policy as stored in a PolicyTable"""
+
+    __slots__ = (
+        "id", "name", "description", "category", "budget", "status_code",
+        "start_ts", "end_ts", "created_ts", "updated_ts", "metric_names", "metric_values"
+    )
+
+    def __init__(self, id, name, description, category, budget, status_code,
+                 start_ts, end_ts, created_ts, updated_ts, metric_names, metric_values):
+        self.id = id
+        self.name = name
+        self.description = description
+        self.category = category
+        self.budget = budget
+        self.status_code = status_code
+        self.start_ts = start_ts
+        self.end_ts = end_ts  # None for open-ended policies
+        self.created_ts = created_ts
+        self.updated_ts = updated_ts
+        self.metric_names = metric_names
+        self.metric_values = metric_values
+
+    @property
+    def status(self) -> PolicyStatus:
+        return STATUSES[self.status_code]
+
+    @property
+    def start_date(self) -> datetime:
+        return from_epoch(self.start_ts)
+
+    @property
+    def end_date(self) -> Optional[datetime]:
+        return from_epoch(self.end_ts) if self.end_ts is not None else None
+
+    @property
+    def created_at(self) -> datetime:
+        return from_epoch(self.created_ts)
+
+    @property
+    def updated_at(self) -> datetime:
+        return from_epoch(self.updated_ts)
+
+    @property
+    def target_metrics(self) -> Dict[str, float]:
+        return dict(zip(self.metric_names, self.metric_values))
+
+    def to_policy(self) -> Policy:
+        """Convert to the API model; only done when building responses"""
+        return Policy.model_construct(
+            id=self.id,
+            name=self.name,
+            description=self.description,
+            category=self.category,
+            start_date=self.start_date,
+            end_date=self.end_date,
+            budget=self.budget,
+            target_metrics=self.target_metrics,
+            status=self.status,
+            created_at=self.created_at,
+            updated_at=self.updated_at
+        )
+
+
+class PolicyTable:
+    """Struct-of-arrays policy storage.
+
+    Numeric fields live in numpy columns, categories and metric names are
+    interned in shared vocabularies, statuses are small integer codes and
+    dates are epoch seconds. Target metrics are a dense matrix with one
+    column per known metric name and NaN where a policy has no target.
+    Deleted rows are tombstoned via the `alive` column.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.size = 0
+        self.capacity = 0
+        self.categories = Vocabulary()
+        self.metric_vocab = Vocabulary()
+        # Plain dict/lists while writable; SortedRowIndex/StringColumn when mapped from a snapshot
+        # (copies of a mapped table keep its StringColumns, which take writes in an overlay)
+        self.row_of: Dict[int, int] = {}
+        self.names: Union[List[str], StringColumn] = []
+        self.descriptions: Union[List[str], StringColumn] = []
+
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.budget = np.zeros(0, dtype=np.float64)
+        self.status = np.zeros(0, dtype=np.int8)
+        self.category = np.zeros(0, dtype=np.int32)
+        self.start_ts = np.zeros(0, dtype=np.int64)
+        self.end_ts = np.zeros(0, dtype=np.int64)
+        self.created_ts = np.zeros(0, dtype=np.int64)
+        self.updated_ts = np.zeros(0, dtype=np.int64)
+        self.alive = np.zeros(0, dtype=bool)
+        self.metrics = np.zeros((0, 0), dtype=np.float64)
+        self._reserve(capacity)
+
+    _COLUMNS = ("ids", "budget", "status", "category", "start_ts", "end_ts", "created_ts", "updated_ts", "alive")
+
+    def _reserve(self, capacity: int):
+        """Grow every column to at least `capacity` rows"""
+        if capacity <= self.capacity:
+            return
+        capacity = max(capacity, self.capacity * 2)
+        for column in self._COLUMNS:
+            old = getattr(self, column)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, column, new)
+        metrics = np.full((capacity, self.metrics.shape[1]), np.nan)
+        metrics[:self.size] = self.metrics[:self.size]
+        self.metrics = metrics
+        self.capacity = capacity
+
+    def _metric_column(self, name: str) -> int:
+        code = self.metric_vocab.code(name)
+        if code >= self.metrics.shape[1]:
+            extra = np.full((self.capacity, code + 1 - self.metrics.shape[1]), np.nan)
+            self.metrics = np.hstack([self.metrics, extra])
+        return code
+
+    def __len__(self) -> int:
+        return len(self.row_of)
+
+    def append(self, policy) -> int:
+        """Append a Policy (or any object with the same fields) and return its row"""
+        self._reserve(self.size + 1)
+        row = self.size
+        self.size += 1
+        self.names.append(policy.name)
+        self.descriptions.append(sys.intern(policy.description))
+        self._write(row, policy)
+        self.row_of[policy.id] = row
+        return row
+
+    def update(self, row: int, policy):
+        """Overwrite a row in place with new field values"""
+        self.names[row] = policy.name
+        self.descriptions[row] = sys.intern(policy.description)
+        self._write(row, policy)
+
+    def delete(self, policy_id: int) -> Optional[int]:
+        """Tombstone a policy's row; returns the row, or None if unknown"""
+        row = self.row_of.pop(policy_id, None)
+        if row is not None:
+            self.alive[row] = False
+        return row
+
+    def _write(self, row: int, policy):
+        self.ids[row] = policy.id
+        self.budget[row] = policy.budget
+        self.status[row] = STATUS_CODES[PolicyStatus(policy.status).value]
+        self.category[row] = self.categories.code(policy.category)
+        self.start_ts[row] = to_epoch(policy.start_date)
+        self.end_ts[row] = to_epoch(policy.end_date) if policy.end_date else NO_END
+        self.created_ts[row] = to_epoch(policy.created_at)
+        self.updated_ts[row] = to_epoch(policy.updated_at)
+        self.alive[row] = True
+        self.metrics[row] = np.nan
+        for name, value in policy.target_metrics.items():
+            column = self._metric_column(name)  # may grow (replace) the matrix
+            self.metrics[row, column] = value
+
+    @classmethod
+    def from_columns(
+        cls,
+        ids: np.ndarray,
+        names: Union[Sequence[str], StringColumn],
+        descriptions: Union[Sequence[str], StringColumn],
+        categories: Sequence[str],
+        category_codes: np.ndarray,
+        status_codes: np.ndarray,
+        budget: np.ndarray,
+        start_ts: np.ndarray,
+        end_ts: np.ndarray,
+        created_ts: np.ndarray,
+        updated_ts: np.ndarray,
+        metric_names: Sequence[str],
+        metric_values: np.ndarray
+    ) -> "PolicyTable":
+        """Bulk-build a table from columns (category_codes index into categories); StringColumns are kept as they are"""
+        n = len(ids)
+        table = cls(capacity=max(n, 1))
+        table.size = n
+        for name in categories:
+            table.categories.code(name)
+        for name in metric_names:
+            table.metric_vocab.code(name)
+        table.names = names if isinstance(names, StringColumn) else list(names)
+        table.descriptions = descriptions if isinstance(descriptions, StringColumn) else [sys.intern(d) for d in descriptions]
+        table.ids[:n] = ids
+        table.budget[:n] = budget
+        table.status[:n] = status_codes
+        table.category[:n] = category_codes
+        table.start_ts[:n] = start_ts
+        table.end_ts[:n] = end_ts
+        table.created_ts[:n] = created_ts
+        table.updated_ts[:n] = updated_ts
+        table.alive[:n] = True
+        table.metrics = np.full((table.capacity, len(metric_names)), np.nan)
+        table.metrics[:n] = metric_values
+        table.row_of = dict(zip(ids.tolist(), range(n)))
+        return table
+
+    def copy(self) -> "PolicyTable":
+        """Writable in-memory copy of the live rows (compacts away tombstones)"""
+        rows = self.alive_rows()
+        return PolicyTable.from_columns(
+            ids=self.ids[rows],
+            names=self._take_strings(self.names, rows),
+            descriptions=self._take_strings(self.descriptions, rows),
+            categories=self.categories.names,
+            category_codes=self.category[rows],
+            status_codes=self.status[rows],
+            budget=self.budget[rows],
+            start_ts=self.start_ts[rows],
+            end_ts=self.end_ts[rows],
+            created_ts=self.created_ts[rows],
+            updated_ts=self.updated_ts[rows],
+            metric_names=self.metric_vocab.names,
+            metric_values=self.metrics[rows]
+        )
+
+    @staticmethod
+    def _take_strings(strings: Union[List[str], StringColumn], rows: np.ndarray) -> Union[List[str], StringColumn]:
+        if isinstance(strings, StringColumn):
+            return strings.take(rows)  # stays encoded; copies no more than the blob
+        return [strings[row] for row in rows.tolist()]
+
+    def merged(self, changes: "PolicyTable", deleted_ids: Sequence[int]) -> "PolicyTable":
+        """Writable copy of the live rows with `changes`' policies upserted and `deleted_ids` removed
+
+        Updated policies keep their position; new ones are appended in the order of `changes`.
+        """
+        rows = self.alive_rows()
+        if len(deleted_ids):
+            rows = rows[~np.isin(self.ids[rows], np.asarray(deleted_ids, dtype=np.int64))]
+        ids = self.ids[rows]
+        kept = len(ids)
+        change_rows = changes.alive_rows()
+        change_ids = changes.ids[change_rows]
+
+        # Position of each changed policy in the merged table: its current one among the kept rows, or appended
+        old_rows = np.array([self.row_of.get(policy_id, -1) for policy_id in change_ids.tolist()], dtype=np.int64)
+        pos = np.minimum(np.searchsorted(rows, old_rows), max(kept - 1, 0))
+        found = (rows[pos] == old_rows) if kept else np.zeros(len(change_ids), dtype=bool)
+        target = np.where(found, pos, kept + np.cumsum(~found) - 1)
+        n = kept + int((~found).sum())
+
+        def column(name: str) -> np.ndarray:
+            values = np.empty(n, dtype=getattr(self, name).dtype)
+            values[:kept] = getattr(self, name)[rows]
+            values[target] = getattr(changes, name)[change_rows]
+            return values
+
+        categories = Vocabulary(self.categories.names)
+        category_map = np.array([categories.code(name) for name in changes.categories.names], dtype=np.int32)
+        category_codes = column("category")
+        category_codes[target] = category_map[changes.category[change_rows]] if len(category_map) else 0
+
+        own_metrics = self.metrics.shape[1]
+        metric_vocab = Vocabulary(self.metric_vocab.names[:own_metrics])
+        metric_map = np.array(
+            [metric_vocab.code(name) for name in changes.metric_vocab.names[:changes.metrics.shape[1]]], dtype=np.int64
+        )
+        metric_values = np.full((n, len(metric_vocab)), np.nan)
+        metric_values[:kept, :own_metrics] = self.metrics[rows]
+        metric_values[target] = np.nan
+        metric_values[target[:, None], metric_map] = changes.metrics[change_rows]
+
+        names = [self.names[row] for row in rows.tolist()] + [""] * (n - kept)
+        descriptions = [self.descriptions[row] for row in rows.tolist()] + [""] * (n - kept)
+        for position, row in zip(target.tolist(), change_rows.tolist()):
+            names[position] = changes.names[row]
+            descriptions[position] = changes.descriptions[row]
+
+        return PolicyTable.from_columns(
+            ids=column("ids"),
+            names=names,
+            descriptions=descriptions,
+            categories=categories.names,
+            category_codes=category_codes,
+            status_codes=column("status"),
+            budget=column("budget"),
+            start_ts=column("start_ts"),
+            end_ts=column("end_ts"),
+            created_ts=column("created_ts"),
+            updated_ts=column("updated_ts"),
+            metric_names=metric_vocab.names,
+            metric_values=metric_values
+        )
+
+    def alive_rows(self) -> np.ndarray:
+        """Row indices of live policies, in insertion order"""
+        return np.flatnonzero(self.alive[:self.size])
+
+    def record(self, row: int) -> PolicyRecord:
+        """Materialize the compact record for a row"""
+        return self.records([row])[0]
+
+    def records(self, rows: Iterable[int]) -> List[PolicyRecord]:
+        """Materialize records for many rows, reading each column once"""
+        rows = np.asarray(rows, dtype=np.int64)
+        category_names = self.categories.names
+        names, descriptions = self.names, self.descriptions
+        metrics = self.metrics[rows]
+        present = ~np.isnan(metrics)
+        vocab = tuple(self.metric_vocab.names)
+        # Rows holding every known metric share one names tuple
+        complete = present.all(axis=1).tolist()
+        columns = zip(
+            self.ids[rows].tolist(), rows.tolist(), self.category[rows].tolist(), self.budget[rows].tolist(),
+            self.status[rows].tolist(), self.start_ts[rows].tolist(), self.end_ts[rows].tolist(),
+            self.created_ts[rows].tolist(), self.updated_ts[rows].tolist(), metrics.tolist(), complete
+        )
+        records = []
+        for i, (policy_id, row, category, budget, status, start, end, created, updated, values, full) in enumerate(columns):
+            if full:
+                metric_names, metric_values = vocab, tuple(values)
+            else:
+                columns_present = np.flatnonzero(present[i]).tolist()
+                metric_names = tuple(vocab[j] for j in columns_present)
+                metric_values = tuple(values[j] for j in columns_present)
+            records.append(PolicyRecord(
+                policy_id, names[row], descriptions[row], category_names[category], budget, status,
+                start, None if end == NO_END else end, created, updated, metric_names, metric_values
+            ))
+        return records
@@ -0,0 +1,174 @@
+import heapq
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+
+from app.services.analytics_cache import AnalyticsCache
+from app.services.data_service import DataService
+from app.services.impact_analyzer import ImpactAnalyzer
+from app.services.metrics import metrics
+from app.services.policy_store import ACTIVE
+from app.services.recommendation_engine import RecommendationEngine
+from app.services.report_generator import ReportGenerator
+from app.services.risk_predictor import RiskPredictor
+
+PRECOMPUTE_FAILURES = metrics.counter(
+    "precompute_failures_total", "Changed policies whose analytics could not be recomputed and were skipped"
+)
+PRECOMPUTE_ERRORS = metrics.counter("precompute_errors_total", "Scheduler loop iterations that failed and backed off")
+
+
+class PrecomputeScheduler:
+    """Background worker that recomputes analytics for changed policies and warms the cache"""
+
+    def __init__(
+        self,
+        data_service: DataService,
+        impact_analyzer: ImpactAnalyzer,
+        risk_predictor: RiskPredictor,
+        recommendation_engine: RecommendationEngine,
+        report_generator: ReportGenerator,
+        cache: AnalyticsCache,
+        batch_size: int = 50,
+        max_policies_per_second: float = 200,
+        poll_interval: float = 5.0
+    ):
+        self.data_service = data_service
+        self.impact_analyzer = impact_analyzer
+        self.risk_predictor = risk_predictor
+        self.recommendation_engine = recommendation_engine
+        self.report_generator = report_generator
+        self.cache = cache
+        self.batch_size = batch_size
+        self.max_policies_per_second = max_policies_per_second
+        self.poll_interval = poll_interval
+
+        self._seen_version = 0
+        self._queue: List[Tuple[int, float, int]] = []  # (priority, changed_at, policy_id)
+        self._pending: Dict[int, float] = {}  # policy_id -> earliest unwarmed change time
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.warmed_policies = 0
+        self.failed_policies = 0
+        self.last_freshness_lag = 0.0
+        self.max_freshness_lag = 0.0
+
+        data_service.subscribe(self._on_change)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="precompute-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+
+    def status(self) -> Dict[str, Any]:
+        """Report queue depth and how far warmed results lag behind data changes"""
+        now = time.time()
+        oldest_pending = min(self._pending.values(), default=None)
+        return {
+            "data_version": self.data_service.version,
+            "seen_version": self._seen_version,
+            "pending_policies": len(self._pending),
+            "warmed_policies": self.warmed_policies,
+            "failed_policies": self.failed_policies,
+            "current_freshness_lag_seconds": round(now - oldest_pending, 3) if oldest_pending else 0.0,
+            "last_freshness_lag_seconds": round(self.last_freshness_lag, 3),
+            "max_freshness_lag_seconds": round(self.max_freshness_lag, 3),
+            "cache": self.cache.stats()
+        }
+
+    def _on_change(self, policy_ids: List[int]):
+        self._wakeup.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._collect_changes()
+                if not self._queue:
+                    self._wakeup.wait(self.poll_interval)
+                    self._wakeup.clear()
+                    continue
+
+                started = time.monotonic()
+                warmed = self._warm_next_batch()
+            except Exception:
+                PRECOMPUTE_ERRORS.inc()  # back off, then carry on with whatever is still queued
+                self._stop.wait(self.poll_interval)
+                continue
+            # Rate limit: never exceed max_policies_per_second on average
+            budget = warmed / self.max_policies_per_second
+            remaining = budget - (time.monotonic() - started)
+            if remaining > 0:
+                self._stop.wait(remaining)
+
+    def _collect_changes(self):
+        """Move newly changed policies onto the priority queue, active policies first"""
+        changes = self.data_service.get_changes_since(self._seen_version)
+        if not changes:
+            return
+        self._seen_version = max(self._seen_version, max(version for version, _, _ in changes))
+
+        for _, policy_id, changed_at in changes:
+            if policy_id in self._pending:
+                continue
+            policy = self.data_service.get_policy(policy_id)
+            if policy is None:
+                continue
+            priority = 0 if policy.status_code == ACTIVE else 1
+            self._pending[policy_id] = changed_at
+            heapq.heappush(self._queue, (priority, changed_at, policy_id))
+
+    def _warm_next_batch(self) -> int:
+        """Recompute impact, risk, recommendations and report for the next batch of dirty policies"""
+        batch = []
+        while self._queue and len(batch) < self.batch_size:
+            _, _, policy_id = heapq.heappop(self._queue)
+            policy = self.data_service.get_policy(policy_id)
+            if policy is None:
+                self._pending.pop(policy_id, None)
+                continue
+            batch.append((policy, self.data_service.get_policy_version(policy_id)))
+        if not batch:
+            return 0
+
+        try:
+            results = list(zip(*self._compute([policy for policy, _ in batch])))
+        except Exception:
+            # Find the policies that fail one at a time, so the rest of the batch is still warmed
+            results = []
+            for policy, _ in batch:
+                try:
+                    results.append(tuple(values[0] for values in self._compute([policy])))
+                except Exception:
+                    results.append(None)
+
+        now = time.time()
+        for (policy, version), result in zip(batch, results):
+            changed_at = self._pending.pop(policy.id, now)
+            if result is None:
+                # Dropped until the policy changes again; retrying the same version would fail the same way
+                PRECOMPUTE_FAILURES.inc()
+                self.failed_policies += 1
+                continue
+            impact, risk, recommendations, report = result
+            self.cache.put("impact", policy.id, version, impact)
+            self.cache.put("risk", policy.id, version, risk)
+            self.cache.put("recommendations", policy.id, version, recommendations)
+            self.cache.put("report", policy.id, version, report)
+
+            self.last_freshness_lag = now - changed_at
+            self.max_freshness_lag = max(self.max_freshness_lag, self.last_freshness_lag)
+            self.warmed_policies += 1
+        return len(batch)
+
+    def _compute(self, policies: List) -> Tuple[List, List, List, List]:
+        """Impact, risk, recommendations and report for each policy"""
+        impacts = self.impact_analyzer.analyze_batch(policies)
+        risks = self.risk_predictor.predict_batch(policies)
+        recommendations = self.recommendation_engine.generate_batch(policies)
+        return impacts, risks, recommendations, self.report_generator.generate_batch(policies, impacts, risks, recommendations)
@@ -0,0 +1,257 @@
+import os
+import sys
+from contextvars import Context, ContextVar
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# A frame is identified by (function, file, line of definition)
+Frame = Tuple[str, str, int]
+
+# Leaf frames in these modules mean the thread is parked, not working
+_IDLE_MODULES = ("threading.py", "selectors.py", "queue.py")
+
+# The profile of the request running in this context; calls the request hands to
+# a thread pool (run_in_threadpool) run in a copy of its context and so carry it too
+_current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("current_profile", default=None)
+
+
+class StackSampler:
+    """Samples the Python stacks of one request at a fixed interval.
+
+    Only stacks doing the request's work are kept: the event loop thread
+    while it runs inside the request's coroutine (`root_frame`), so other
+    requests' coroutines interleaved on the loop are left out, and worker
+    threads running a call the request handed off in its context. Each
+    sample is weighted by the time measured since the previous one: the
+    sampler thread needs the GIL to take a sample, so while the request
+    computes it samples only every switch interval (5ms by default), not
+    every `interval`.
+
+    Stopping only signals the sampler thread, so the event loop never
+    waits for it; once its last sample is in, the thread calls `on_stop`.
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.001,
+        root_frame=None,
+        loop_thread: Optional[int] = None,
+        marker: Any = None,
+        on_stop: Optional[Callable[["StackSampler"], None]] = None
+    ):
+        self.interval = interval
+        self.root_frame = root_frame
+        self.loop_thread = loop_thread
+        self.marker = marker
+        self.on_stop = on_stop
+        self.stacks: Counter = Counter()  # stack -> sampled seconds
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def join(self, timeout: Optional[float] = None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        try:
+            self._sample()
+        finally:
+            if self.on_stop is not None:
+                self.on_stop(self)
+
+    def _sample(self):
+        own_id = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        previous = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            elapsed, previous = now - previous, now
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id or not self._in_request(thread_id, frame):
+                    continue
+                stack = self._walk(frame)
+                if not stack or stack[-1][1].endswith(_IDLE_MODULES):
+                    continue
+                if thread_id not in names:  # e.g. a pool worker started since
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                thread_name = names.get(thread_id) or f"thread-{thread_id}"
+                self.stacks[((thread_name, "", 0),) + stack] += elapsed
+            self.samples += 1
+
+    def _in_request(self, thread_id: int, frame) -> bool:
+        """Whether a thread's current stack is working for the profiled request"""
+        if thread_id == self.loop_thread:
+            while frame is not None:
+                if frame is self.root_frame:
+                    return True
+                frame = frame.f_back
+            return False
+        if self.marker is None:
+            return self.root_frame is None
+        # A pool worker runs each call via context.run from the bottom frames of its stack
+        frames = []
+        while frame is not None:
+            frames.append(frame)
+            frame = frame.f_back
+        for outer in frames[-4:]:
+            for value in outer.f_locals.values():
+                if isinstance(value, Context) and value.get(_current_profile) is self.marker:
+                    return True
+        return False
+
+    @staticmethod
+    def _walk(frame) -> Tuple[Frame, ...]:
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+            frame = frame.f_back
+        stack.reverse()
+        return tuple(stack)
+
+
+class RequestProfile:
+    """A captured profile of one request"""
+
+    def __init__(self, method: str, path: str, interval: float):
+        self.id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.route: Optional[str] = None
+        self.status: Optional[int] = None
+        self.interval = interval
+        self.started_at = datetime.now()
+        self._start = time.perf_counter()
+        self.duration_ms = 0.0
+        self.samples = 0
+        self.stacks: Counter = Counter()  # stack -> sampled seconds
+        self._token = None
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status": self.status,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round(self.duration_ms, 3),
+            "samples": self.samples
+        }
+
+    def to_collapsed(self) -> str:
+        """Brendan Gregg's collapsed-stack format, as consumed by flamegraph.pl and speedscope, weighted in microseconds"""
+        lines = []
+        for stack, seconds in self.stacks.most_common():
+            lines.append(";".join(_frame_label(frame) for frame in stack) + f" {max(1, round(seconds * 1e6))}")
+        return "\n".join(lines) + "\n"
+
+    def to_speedscope(self) -> Dict[str, Any]:
+        """Speedscope's sampled-profile JSON format"""
+        frame_index: Dict[Frame, int] = {}
+        frames = []
+        samples = []
+        weights = []
+        for stack, seconds in self.stacks.items():
+            indices = []
+            for frame in stack:
+                if frame not in frame_index:
+                    frame_index[frame] = len(frames)
+                    name, file, line = frame
+                    frames.append({"name": name, "file": file, "line": line} if file else {"name": name})
+                indices.append(frame_index[frame])
+            samples.append(indices)
+            weights.append(round(seconds * 1000, 3))
+
+        name = f"{self.method} {self.path}"
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "policy-analytics-profiler",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights
+            }]
+        }
+
+
+def _frame_label(frame: Frame) -> str:
+    name, file, line = frame
+    if not file:
+        return name
+    return f"{name} ({os.path.basename(file)}:{line})"
+
+
+class RequestProfiler:
+    """Opt-in request profiler keeping the most recent profiles in a ring buffer"""
+
+    def __init__(self, admin_token: Optional[str] = None, sample_rate: float = 0.0, interval: float = 0.001, max_profiles: int = 50):
+        self.admin_token = admin_token
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.profiles: "deque[RequestProfile]" = deque(maxlen=max_profiles)
+        self._busy = threading.Lock()
+        self._counter = 0
+
+    def is_admin(self, token: Optional[str]) -> bool:
+        return bool(self.admin_token) and token == self.admin_token
+
+    def should_profile(self, header_token: Optional[str]) -> bool:
+        """Profile when an admin explicitly asks for it, or for a sampled share of requests"""
+        if header_token is not None and self.is_admin(header_token):
+            return True
+        if self.sample_rate <= 0:
+            return False
+        self._counter += 1
+        return self._counter % max(1, round(1 / self.sample_rate)) == 0
+
+    def begin(self, method: str, path: str, root_frame) -> Optional[Tuple[RequestProfile, StackSampler]]:
+        """Start sampling a request whose coroutine runs in `root_frame`, on this thread's event loop,
+        unless another profile is already being captured. Call end from the same coroutine."""
+        if not self._busy.acquire(blocking=False):
+            return None
+        profile = RequestProfile(method, path, self.interval)
+        profile._token = _current_profile.set(profile)
+        sampler = StackSampler(
+            self.interval, root_frame, threading.get_ident(), profile,
+            on_stop=lambda stopped: self._collect(profile, stopped)
+        )
+        sampler.start()
+        return profile, sampler
+
+    def end(self, profile: RequestProfile, sampler: StackSampler):
+        """Stop sampling without waiting; the profile is listed once the sampler has finished"""
+        _current_profile.reset(profile._token)
+        profile.duration_ms = (time.perf_counter() - profile._start) * 1000
+        sampler.stop()
+
+    def _collect(self, profile: RequestProfile, sampler: StackSampler):
+        """Runs on the sampler thread after its last sample"""
+        profile.stacks = sampler.stacks
+        profile.samples = sampler.samples
+        self.profiles.append(profile)
+        self._busy.release()
+
+    def list(self) -> List[Dict[str, Any]]:
+        return [p.summary() for p in reversed(self.profiles)]
+
+    def get(self, profile_id: str) -> Optional[RequestProfile]:
+        return next((p for p in self.profiles if p.id == profile_id), None)
@@ -1,15 +1,20 @@
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 
-from app.models.schemas import Policy, Recommendation, RiskLevel
+from app.models.schemas import Recommendation, RiskLevel
+from app.services.metrics import timed
+from app.services.policy_store import PolicyRecord, DRAFT, SECONDS_PER_DAY, to_epoch
 
 class RecommendationEngine:
     def __init__(self):
         pass
     
-    def generate(self, policy: Policy) -> List[Recommendation]:
+    @timed("recommendations.generate")
+    def generate(self, policy: PolicyRecord, now: Optional[datetime] = None) -> List[Recommendation]:
         """Generate recommendations for a policy"""
         recommendations = []
+        now_ts = to_epoch(now or datetime.now())
+        metrics_count = len(policy.metric_values)
         
         # Budget recommendations
         if policy.budget > 2000000:
@@ -32,8 +37,8 @@ class RecommendationEngine:
             ))
         
         # Timeline recommendations
-        if policy.end_date:
-            days_remaining = (policy.end_date - datetime.now()).days
+        if policy.end_ts is not None:
+            days_remaining = (policy.end_ts - now_ts) // SECONDS_PER_DAY
             if days_remaining < 60:
                 recommendations.append(Recommendation(
                     title="Extend Timeline or Prioritize Deliverables",
@@ -45,7 +50,7 @@ class RecommendationEngine:
                 ))
         
         # Metrics recommendations
-        if len(policy.target_metrics) == 0:
+        if metrics_count == 0:
             recommendations.append(Recommendation(
                 title="Define Clear Success Metrics",
                 description="No target metrics defined. Establish measurable KPIs to track policy effectiveness.",
@@ -54,10 +59,10 @@ class RecommendationEngine:
                 expected_impact="Enable data-driven decision making and impact measurement",
                 implementation_effort="medium"
             ))
-        elif len(policy.target_metrics) > 4:
+        elif metrics_count > 4:
             recommendations.append(Recommendation(
                 title="Focus on Key Metrics",
-                description=f"Too many metrics ({len(policy.target_metrics)}) may dilute focus. Prioritize 2-3 critical KPIs.",
+                description=f"Too many metrics ({metrics_count}) may dilute focus. Prioritize 2-3 critical KPIs.",
                 priority="medium",
                 category="strategy",
                 expected_impact="Improve clarity and focus on most important outcomes",
@@ -94,7 +99,7 @@ class RecommendationEngine:
             ))
         
         # Status-based recommendations
-        if policy.status.value == "draft":
+        if policy.status_code == DRAFT:
             recommendations.append(Recommendation(
                 title="Finalize Policy Design",
                 description="Complete policy design and stakeholder alignment before activation.",
@@ -117,7 +122,12 @@ class RecommendationEngine:
         
         return recommendations
     
-    def generate_regional_recommendations(self, policy: Policy, regional_impacts: dict) -> dict:
+    def generate_batch(self, policies: List[PolicyRecord]) -> List[List[Recommendation]]:
+        """Generate recommendations for many policies against a shared clock"""
+        now = datetime.now()
+        return [self.generate(policy, now) for policy in policies]
+    
+    def generate_regional_recommendations(self, policy: PolicyRecord, regional_impacts: dict) -> dict:
         """Generate region-specific recommendations"""
         regional_recs = {}
         
@@ -148,7 +158,7 @@ class RecommendationEngine:
         
         return regional_recs
     
-    def generate_budget_optimization_recommendations(self, policy: Policy, regional_data: dict) -> List[Recommendation]:
+    def generate_budget_optimization_recommendations(self, policy: PolicyRecord, regional_data: dict) -> List[Recommendation]:
         """Generate budget optimization recommendations based on regional performance"""
         recs = []
         
@@ -2,17 +2,20 @@ from datetime import datetime
 from typing import Dict, Any, List
 
 from app.models.schemas import (
-    Policy, ImpactAnalysis, RiskPrediction, 
+    ImpactAnalysis, RiskPrediction, 
     Recommendation, ExecutiveReport
 )
+from app.services.metrics import timed
+from app.services.policy_store import PolicyRecord
 
 class ReportGenerator:
     def __init__(self):
         pass
     
+    @timed("report.generate")
     def generate(
         self, 
-        policy: Policy, 
+        policy: PolicyRecord, 
         impact: ImpactAnalysis, 
         risk: RiskPrediction,
         recommendations: List[Recommendation]
@@ -49,9 +52,22 @@ class ReportGenerator:
             generated_at=datetime.now()
         )
     
+    def generate_batch(
+        self,
+        policies: List[PolicyRecord],
+        impacts: List[ImpactAnalysis],
+        risks: List[RiskPrediction],
+        recommendations: List[List[Recommendation]]
+    ) -> List[ExecutiveReport]:
+        """Generate executive reports for many policies"""
+        return [
+            self.generate(policy, impact, risk, recs)
+            for policy, impact, risk, recs in zip(policies, impacts, risks, recommendations)
+        ]
+    
     def _generate_executive_summary(
         self, 
-        policy: Policy, 
+        policy: PolicyRecord, 
         impact: ImpactAnalysis, 
         risk: RiskPrediction,
         recommendations: List[Recommendation]
@@ -0,0 +1,161 @@
+from typing import Dict, Sequence, Tuple
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+# Arrays that fully describe a ForestAttribution, e.g. for a memory-mapped snapshot
+ARRAY_NAMES = (
+    "left", "right", "feature", "threshold", "roots", "node_proba", "node_contributions", "classes", "bias"
+)
+
+# Above this many (sample, tree) pairs, traverse tree by tree
+WHOLE_FOREST_BATCH = 100000
+
+
+class ForestAttribution:
+    """A random forest flattened into node arrays, with path-dependent (Saabas) feature contributions.
+
+    All trees share one set of node arrays (children as global node
+    indices, -1 at leaves), so a batch is routed through every tree at
+    once, one tree level per vectorized step, without sklearn.
+
+    Along a decision path every split moves the node's risk severity (the
+    class-weighted probability) from the parent's value to the child's;
+    the change is credited to the split feature. Summing those changes
+    for every node once up front means a policy's contributions are just
+    a gather at the leaves it lands in, so one traversal yields both class
+    probabilities and attributions. For each policy, bias +
+    contributions.sum() equals its predicted severity.
+    """
+
+    def __init__(
+        self,
+        left: np.ndarray,
+        right: np.ndarray,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        roots: np.ndarray,
+        node_proba: np.ndarray,
+        node_contributions: np.ndarray,
+        classes: np.ndarray,
+        bias: float
+    ):
+        self.left = left
+        self.right = right
+        self.feature = feature
+        self.threshold = threshold
+        self.roots = roots
+        self.node_proba = node_proba
+        self.node_contributions = node_contributions
+        self.classes = classes
+        self.bias = np.asarray(bias, dtype=np.float64).item()  # a Python float, also from a stored array
+
+        # sklearn routes float32 inputs by `x <= threshold` in float64; rounding each threshold
+        # down to the nearest float32 gives the same routing while comparing in float32
+        threshold32 = threshold.astype(np.float32)
+        rounded_up = threshold32.astype(np.float64) > threshold
+        threshold32[rounded_up] = np.nextafter(threshold32[rounded_up], np.float32(-np.inf))
+        self.threshold32 = threshold32
+
+    @classmethod
+    def from_model(cls, model: RandomForestClassifier, class_weights: Sequence[float]) -> "ForestAttribution":
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        roots = np.cumsum([0] + [tree.node_count for tree in trees[:-1]]).astype(np.int64)
+        weights = np.asarray(class_weights, dtype=np.float64)
+
+        left, right, feature, threshold, probas, contributions = [], [], [], [], [], []
+        for tree, root in zip(trees, roots.tolist()):
+            proba, contribution = cls._tree_tables(tree, weights, model.n_features_in_)
+            is_leaf = tree.children_left == -1
+            left.append(np.where(is_leaf, -1, tree.children_left + root))
+            right.append(np.where(is_leaf, -1, tree.children_right + root))
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(tree.threshold)
+            probas.append(proba)
+            contributions.append(contribution)
+
+        return cls(
+            left=np.concatenate(left).astype(np.int64),
+            right=np.concatenate(right).astype(np.int64),
+            feature=np.concatenate(feature).astype(np.int64),
+            threshold=np.concatenate(threshold),
+            roots=roots,
+            node_proba=np.concatenate(probas),
+            node_contributions=np.concatenate(contributions),
+            classes=np.asarray(model.classes_),
+            bias=float(np.mean([proba[0] @ weights for proba in probas]))
+        )
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "ForestAttribution":
+        return cls(**{name: arrays[name] for name in ARRAY_NAMES})
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {name: np.asarray(getattr(self, name)) for name in ARRAY_NAMES}
+
+    @staticmethod
+    def _tree_tables(tree, weights: np.ndarray, n_features: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Per-node class probabilities and cumulative feature contributions for one tree"""
+        value = tree.value[:, 0, :]
+        proba = value / value.sum(axis=1, keepdims=True)
+        severity = proba @ weights
+
+        contributions = np.zeros((tree.node_count, n_features))
+        left, right, feature = tree.children_left, tree.children_right, tree.feature
+        # Walk the tree level by level, each level in one vectorized step
+        frontier = np.array([0])
+        while len(frontier):
+            parents = frontier[left[frontier] != -1]
+            if not len(parents):
+                break
+            for children in (left[parents], right[parents]):
+                contributions[children] = contributions[parents]
+                contributions[children, feature[parents]] += severity[children] - severity[parents]
+            frontier = np.concatenate([left[parents], right[parents]])
+        return proba, contributions
+
+    def leaves(self, X: np.ndarray) -> np.ndarray:
+        """Global node index of the leaf each sample reaches in each tree, shape (n_samples, n_trees)"""
+        X = np.asarray(X, dtype=np.float32)
+        if len(X) * len(self.roots) <= WHOLE_FOREST_BATCH:
+            return self._leaves_whole_forest(X)
+        return self._leaves_by_tree(X)
+
+    def _leaves_whole_forest(self, X: np.ndarray) -> np.ndarray:
+        """Route every (sample, tree) pair together; fewest numpy calls, best for small batches"""
+        n_samples, n_features = X.shape
+        n_trees = len(self.roots)
+        nodes = np.tile(self.roots, n_samples)
+        offsets = np.repeat(np.arange(n_samples) * n_features, n_trees)
+        values = X.ravel()
+        pending = np.flatnonzero(self.left[nodes] != -1)
+        while len(pending):
+            current = nodes[pending]
+            go_left = values[offsets[pending] + self.feature[current]] <= self.threshold32[current]
+            nodes[pending] = np.where(go_left, self.left[current], self.right[current])
+            pending = pending[self.left[nodes[pending]] != -1]
+        return nodes.reshape(n_samples, n_trees)
+
+    def _leaves_by_tree(self, X: np.ndarray) -> np.ndarray:
+        """Route all samples one tree at a time, keeping the working set small for large batches"""
+        n_samples = len(X)
+        values = np.ascontiguousarray(X.T).ravel()  # feature-major, so a split reads one row
+        feature_offsets = self.feature * n_samples
+        out = np.empty((len(self.roots), n_samples), dtype=np.int64)
+        for tree, root in enumerate(self.roots.tolist()):
+            nodes = out[tree]
+            nodes[:] = root
+            pending = np.arange(n_samples) if self.left[root] != -1 else np.arange(0)
+            while len(pending):
+                current = nodes[pending]
+                go_left = values[feature_offsets[current] + pending] <= self.threshold32[current]
+                nodes[pending] = np.where(go_left, self.left[current], self.right[current])
+                pending = pending[self.left[nodes[pending]] != -1]
+        return out.T
+
+    def predict_proba(self, leaves: np.ndarray) -> np.ndarray:
+        return self.node_proba[leaves].mean(axis=1)
+
+    def contributions(self, leaves: np.ndarray) -> np.ndarray:
+        """Per-feature contributions to predicted severity, shape (n_samples, n_features)"""
+        return self.node_contributions[leaves].mean(axis=1)
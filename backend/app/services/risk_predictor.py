@@ -1,27 +1,79 @@
 import numpy as np
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import StandardScaler
 import pickle
 import os
 
-from app.models.schemas import Policy, RiskPrediction, RiskLevel, RiskFactor
+from app.models.schemas import RiskPrediction, RiskLevel, RiskFactor
+from app.services.feature_store import (
+    BUDGET, BUDGET_PER_METRIC, FEATURE_NAMES, RiskFeatureStore, STATUS_FEATURES, budget_features
+)
+from app.services.metrics import metrics, stage, timed
+from app.services.policy_store import PolicyRecord, SECONDS_PER_DAY, to_epoch
+from app.services.risk_attribution import ForestAttribution
+from app.services.risk_training import load_artifact
+
+INFERENCE_BATCH_SIZE = metrics.histogram(
+    "risk_inference_batch_size", "Number of policies scored per model inference call",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 5000, 10000, 100000)
+)
+
+RISK_LEVELS = [RiskLevel.LOW, RiskLevel.MEDIUM, RiskLevel.HIGH, RiskLevel.CRITICAL]
+
+# Risk factor shown when a model feature drives risk up: (name, subject, mitigation)
+RISK_FACTORS = {
+    "budget": ("Budget Exposure", "Budget size", "Implement phased budget releases with milestone reviews"),
+    "days_running": ("Implementation Stage", "Time since launch", "Review delivery milestones against the implementation plan"),
+    "metrics_count": ("Metrics Complexity", "Number of target metrics", "Focus on key performance indicators and simplify measurement"),
+    "budget_per_metric": ("Budget Concentration", "Budget per target metric", "Tie budget tranches to progress on each target metric"),
+    "status": ("Lifecycle Stage", "Current policy status", "Maintain regular monitoring and review cycles")
+}
+# Failure probability range (percent) for each predicted risk level
+FAILURE_PROBABILITY = {
+    RiskLevel.LOW: (5, 15),
+    RiskLevel.MEDIUM: (25, 45),
+    RiskLevel.HIGH: (55, 75),
+    RiskLevel.CRITICAL: (80, 95)
+}
+
+MAX_RISK_FACTORS = 3
+MIN_FACTOR_POINTS = 1.0  # contributions below this (on the 0-100 severity scale) are noise
 
 class RiskPredictor:
-    def __init__(self):
+    def __init__(self, model_path: Optional[str] = None, load_model: bool = True):
         self.model = None
+        self.model_metadata: Optional[Dict] = None
+        self.attribution: Optional[ForestAttribution] = None
         self.scaler = StandardScaler()
         self.regions = ["North", "South", "East", "West", "Central"]
-        self._initialize_model()
+        # Precomputed features for stored policies; set once the data service exists
+        self.feature_store: Optional[RiskFeatureStore] = None
+        if load_model:
+            self._initialize_model(model_path)
     
-    def _initialize_model(self):
+    def _initialize_model(self, model_path: Optional[str] = None):
         """Initialize or load ML model for risk prediction"""
-        # In production, this would load a trained model
-        # For now, we'll use a simple rule-based approach with ML-like structure
-        self.model = RandomForestClassifier(n_estimators=100, random_state=42)
-        # Train on mock data (in production, use real historical data)
-        self._train_mock_model()
+        if model_path:
+            # Artifact produced by app.services.risk_training
+            self.model, self.scaler, self.model_metadata = load_artifact(model_path)
+        else:
+            # Without a trained artifact, fall back to a model trained on mock data
+            self.model = RandomForestClassifier(n_estimators=100, random_state=42)
+            self._train_mock_model()
+        
+        # Severity weights: low=0 .. critical=1
+        self.attribution = ForestAttribution.from_model(self.model, self.model.classes_ / (len(RISK_LEVELS) - 1))
+    
+    def use_model(self, attribution: ForestAttribution, scaler: StandardScaler, metadata: Optional[Dict] = None):
+        """Serve a flattened forest published elsewhere (e.g. a shared snapshot) instead of a local model"""
+        self.model = None  # predictions only need the flattened arrays
+        self.attribution = attribution
+        self.scaler = scaler
+        self.model_metadata = metadata
+        if self.feature_store:
+            self.feature_store.scaler = scaler
     
     def _train_mock_model(self):
         """Train model on mock data"""
@@ -34,41 +86,64 @@ class RiskPredictor:
         X_scaled = self.scaler.fit_transform(X)
         self.model.fit(X_scaled, y)
     
-    def predict(self, policy: Policy) -> RiskPrediction:
+    def predict(self, policy: PolicyRecord) -> RiskPrediction:
         """Predict risk for a policy"""
-        
-        # Extract features from policy
-        features = self._extract_features(policy)
-        features_scaled = self.scaler.transform([features])
-        
-        # Predict risk level
-        risk_class = self.model.predict(features_scaled)[0]
-        risk_proba = self.model.predict_proba(features_scaled)[0]
-        
-        # Map to risk levels
-        risk_levels = [RiskLevel.LOW, RiskLevel.MEDIUM, RiskLevel.HIGH, RiskLevel.CRITICAL]
-        overall_risk_level = risk_levels[risk_class]
-        
-        # Calculate risk score (0-100)
-        risk_score = (risk_class + 1) * 25 + np.random.uniform(-5, 5)
-        risk_score = max(0, min(100, risk_score))
-        
-        # Generate risk factors
-        risk_factors = self._generate_risk_factors(policy, features)
-        
-        # Calculate confidence based on probability
-        confidence = float(max(risk_proba))
-        
-        return RiskPrediction(
-            policy_id=policy.id,
-            overall_risk_level=overall_risk_level,
-            risk_score=round(risk_score, 2),
-            risk_factors=risk_factors,
-            confidence=round(confidence, 3),
-            predicted_at=datetime.now()
-        )
+        return self.predict_batch([policy])[0]
+    
+    def _scaled_features(self, policies: List[PolicyRecord]) -> np.ndarray:
+        """Scaled feature rows, from the feature store when it has every policy"""
+        rows = self.feature_store.rows([p.id for p in policies]) if self.feature_store else None
+        if rows is not None:
+            return self.feature_store.scaled[rows]
+        return self.scaler.transform([self._extract_features(policy) for policy in policies])
     
-    def get_regional_risks(self, policy: Policy) -> Dict[str, Dict]:
+    def predict_batch(self, policies: List[PolicyRecord]) -> List[RiskPrediction]:
+        """Predict and explain risk for many policies with a single model pass"""
+        if not policies:
+            return []
+        
+        features_scaled = self._scaled_features(policies)
+        with stage("risk.inference"):
+            leaves = self.attribution.leaves(features_scaled)
+            risk_proba = self.attribution.predict_proba(leaves)
+        with stage("risk.attribution"):
+            contributions = self.attribution.contributions(leaves)
+        INFERENCE_BATCH_SIZE.observe(len(policies))
+        risk_classes = self.attribution.classes[np.argmax(risk_proba, axis=1)]
+        
+        risk_scores = np.clip((risk_classes + 1) * 25 + np.random.uniform(-5, 5, len(policies)), 0, 100)
+        confidences = risk_proba.max(axis=1)
+        predicted_at = datetime.now()
+        
+        return [
+            RiskPrediction(
+                policy_id=policy.id,
+                overall_risk_level=RISK_LEVELS[risk_classes[i]],
+                risk_score=round(float(risk_scores[i]), 2),
+                risk_factors=self._risk_factors(contributions[i]),
+                confidence=round(float(confidences[i]), 3),
+                predicted_at=predicted_at
+            )
+            for i, policy in enumerate(policies)
+        ]
+    
+    def predict_features(self, features: np.ndarray) -> np.ndarray:
+        """Class probabilities for raw (unscaled) feature rows, scored in one batched pass"""
+        with stage("risk.inference"):
+            leaves = self.attribution.leaves(self.scaler.transform(features))
+            risk_proba = self.attribution.predict_proba(leaves)
+        INFERENCE_BATCH_SIZE.observe(len(features))
+        return risk_proba
+    
+    def predict_budgets(self, policy: PolicyRecord, budgets: np.ndarray) -> np.ndarray:
+        """Class probabilities for a policy under alternative budgets, one row per budget"""
+        features = np.tile(self._extract_features(policy), (len(budgets), 1))
+        features[:, BUDGET], features[:, BUDGET_PER_METRIC] = budget_features(budgets, len(policy.metric_values))
+        # Budgets past the features' caps map to the same row; score each distinct row once
+        distinct, inverse = np.unique(features, axis=0, return_inverse=True)
+        return self.predict_features(distinct)[inverse.ravel()]
+    
+    def get_regional_risks(self, policy: PolicyRecord) -> Dict[str, Dict]:
         """Analyze risk factors by region"""
         regional_risks = {}
         
@@ -108,50 +183,26 @@ class RiskPredictor:
         
         return regional_risks
     
-    def predict_failure_probability(self, policy: Policy) -> float:
+    def predict_failure_probability(self, policy: PolicyRecord) -> float:
         """Predict probability of policy failure (0-100)"""
         risk_prediction = self.predict(policy)
         
         # Map risk level to failure probability
-        failure_map = {
-            RiskLevel.LOW: np.random.uniform(5, 15),
-            RiskLevel.MEDIUM: np.random.uniform(25, 45),
-            RiskLevel.HIGH: np.random.uniform(55, 75),
-            RiskLevel.CRITICAL: np.random.uniform(80, 95)
-        }
-        
-        return round(failure_map.get(risk_prediction.overall_risk_level, 50), 2)
-        
-        # Calculate risk score (0-100)
-        risk_score = (risk_class + 1) * 25 + np.random.uniform(-5, 5)
-        risk_score = max(0, min(100, risk_score))
-        
-        # Generate risk factors
-        risk_factors = self._generate_risk_factors(policy, features)
-        
-        # Calculate confidence based on probability
-        confidence = float(max(risk_proba))
-        
-        return RiskPrediction(
-            policy_id=policy.id,
-            overall_risk_level=overall_risk_level,
-            risk_score=round(risk_score, 2),
-            risk_factors=risk_factors,
-            confidence=round(confidence, 3),
-            predicted_at=datetime.now()
-        )
+        low, high = FAILURE_PROBABILITY.get(risk_prediction.overall_risk_level, (50, 50))
+        return round(np.random.uniform(low, high), 2)
     
-    def _extract_features(self, policy: Policy) -> List[float]:
+    @timed("risk.extract_features")
+    def _extract_features(self, policy: PolicyRecord) -> List[float]:
         """Extract features from policy for ML model"""
         # Normalize budget (feature 1)
         budget_feature = min(1.0, policy.budget / 5000000)
         
         # Days since start (feature 2)
-        days_running = (datetime.now() - policy.start_date).days
+        days_running = (to_epoch(datetime.now()) - policy.start_ts) // SECONDS_PER_DAY
         days_feature = min(1.0, days_running / 365)
         
         # Number of target metrics (feature 3)
-        metrics_count = len(policy.target_metrics)
+        metrics_count = len(policy.metric_values)
         metrics_feature = min(1.0, metrics_count / 5)
         
         # Budget per metric (feature 4)
@@ -159,49 +210,31 @@ class RiskPredictor:
         budget_per_metric_feature = min(1.0, budget_per_metric / 1000000)
         
         # Status encoding (feature 5)
-        status_map = {"draft": 0.2, "active": 0.5, "completed": 0.8, "archived": 0.1}
-        status_feature = status_map.get(policy.status.value, 0.5)
+        status_feature = STATUS_FEATURES[policy.status_code]
         
         return [budget_feature, days_feature, metrics_feature, budget_per_metric_feature, status_feature]
     
-    def _generate_risk_factors(self, policy: Policy, features: List[float]) -> List[RiskFactor]:
-        """Generate detailed risk factors"""
+    def _risk_factors(self, contributions: np.ndarray) -> List[RiskFactor]:
+        """Map a policy's feature contributions onto risk factors, largest risk drivers first"""
         factors = []
-        
-        # Budget risk
-        if policy.budget > 3000000:
-            factors.append(RiskFactor(
-                factor_name="High Budget Risk",
-                risk_score=65.0,
-                description="Large budget allocation increases financial exposure",
-                mitigation_strategy="Implement phased budget releases with milestone reviews"
-            ))
-        
-        # Timeline risk
-        if policy.end_date:
-            days_remaining = (policy.end_date - datetime.now()).days
-            if days_remaining < 90:
-                factors.append(RiskFactor(
-                    factor_name="Timeline Pressure",
-                    risk_score=70.0,
-                    description="Limited time remaining may impact delivery quality",
-                    mitigation_strategy="Prioritize critical deliverables and consider timeline extension"
-                ))
-        
-        # Metrics complexity risk
-        if len(policy.target_metrics) > 3:
+        baseline = self.attribution.bias * 100
+        for j in np.argsort(-contributions)[:MAX_RISK_FACTORS].tolist():
+            points = float(contributions[j]) * 100
+            if points < MIN_FACTOR_POINTS:
+                break
+            name, subject, mitigation = RISK_FACTORS[FEATURE_NAMES[j]]
             factors.append(RiskFactor(
-                factor_name="Complex Metrics",
-                risk_score=55.0,
-                description="Multiple target metrics increase tracking complexity",
-                mitigation_strategy="Focus on key performance indicators and simplify measurement"
+                factor_name=name,
+                risk_score=round(min(100.0, points), 1),
+                description=f"{subject} raised predicted risk by {points:.1f} points over the {baseline:.1f} baseline",
+                mitigation_strategy=mitigation
             ))
         
-        # Default risk factors
+        # Nothing in particular drives this policy's risk
         if not factors:
             factors.append(RiskFactor(
                 factor_name="Standard Operational Risk",
-                risk_score=30.0,
+                risk_score=round(min(100.0, baseline), 1),
                 description="Standard risks associated with policy implementation",
                 mitigation_strategy="Maintain regular monitoring and review cycles"
             ))
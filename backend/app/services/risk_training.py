@@ -0,0 +1,274 @@
+"""Train the risk model from a historical dataset on disk.
+
+    python -m app.services.risk_training --data history.csv --output models/risk
+
+The CSV needs one column per model feature (see FEATURE_NAMES) and an
+integer `risk_level` label (0=low .. 3=critical). Each run writes a new
+versioned artifact directory; point RISK_MODEL_PATH at the output
+directory to serve the latest version.
+"""
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, f1_score, log_loss
+from sklearn.preprocessing import StandardScaler
+
+from app.services.feature_store import FEATURE_NAMES
+
+LABEL_COLUMN = "risk_level"
+TRAINING_DTYPES = {**{name: np.float32 for name in FEATURE_NAMES}, LABEL_COLUMN: np.int8}
+
+MODEL_FILE = "model.pkl"
+METADATA_FILE = "metadata.json"
+
+
+def read_chunks(path: str, chunk_size: int) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Stream (features, labels) chunks from a CSV of historical outcomes"""
+    reader = pd.read_csv(path, usecols=FEATURE_NAMES + [LABEL_COLUMN], dtype=TRAINING_DTYPES, chunksize=chunk_size)
+    for frame in reader:
+        yield frame[FEATURE_NAMES].to_numpy(), frame[LABEL_COLUMN].to_numpy()
+
+
+class RiskModelTrainer:
+    """Trains the risk forest chunk by chunk, without loading the dataset into memory.
+
+    A first pass fits the scaler and keeps a few examples of every class.
+    The second pass grows the forest with warm_start, adding
+    `trees_per_chunk` trees fitted on each chunk; a chunk that lacks a
+    class is padded with zero-weight examples of it so that every tree
+    shares the same classes. A random share of rows is held out for
+    evaluation.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = 500000,
+        trees_per_chunk: int = 5,
+        max_depth: Optional[int] = 16,
+        min_samples_leaf: int = 20,
+        holdout_fraction: float = 0.05,
+        max_holdout_rows: int = 200000,
+        exemplars_per_class: int = 8,
+        n_jobs: int = -1,
+        seed: int = 42
+    ):
+        self.chunk_size = chunk_size
+        self.trees_per_chunk = trees_per_chunk
+        self.max_depth = max_depth
+        self.min_samples_leaf = min_samples_leaf
+        self.holdout_fraction = holdout_fraction
+        self.max_holdout_rows = max_holdout_rows
+        self.exemplars_per_class = exemplars_per_class
+        self.n_jobs = n_jobs
+        self.seed = seed
+
+    def _first_pass(self, path: str) -> Tuple[StandardScaler, Dict[int, np.ndarray], int]:
+        """Fit the scaler incrementally and collect a few examples per class"""
+        scaler = StandardScaler()
+        exemplars: Dict[int, List[np.ndarray]] = {}
+        rows = 0
+        for X, y in read_chunks(path, self.chunk_size):
+            scaler.partial_fit(X)
+            rows += len(y)
+            for label in np.unique(y).tolist():
+                kept = exemplars.setdefault(label, [])
+                if len(kept) < self.exemplars_per_class:
+                    kept.extend(X[y == label][:self.exemplars_per_class - len(kept)])
+        return scaler, {label: np.array(kept) for label, kept in exemplars.items()}, rows
+
+    def train(self, path: str) -> Tuple[RandomForestClassifier, StandardScaler, Dict[str, Any]]:
+        """Train on a CSV; returns the model, its scaler and training metadata"""
+        started = time.perf_counter()
+        scaler, exemplars, total_rows = self._first_pass(path)
+        if not exemplars:
+            raise ValueError(f"No training rows in {path}")
+        classes = sorted(exemplars)
+        scan_seconds = time.perf_counter() - started
+
+        model = RandomForestClassifier(
+            n_estimators=0,
+            warm_start=True,
+            max_depth=self.max_depth,
+            min_samples_leaf=self.min_samples_leaf,
+            n_jobs=self.n_jobs,
+            random_state=self.seed
+        )
+        # A child stream, so the holdout draw is independent of default_rng(seed) used elsewhere
+        rng = np.random.default_rng(np.random.SeedSequence(self.seed).spawn(1)[0])
+        holdout_X, holdout_y = [], []
+        holdout_rows = 0
+        trained_rows = 0
+        chunks = 0
+
+        fit_started = time.perf_counter()
+        for X, y in read_chunks(path, self.chunk_size):
+            if holdout_rows < self.max_holdout_rows:
+                held = rng.random(len(y)) < self.holdout_fraction
+                held &= np.cumsum(held) <= self.max_holdout_rows - holdout_rows
+                holdout_X.append(X[held])
+                holdout_y.append(y[held])
+                holdout_rows += int(held.sum())
+                X, y = X[~held], y[~held]
+            if not len(y):
+                continue
+
+            weights = np.ones(len(y), dtype=np.float32)
+            present = set(np.unique(y).tolist())
+            missing = [label for label in classes if label not in present]
+            if missing:
+                pad_X = np.concatenate([exemplars[label] for label in missing])
+                pad_y = np.concatenate([np.full(len(exemplars[label]), label, dtype=y.dtype) for label in missing])
+                X, y = np.concatenate([X, pad_X]), np.concatenate([y, pad_y])
+                weights = np.concatenate([weights, np.zeros(len(pad_y), dtype=np.float32)])
+
+            model.n_estimators += self.trees_per_chunk
+            model.fit(scaler.transform(X), y, sample_weight=weights)
+            trained_rows += int((weights > 0).sum())
+            chunks += 1
+        fit_seconds = time.perf_counter() - fit_started
+
+        if not chunks:
+            raise ValueError(f"All {total_rows} rows of {path} were held out; lower holdout_fraction")
+
+        evaluation = self.evaluate(model, scaler, holdout_X, holdout_y)
+        # Serving scores small batches, where thread fan-out only adds latency
+        model.n_jobs = None
+        model.warm_start = False
+
+        metadata = {
+            "created_at": datetime.now().isoformat(),
+            "source": os.path.abspath(path),
+            "feature_names": FEATURE_NAMES,
+            "classes": [int(c) for c in model.classes_],
+            "rows": total_rows,
+            "trained_rows": trained_rows,
+            "holdout_rows": holdout_rows,
+            "chunks": chunks,
+            "n_estimators": model.n_estimators,
+            "params": {
+                "chunk_size": self.chunk_size,
+                "trees_per_chunk": self.trees_per_chunk,
+                "max_depth": self.max_depth,
+                "min_samples_leaf": self.min_samples_leaf,
+                "holdout_fraction": self.holdout_fraction,
+                "seed": self.seed
+            },
+            "holdout": evaluation,
+            "timing": {
+                "scan_seconds": round(scan_seconds, 3),
+                "fit_seconds": round(fit_seconds, 3),
+                "total_seconds": round(time.perf_counter() - started, 3),
+                "rows_per_second": round(trained_rows / fit_seconds, 1) if fit_seconds > 0 else None
+            },
+            "sklearn_version": sklearn.__version__
+        }
+        return model, scaler, metadata
+
+    @staticmethod
+    def evaluate(model: RandomForestClassifier, scaler: StandardScaler, X_parts: List[np.ndarray], y_parts: List[np.ndarray]) -> Dict[str, Any]:
+        """Accuracy, macro F1 and log loss on the held-out rows"""
+        if not X_parts or not sum(len(y) for y in y_parts):
+            return {}
+        X, y = np.concatenate(X_parts), np.concatenate(y_parts)
+        proba = model.predict_proba(scaler.transform(X))
+        predicted = model.classes_[np.argmax(proba, axis=1)]
+        return {
+            "accuracy": round(float(accuracy_score(y, predicted)), 4),
+            "macro_f1": round(float(f1_score(y, predicted, average="macro")), 4),
+            "log_loss": round(float(log_loss(y, proba, labels=model.classes_)), 4)
+        }
+
+
+def _versions(directory: str) -> List[int]:
+    if not os.path.isdir(directory):
+        return []
+    return sorted(int(name[1:]) for name in os.listdir(directory) if name.startswith("v") and name[1:].isdigit())
+
+
+def save_artifact(model: RandomForestClassifier, scaler: StandardScaler, metadata: Dict[str, Any], directory: str) -> str:
+    """Write model + metadata as the next version under directory; returns the version path"""
+    os.makedirs(directory, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=directory, prefix=".staging-")
+    try:
+        model_path = os.path.join(staging, MODEL_FILE)
+        with open(model_path, "wb") as f:
+            pickle.dump({"model": model, "scaler": scaler}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        with open(model_path, "rb") as f:
+            digest = hashlib.sha256()
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+
+        while True:
+            version = (_versions(directory) or [0])[-1] + 1
+            metadata = {**metadata, "version": version, "sha256": digest.hexdigest()}
+            with open(os.path.join(staging, METADATA_FILE), "w") as f:
+                json.dump(metadata, f, indent=2)
+            final = os.path.join(directory, f"v{version}")
+            try:
+                os.rename(staging, final)  # fails if another run took this version
+                return final
+            except OSError:
+                if not os.path.exists(final):
+                    raise
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+
+def load_artifact(path: str) -> Tuple[RandomForestClassifier, StandardScaler, Dict[str, Any]]:
+    """Load a version directory, or the latest version under an artifact directory"""
+    if not os.path.exists(os.path.join(path, MODEL_FILE)):
+        versions = _versions(path)
+        if not versions:
+            raise FileNotFoundError(f"No model artifact found in {path}")
+        path = os.path.join(path, f"v{versions[-1]}")
+    with open(os.path.join(path, METADATA_FILE)) as f:
+        metadata = json.load(f)
+    with open(os.path.join(path, MODEL_FILE), "rb") as f:
+        artifact = pickle.load(f)
+    return artifact["model"], artifact["scaler"], metadata
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Train the risk model from historical data")
+    parser.add_argument("--data", required=True, help="CSV with feature columns and a risk_level label")
+    parser.add_argument("--output", required=True, help="artifact directory; each run adds a new version")
+    parser.add_argument("--chunk-size", type=int, default=500000)
+    parser.add_argument("--trees-per-chunk", type=int, default=5)
+    parser.add_argument("--max-depth", type=int, default=16)
+    parser.add_argument("--min-samples-leaf", type=int, default=20)
+    parser.add_argument("--holdout-fraction", type=float, default=0.05)
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    trainer = RiskModelTrainer(
+        chunk_size=args.chunk_size,
+        trees_per_chunk=args.trees_per_chunk,
+        max_depth=args.max_depth,
+        min_samples_leaf=args.min_samples_leaf,
+        holdout_fraction=args.holdout_fraction,
+        n_jobs=args.n_jobs,
+        seed=args.seed
+    )
+    model, scaler, metadata = trainer.train(args.data)
+    path = save_artifact(model, scaler, metadata, args.output)
+    print(json.dumps({"artifact": path, **metadata}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
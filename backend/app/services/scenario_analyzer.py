@@ -0,0 +1,98 @@
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+import numpy as np
+
+from app.models.schemas import ScenarioGrid, ScenarioSweep
+from app.services.impact_analyzer import ImpactAnalyzer
+from app.services.metrics import timed
+from app.services.policy_store import NO_END, SECONDS_PER_DAY, PolicyRecord, from_epoch
+from app.services.risk_predictor import FAILURE_PROBABILITY, RISK_LEVELS, RiskPredictor
+
+
+class ScenarioAnalyzer:
+    """What-if sweeps: scores every combination of budget, end-date and metric-target changes for a policy.
+
+    The grid is expanded into flat per-scenario columns and scored as
+    matrices: one impact pass over (scenarios x metrics) and one model
+    pass over the scenarios' feature rows, so a sweep costs a few numpy
+    operations however many scenarios it has. The risk model has no
+    end-date feature, so end-date shifts only move the timeline fields.
+    """
+
+    def __init__(self, impact_analyzer: ImpactAnalyzer, risk_predictor: RiskPredictor, max_scenarios: int = 100000):
+        self.impact_analyzer = impact_analyzer
+        self.risk_predictor = risk_predictor
+        self.max_scenarios = max_scenarios
+
+    @staticmethod
+    def count(grid: ScenarioGrid) -> int:
+        return len(grid.budget_multipliers) * len(grid.end_date_shift_days) * len(grid.metric_target_multipliers)
+
+    @timed("scenarios.sweep")
+    def sweep(self, policy: PolicyRecord, grid: ScenarioGrid) -> ScenarioSweep:
+        """Score every scenario in the grid, in budget, end-date, metric-target order
+
+        Raises ValueError if an end-date shift moves the end date out of the representable range.
+        """
+        budget_multiplier, shift_days, metric_multiplier = (
+            column.ravel() for column in np.meshgrid(
+                np.asarray(grid.budget_multipliers, dtype=np.float64),
+                np.asarray(grid.end_date_shift_days, dtype=np.int64),
+                np.asarray(grid.metric_target_multipliers, dtype=np.float64),
+                indexing="ij"
+            )
+        )
+        budgets = policy.budget * budget_multiplier
+
+        impact_scores, rois = self.impact_analyzer.analyze_scenarios(policy, budgets, metric_multiplier)
+
+        risk_proba = self.risk_predictor.predict_budgets(policy, budgets)
+
+        classes = self.risk_predictor.attribution.classes
+        risk_classes = classes[np.argmax(risk_proba, axis=1)]
+        # Expected values over the class probabilities, so nearby scenarios get comparable scores
+        risk_scores = np.clip(risk_proba @ ((classes + 1) * 25.0), 0, 100)
+        failure_midpoints = np.array([sum(FAILURE_PROBABILITY[RISK_LEVELS[c]]) / 2 for c in classes])
+        failure_probabilities = risk_proba @ failure_midpoints
+
+        if policy.end_ts is None:
+            end_ts = np.full(len(budgets), NO_END)
+        else:
+            end_ts = policy.end_ts + shift_days * SECONDS_PER_DAY
+        days_remaining = (end_ts - int(time.time())) // SECONDS_PER_DAY
+
+        scenarios = self._results(
+            budget_multiplier, shift_days, metric_multiplier, budgets, end_ts, days_remaining,
+            impact_scores, rois, risk_classes, risk_scores, failure_probabilities
+        )
+        return ScenarioSweep(
+            policy_id=policy.id,
+            scenario_count=len(scenarios),
+            scenarios=scenarios,
+            generated_at=datetime.now()
+        )
+
+    @staticmethod
+    def _results(budget_multiplier, shift_days, metric_multiplier, budgets, end_ts, days_remaining,
+                 impact_scores, rois, risk_classes, risk_scores, failure_probabilities) -> List[Dict[str, Any]]:
+        try:
+            end_dates = {ts: from_epoch(ts) for ts in set(end_ts.tolist()) if ts != NO_END}
+        except (ValueError, OverflowError, OSError):
+            raise ValueError("An end-date shift moves the end date out of range")
+        columns = zip(
+            budget_multiplier.tolist(), shift_days.tolist(), metric_multiplier.tolist(), budgets.round(2).tolist(),
+            end_ts.tolist(), days_remaining.tolist(), impact_scores.round(2).tolist(), rois.round(2).tolist(),
+            risk_classes.tolist(), risk_scores.round(2).tolist(), failure_probabilities.round(2).tolist()
+        )
+        # Plain dicts: ScenarioSweep validates them in one pass, far cheaper than a model per scenario
+        return [
+            {
+                "budget_multiplier": b, "end_date_shift_days": s, "metric_target_multiplier": m, "budget": budget,
+                "end_date": end_dates.get(end), "days_remaining": None if end == NO_END else remaining,
+                "overall_impact_score": impact, "roi": roi, "risk_level": RISK_LEVELS[risk_class],
+                "risk_score": risk_score, "failure_probability": failure
+            }
+            for b, s, m, budget, end, remaining, impact, roi, risk_class, risk_score, failure in columns
+        ]
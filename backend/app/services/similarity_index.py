@@ -0,0 +1,228 @@
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sklearn.neighbors import KDTree
+
+from app.services.data_service import DataService
+from app.services.feature_store import RiskFeatureStore
+from app.services.metrics import metrics, stage
+from app.services.policy_store import SortedRowIndex
+
+INDEX_REBUILDS = metrics.counter("similarity_index_rebuilds_total", "Similarity index rebuilds")
+INDEX_DELTA = metrics.gauge("similarity_index_delta_size", "Policies changed since the last similarity index rebuild")
+
+
+class SimilarityIndex:
+    """Nearest-neighbour search over policies' scaled risk features plus a one-hot category.
+
+    The bulk of the portfolio sits in a KDTree built in the background.
+    Policies written since the last build go to a small delta buffer that
+    queries scan by brute force, and their old tree entries are marked
+    stale and skipped. Once the delta outgrows `max_delta`, or the daily
+    feature refresh moves every vector, the tree is rebuilt and swapped
+    in. Entries are keyed by policy id, so the index follows table swaps
+    (e.g. shared snapshots) through the changed ids alone.
+    """
+
+    def __init__(
+        self,
+        data_service: DataService,
+        feature_store: RiskFeatureStore,
+        category_weight: float = 1.0,
+        max_delta: int = 2048,
+        leaf_size: int = 40
+    ):
+        self.data_service = data_service
+        self.feature_store = feature_store
+        self.category_weight = category_weight
+        self.max_delta = max_delta
+        self.leaf_size = leaf_size
+
+        self.tree: Optional[KDTree] = None
+        self.tree_ids = np.zeros(0, dtype=np.int64)
+        self.tree_vectors = np.zeros((0, 0))
+        self._tree_position = SortedRowIndex.build(self.tree_ids)
+        self._stale = np.zeros(0, dtype=bool)
+        self._n_stale = 0
+        self._category_slots = 0
+        self._as_of_day = None
+        self._delta: Dict[int, np.ndarray] = {}  # policy id -> vector
+        self._delta_arrays: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self._changed_during_build: Optional[set] = None
+        self._rebuild_again = False
+        self._lock = threading.RLock()
+        self._build_lock = threading.Lock()  # one build at a time
+        self._builder: Optional[threading.Thread] = None
+
+        self.rebuild()
+        data_service.subscribe(self._on_change)
+
+    def _vectors(self, rows: np.ndarray, category_slots: int) -> np.ndarray:
+        """Index vectors for table rows: scaled features, then the weighted category one-hot"""
+        store = self.feature_store
+        n_features = store.scaled.shape[1]
+        categories = store.table.category[rows]
+        vectors = np.zeros((len(rows), n_features + category_slots))
+        vectors[:, :n_features] = store.scaled[rows]
+        # Categories added since the build have no slot until the next rebuild
+        in_range = categories < category_slots
+        vectors[np.flatnonzero(in_range), n_features + categories[in_range]] = self.category_weight
+        return vectors
+
+    def rebuild(self):
+        """Build a fresh tree over every policy, folding in the delta"""
+        with self._build_lock:
+            self._rebuild()
+
+    def _rebuild(self):
+        with self._lock:
+            store = self.feature_store
+            if store.table is not self.data_service.table:
+                return  # features are mid-update; the next change or query retries
+            table = store.table
+            rows = table.alive_rows()
+            category_slots = max(8, 2 * len(table.categories))
+            vectors = self._vectors(rows, category_slots)
+            ids = table.ids[rows]
+            as_of_day = store.as_of_day
+            self._changed_during_build = set()
+
+        with stage("similarity.rebuild"):
+            tree = KDTree(vectors, leaf_size=self.leaf_size) if len(ids) else None
+            position = SortedRowIndex.build(ids)
+
+        with self._lock:
+            self.tree, self.tree_ids, self.tree_vectors, self._tree_position = tree, ids, vectors, position
+            self._category_slots = category_slots
+            self._stale = np.zeros(len(ids), dtype=bool)
+            self._n_stale = 0
+            self._as_of_day = as_of_day
+            changed, self._changed_during_build = self._changed_during_build, None
+            self._delta = {}
+            self._delta_arrays = None
+            self._apply_changes(list(changed))
+        INDEX_REBUILDS.inc()
+
+    def _rebuild_in_background(self):
+        with self._lock:
+            if self._builder is not None and self._builder.is_alive():
+                # The running build may have read the table before this change
+                self._rebuild_again = True
+                return
+            self._builder = threading.Thread(target=self._rebuild_until_current, name="similarity-rebuild", daemon=True)
+            self._builder.start()
+
+    def _rebuild_until_current(self):
+        while True:
+            self.rebuild()
+            with self._lock:
+                if not self._rebuild_again:
+                    return
+                self._rebuild_again = False
+
+    def _on_change(self, policy_ids: List[int]):
+        if len(policy_ids) > self.max_delta:
+            self._rebuild_in_background()
+            return
+        with self._lock:
+            if self._changed_during_build is not None:
+                self._changed_during_build.update(policy_ids)
+            self._apply_changes(policy_ids)
+        if len(self._delta) > self.max_delta:
+            self._rebuild_in_background()
+
+    def _apply_changes(self, policy_ids: List[int]):
+        """Move changed policies into the delta (or drop deleted ones); call with the lock held"""
+        rows = self.feature_store.rows(policy_ids) if policy_ids else None
+        if rows is None:
+            # Some are deleted (or features are mid-update): look them up one by one
+            row_of = self.data_service.table.row_of
+            present = [(policy_id, row_of.get(policy_id)) for policy_id in policy_ids]
+            ids = [policy_id for policy_id, row in present if row is not None]
+            rows = self.feature_store.rows(ids) if ids else np.zeros(0, dtype=np.int64)
+            if rows is None:
+                self._rebuild_in_background()  # features lag the table; a rebuild picks these up
+                return
+        else:
+            ids = policy_ids
+        vectors = self._vectors(rows, self._category_slots)
+
+        for policy_id in policy_ids:
+            self._delta.pop(policy_id, None)
+            position = self._tree_position.get(policy_id)
+            if position is not None and not self._stale[position]:
+                self._stale[position] = True
+                self._n_stale += 1
+        for policy_id, vector in zip(ids, vectors):
+            self._delta[policy_id] = vector
+        self._delta_arrays = None
+        INDEX_DELTA.set(len(self._delta))
+
+    def _ensure_current(self):
+        if self.feature_store.as_of_day != self._as_of_day:
+            self._rebuild_in_background()
+
+    def similar(self, policy_ids: List[int], k: int = 10) -> List[Optional[List[Tuple[int, float]]]]:
+        """The k nearest other policies to each given policy as (policy id, distance), closest first
+
+        Unknown policies get None.
+        """
+        self._ensure_current()
+        with self._lock:
+            tree, tree_ids, stale, n_stale = self.tree, self.tree_ids, self._stale, self._n_stale
+            if self._delta_arrays is None:
+                delta_ids = np.fromiter(self._delta.keys(), dtype=np.int64, count=len(self._delta))
+                delta_vectors = np.array(list(self._delta.values())).reshape(len(delta_ids), self.tree_vectors.shape[1])
+                self._delta_arrays = (delta_ids, delta_vectors)
+            delta_ids, delta_vectors = self._delta_arrays
+
+            known, queries = [], []
+            for i, policy_id in enumerate(policy_ids):
+                vector = self._delta.get(policy_id)
+                if vector is None:
+                    position = self._tree_position.get(policy_id)
+                    if position is None or stale[position]:
+                        continue
+                    vector = self.tree_vectors[position]
+                known.append(i)
+                queries.append(vector)
+
+        results: List[Optional[List[Tuple[int, float]]]] = [None] * len(policy_ids)
+        if not known:
+            return results
+        queries = np.array(queries)
+
+        with stage("similarity.query"):
+            candidates = [[] for _ in known]
+            if tree is not None:
+                # Extra neighbours cover the query itself and stale entries; widen only if needed
+                extra = 1 + min(n_stale, 16)
+                distances, positions = tree.query(queries, k=min(k + extra, len(tree_ids)))
+                short = []
+                for j, (dist_row, pos_row) in enumerate(zip(distances, positions)):
+                    live = ~stale[pos_row]
+                    candidates[j] = list(zip(tree_ids[pos_row[live]].tolist(), dist_row[live].tolist()))
+                    if live.sum() < k + 1 and len(pos_row) < len(tree_ids):
+                        short.append(j)
+                if short:
+                    distances, positions = tree.query(queries[short], k=min(k + 1 + n_stale, len(tree_ids)))
+                    for j, dist_row, pos_row in zip(short, distances, positions):
+                        live = ~stale[pos_row]
+                        candidates[j] = list(zip(tree_ids[pos_row[live]].tolist(), dist_row[live].tolist()))
+
+            if len(delta_ids):
+                squared = (
+                    (queries ** 2).sum(axis=1)[:, None] + (delta_vectors ** 2).sum(axis=1)[None, :]
+                    - 2 * queries @ delta_vectors.T
+                )
+                delta_distances = np.sqrt(np.maximum(squared, 0))
+                nearest = np.argsort(delta_distances, axis=1)[:, :k + 1]
+                for j, order in enumerate(nearest):
+                    candidates[j].extend(zip(delta_ids[order].tolist(), delta_distances[j, order].tolist()))
+
+        for j, i in enumerate(known):
+            query_id = policy_ids[i]
+            ranked = sorted((distance, policy_id) for policy_id, distance in candidates[j] if policy_id != query_id)
+            results[i] = [(policy_id, distance) for distance, policy_id in ranked[:k]]
+        return results
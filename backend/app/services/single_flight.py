@@ -0,0 +1,62 @@
+import asyncio
+from typing import Any, Callable, Dict, Hashable
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.services.metrics import metrics
+
+CALLS = metrics.counter(
+    "single_flight_calls_total", "Coalesced calls by endpoint and role (leader computes, waiter shares)", ["endpoint", "role"]
+)
+WAITERS = metrics.histogram(
+    "single_flight_waiters", "Callers that shared each computation besides its leader", ["endpoint"],
+    buckets=(0, 1, 2, 5, 10, 25, 50, 100, 250)
+)
+
+
+class SingleFlight:
+    """Coalesces identical concurrent computations into one.
+
+    The first caller for a key becomes the leader: its computation runs
+    in the threadpool as a task of its own, so the event loop stays free
+    and a leader whose client disconnects does not cancel it. Callers
+    arriving while it runs wait on the same task and share its result
+    (or exception). The key is forgotten once the task finishes, so a
+    later call computes afresh.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._waiting: Dict[Hashable, int] = {}
+        self.leaders = 0
+        self.waiters = 0
+
+    async def do(self, endpoint: str, key: Hashable, fn: Callable[..., Any], *args) -> Any:
+        """Run fn(*args) in the threadpool, or join the identical call already running"""
+        flight_key = (endpoint, key)
+        task = self._inflight.get(flight_key)
+        if task is None:
+            self.leaders += 1
+            CALLS.labels(endpoint, "leader").inc()
+            task = asyncio.get_running_loop().create_task(run_in_threadpool(fn, *args))
+            self._inflight[flight_key] = task
+            self._waiting[flight_key] = 0
+            task.add_done_callback(lambda _: self._land(endpoint, flight_key))
+        else:
+            self.waiters += 1
+            self._waiting[flight_key] += 1
+            CALLS.labels(endpoint, "waiter").inc()
+        # shield: one caller being cancelled must not cancel the shared computation
+        return await asyncio.shield(task)
+
+    def _land(self, endpoint: str, flight_key: Hashable):
+        self._inflight.pop(flight_key, None)
+        WAITERS.labels(endpoint).observe(self._waiting.pop(flight_key, 0))
+
+    def in_flight(self) -> int:
+        return len(self._inflight)
+
+    def coalescing_ratio(self) -> float:
+        """Share of calls that were served by another call's computation"""
+        calls = self.leaders + self.waiters
+        return self.waiters / calls if calls else 0.0
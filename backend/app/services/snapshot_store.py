@@ -0,0 +1,376 @@
+"""Versioned, memory-mapped read snapshots shared by every worker process.
+
+Layout of a snapshot directory:
+
+    CURRENT         name of the live version directory, swapped atomically
+    .lock           flock held by the single writer
+    v<N>/           one immutable version: manifest.json, scaler.pkl and one
+                    .npy file per column, feature array and model array
+
+Workers map the .npy files read-only (np.load(mmap_mode="r")), so the
+operating system keeps one copy of the pages no matter how many workers
+serve them.
+"""
+import fcntl
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+from sklearn.preprocessing import StandardScaler
+
+from app.services.data_service import DataService
+from app.services.feature_store import RiskFeatureStore
+from app.services.metrics import metrics
+from app.services.policy_store import PolicyTable, SECONDS_PER_DAY, SortedRowIndex, StringColumn, Vocabulary
+from app.services.risk_attribution import ARRAY_NAMES, ForestAttribution
+from app.services.risk_predictor import RiskPredictor
+
+SNAPSHOT_VERSION = metrics.gauge("snapshot_version", "Snapshot version this worker is serving")
+SNAPSHOT_SWITCHES = metrics.counter("snapshot_switches_total", "Snapshot versions adopted by this worker")
+SNAPSHOT_PUBLISHES = metrics.counter("snapshot_publishes_total", "Snapshot versions written by this worker")
+SNAPSHOT_ERRORS = metrics.counter("snapshot_sync_errors_total", "Failed snapshot polls or refreshes")
+
+CURRENT_FILE = "CURRENT"
+LOCK_FILE = ".lock"
+MANIFEST_FILE = "manifest.json"
+SCALER_FILE = "scaler.pkl"
+
+TABLE_COLUMNS = ("ids", "budget", "status", "category", "start_ts", "end_ts", "created_ts", "updated_ts", "metrics")
+
+
+class Snapshot:
+    """One published version, with its arrays mapped read-only"""
+
+    def __init__(self, version: int, manifest: Dict[str, Any], table: PolicyTable, arrays: Dict[str, np.ndarray], scaler: StandardScaler):
+        self.version = version
+        self.manifest = manifest
+        self.table = table
+        self.scaled = arrays["scaled"]
+        self.days_remaining = arrays["days_remaining"]
+        self.as_of_ts = manifest["as_of_ts"]
+        self.attribution = ForestAttribution.from_arrays({name: arrays[f"model_{name}"] for name in ARRAY_NAMES})
+        self.scaler = scaler
+
+    @property
+    def as_of_day(self) -> int:
+        return self.as_of_ts // SECONDS_PER_DAY
+
+
+class SnapshotStore:
+    """Writes and maps snapshot versions in a directory shared by all workers"""
+
+    def __init__(self, directory: str, keep_versions: int = 3):
+        self.directory = directory
+        self.keep_versions = keep_versions
+        os.makedirs(directory, exist_ok=True)
+
+    @contextmanager
+    def writer_lock(self) -> Iterator[None]:
+        """Exclusive across processes; held while reading the latest version, changing it and publishing"""
+        with open(os.path.join(self.directory, LOCK_FILE), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def current_version(self) -> Optional[int]:
+        try:
+            with open(os.path.join(self.directory, CURRENT_FILE)) as f:
+                return int(f.read().strip()[1:])
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def publish(
+        self,
+        table: PolicyTable,
+        feature_store: RiskFeatureStore,
+        attribution: ForestAttribution,
+        scaler: StandardScaler,
+        model_metadata: Optional[Dict[str, Any]] = None,
+        changed_ids: Optional[List[int]] = None
+    ) -> int:
+        """Write the live rows of a table with their features and the model as the next version
+
+        Call with writer_lock held. changed_ids lists the policies that differ
+        from the current version, so readers can invalidate only those.
+        """
+        parent = self.current_version()
+        version = (parent or 0) + 1
+        rows = table.alive_rows()
+        row_list = rows.tolist()
+
+        staging = tempfile.mkdtemp(dir=self.directory, prefix=".staging-")
+        try:
+            def save(name: str, array: np.ndarray):
+                np.save(os.path.join(staging, f"{name}.npy"), np.ascontiguousarray(array))
+
+            for column in TABLE_COLUMNS:
+                save(column, getattr(table, column)[rows])
+            for column, strings in (("names", table.names), ("descriptions", table.descriptions)):
+                if isinstance(strings, StringColumn):
+                    taken = strings.take(rows)
+                    blob, offsets = taken.blob, taken.offsets
+                else:
+                    blob, offsets = StringColumn.encode([strings[row] for row in row_list])
+                save(f"{column}_blob", blob)
+                save(f"{column}_offsets", offsets)
+            index = SortedRowIndex.build(table.ids[rows])
+            save("index_ids", index.sorted_ids)
+            save("index_rows", index.rows)
+            save("scaled", feature_store.scaled[rows])
+            save("days_remaining", feature_store.days_remaining[rows])
+            # The model rarely changes between versions: hard-link the parent's files when they are the same
+            parent_path = os.path.join(self.directory, f"v{parent}") if parent is not None else None
+            for name, array in attribution.arrays().items():
+                if not self._link_same(parent_path, staging, f"model_{name}.npy", array):
+                    save(f"model_{name}", array)
+            scaler_bytes = pickle.dumps(scaler, protocol=pickle.HIGHEST_PROTOCOL)
+            if not self._link_same(parent_path, staging, SCALER_FILE, scaler_bytes):
+                with open(os.path.join(staging, SCALER_FILE), "wb") as f:
+                    f.write(scaler_bytes)
+
+            manifest = {
+                "version": version,
+                "parent": parent,
+                "size": len(row_list),
+                "categories": table.categories.names,
+                "metric_names": table.metric_vocab.names,
+                "as_of_ts": feature_store.as_of_ts,
+                "changed_ids": changed_ids,
+                "model_metadata": model_metadata,
+                "published_at": time.time()
+            }
+            with open(os.path.join(staging, MANIFEST_FILE), "w") as f:
+                json.dump(manifest, f)
+
+            os.rename(staging, os.path.join(self.directory, f"v{version}"))
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        # Readers switch versions by re-reading CURRENT; os.replace makes the switch atomic
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            f.write(f"v{version}")
+        os.replace(tmp_path, os.path.join(self.directory, CURRENT_FILE))
+        self._prune(version)
+        SNAPSHOT_PUBLISHES.inc()
+        return version
+
+    @staticmethod
+    def _link_same(parent_path: Optional[str], staging: str, file_name: str, content) -> bool:
+        """Hard-link the parent version's file into staging if it holds `content` (an array or bytes)"""
+        if parent_path is None:
+            return False
+        source = os.path.join(parent_path, file_name)
+        try:
+            if isinstance(content, bytes):
+                with open(source, "rb") as f:
+                    same = f.read() == content
+            else:
+                same = np.array_equal(np.load(source, mmap_mode="r"), content)
+            if same:
+                os.link(source, os.path.join(staging, file_name))
+            return same
+        except (OSError, ValueError):
+            return False  # pruned meanwhile, unreadable, or no hard links on this filesystem
+
+    def _prune(self, latest: int):
+        # Workers still mapping a removed version keep reading it; unlinked files live on until unmapped
+        for name in os.listdir(self.directory):
+            if name.startswith("v") and name[1:].isdigit() and int(name[1:]) <= latest - self.keep_versions:
+                shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+
+    def load(self, version: Optional[int] = None) -> Optional[Snapshot]:
+        """Map a version (the current one by default); None if nothing has been published"""
+        if version is None:
+            version = self.current_version()
+            if version is None:
+                return None
+        path = os.path.join(self.directory, f"v{version}")
+        with open(os.path.join(path, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+        with open(os.path.join(path, SCALER_FILE), "rb") as f:
+            scaler = pickle.load(f)
+        arrays = {
+            name[:-len(".npy")]: np.load(os.path.join(path, name), mmap_mode="r")
+            for name in os.listdir(path) if name.endswith(".npy")
+        }
+        return Snapshot(version, manifest, self._table(manifest, arrays), arrays, scaler)
+
+    @staticmethod
+    def _table(manifest: Dict[str, Any], arrays: Dict[str, np.ndarray]) -> PolicyTable:
+        """A read-only PolicyTable over mapped arrays"""
+        size = manifest["size"]
+        table = PolicyTable(capacity=0)
+        table.size = table.capacity = size
+        table.categories = Vocabulary(manifest["categories"])
+        table.metric_vocab = Vocabulary(manifest["metric_names"])
+        for column in TABLE_COLUMNS:
+            setattr(table, column, arrays[column])
+        table.alive = np.ones(size, dtype=bool)
+        table.names = StringColumn(arrays["names_blob"], arrays["names_offsets"])
+        table.descriptions = StringColumn(arrays["descriptions_blob"], arrays["descriptions_offsets"])
+        table.row_of = SortedRowIndex(arrays["index_ids"], arrays["index_rows"])
+        return table
+
+
+class _PendingWrite:
+    """A change waiting to be committed, and its outcome once it has been"""
+
+    __slots__ = ("change", "result", "error", "done")
+
+    def __init__(self, change: Callable[[], Any]):
+        self.change = change
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.done = False
+
+
+class SnapshotSync:
+    """Keeps one worker's services on the latest snapshot, and funnels its writes through the store.
+
+    Reads never touch the store: a background thread polls CURRENT and
+    swaps the worker's table, features and model to a new version in one
+    step. A write takes the store's writer lock, moves the worker to the
+    latest version, applies the change to an in-memory copy, publishes
+    the result as the next version and switches to it, so every worker
+    sees the write on its next poll.
+
+    Publishing writes the whole table, so writes are group-committed: the
+    thread that gets the lock applies every change queued by then (after
+    waiting `batch_window` seconds for more) and publishes them as one
+    version. Writes block; call them from a thread pool, not the event loop.
+    """
+
+    def __init__(
+        self,
+        store: SnapshotStore,
+        data_service: DataService,
+        risk_predictor: RiskPredictor,
+        poll_interval: float = 1.0,
+        batch_window: float = 0.0
+    ):
+        self.store = store
+        self.data_service = data_service
+        self.risk_predictor = risk_predictor
+        self.poll_interval = poll_interval
+        self.batch_window = batch_window
+        self.snapshot: Optional[Snapshot] = None
+        self._pending: List[_PendingWrite] = []
+        self._pending_lock = threading.Lock()
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Adopt the latest snapshot, publishing this worker's data first if there is none"""
+        with self.store.writer_lock():
+            if self.store.current_version() is None:
+                self._publish(changed_ids=None)
+            self.refresh()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="snapshot-sync", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.refresh()
+                if self.snapshot and self.snapshot.as_of_day != int(time.time()) // SECONDS_PER_DAY:
+                    self.write(lambda: None)
+            except Exception:
+                SNAPSHOT_ERRORS.inc()  # keep serving the version already mapped
+
+    def refresh(self) -> bool:
+        """Switch to the current version if it is newer than the one being served"""
+        version = self.store.current_version()
+        if version is None or (self.snapshot and self.snapshot.version >= version):
+            return False
+        with self._lock:
+            if self.snapshot and self.snapshot.version >= version:
+                return False
+            snapshot = self.store.load(version)
+            changed_ids = None  # first version, or skipped versions: treat everything as changed
+            if self.snapshot and snapshot.manifest["parent"] == self.snapshot.version:
+                changed_ids = snapshot.manifest["changed_ids"]
+            self._apply(snapshot, changed_ids)
+        return True
+
+    def _apply(self, snapshot: Snapshot, changed_ids: Optional[List[int]]):
+        predictor = self.risk_predictor
+        # Model and features first, so the table switch finds them already in place
+        predictor.use_model(snapshot.attribution, snapshot.scaler, snapshot.manifest["model_metadata"])
+        predictor.feature_store.adopt(snapshot.table, snapshot.scaled, snapshot.days_remaining, snapshot.as_of_ts)
+        self.data_service.load_table(snapshot.table, changed_ids)
+        self.snapshot = snapshot
+        SNAPSHOT_VERSION.set(snapshot.version)
+        SNAPSHOT_SWITCHES.inc()
+
+    def write(self, change: Callable[[], Any]) -> Any:
+        """Apply a change to the data service and publish it to every worker; returns change()'s result"""
+        pending = _PendingWrite(change)
+        with self._pending_lock:
+            self._pending.append(pending)
+        with self.store.writer_lock(), self._lock:
+            if not pending.done:  # else committed by the batch of a write ahead of it
+                if self.batch_window:
+                    time.sleep(self.batch_window)
+                with self._pending_lock:
+                    batch, self._pending = self._pending, []
+                self._commit(batch)
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _commit(self, batch: List[_PendingWrite]):
+        """Apply a batch of changes to an in-memory copy of the latest version and publish them as one"""
+        try:
+            self.refresh()
+            today = int(time.time()) // SECONDS_PER_DAY
+            data_service = self.data_service
+            # Writes go to a private in-memory copy; the mapped version stays read-only
+            data_service.load_table(data_service.table.copy(), changed_ids=[])
+            since = data_service.version
+            for pending in batch:
+                try:
+                    pending.result = pending.change()
+                except Exception as e:
+                    pending.error = e
+            changed_ids = sorted({policy_id for _, policy_id, _ in data_service.get_changes_since(since)})
+            if changed_ids or self.snapshot.as_of_day != today:
+                self._publish(changed_ids)
+                self.refresh()
+            else:
+                self._apply(self.snapshot, changed_ids=[])  # nothing to publish; back to the mapped version
+        except Exception as e:
+            # Nothing was published: fail every write in the batch and serve the mapped version again
+            for pending in batch:
+                pending.error = pending.error or e
+            if self.snapshot is not None:
+                self._apply(self.snapshot, changed_ids=None)
+        finally:
+            for pending in batch:
+                pending.done = True
+
+    def _publish(self, changed_ids: Optional[List[int]]) -> int:
+        predictor = self.risk_predictor
+        return self.store.publish(
+            self.data_service.table,
+            predictor.feature_store,
+            predictor.attribution,
+            predictor.scaler,
+            predictor.model_metadata,
+            changed_ids
+        )
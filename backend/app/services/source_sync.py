@@ -0,0 +1,521 @@
+import io
+import itertools
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.services.data_service import DataService
+from app.services.metrics import metrics, stage
+from app.services.policy_store import NO_END, STATUS_CODES, PolicyTable
+
+SYNCED_ROWS = metrics.counter(
+    "source_sync_rows_total", "Extract rows synced, by outcome (inserted, updated, unchanged, rejected)", ["outcome"]
+)
+SYNCED_DELETES = metrics.counter("source_sync_deletes_total", "Policies deleted because they left the extracts")
+PARSED_ROWS = metrics.counter("source_sync_parsed_rows_total", "Extract rows parsed (the rest matched a known line)")
+
+STRING_COLUMNS = ["name", "description", "category", "status"]
+DATE_COLUMNS = ["start_date", "end_date", "created_at", "updated_at"]
+SOURCE_COLUMNS = ["id"] + STRING_COLUMNS + ["budget"] + DATE_COLUMNS
+# Target metrics are spread over one column per metric, e.g. "target_metrics.employment_rate"
+METRIC_PREFIX = "target_metrics."
+# Everything is read as text and converted per row, so a malformed value rejects its row rather than the file
+SOURCE_DTYPES = {column: str for column in SOURCE_COLUMNS}
+# Only these may be left empty; the other dates, the budget and every string but the description are required
+OPTIONAL_COLUMNS = {"description", "end_date"}
+EXTENSIONS = (".csv", ".xlsx")
+
+
+def _local_epoch(values: pd.Series) -> np.ndarray:
+    """Naive local datetimes to epoch seconds, like to_epoch; NaT becomes NO_END"""
+    wall = values.to_numpy("datetime64[s]").astype(np.int64)
+    missing = values.isna().to_numpy()
+    # The UTC offset only changes on the hour, so ask the OS once per distinct hour
+    hours, inverse = np.unique(np.where(missing, 0, wall) // 3600, return_inverse=True)
+    offsets = np.array(
+        [hour * 3600 - int(time.mktime(time.gmtime(hour * 3600)[:8] + (-1,))) for hour in hours.tolist()],
+        dtype=np.int64
+    )
+    return np.where(missing, NO_END, wall - offsets[inverse])
+
+
+def _csv_records(lines: Iterable[bytes]) -> Iterator[bytes]:
+    """Join physical lines into CSV records (a quoted field may span lines), without line endings"""
+    pending = None
+    for line in lines:
+        if pending is not None:
+            pending += line
+            if line.count(b'"') % 2:
+                yield pending.rstrip(b"\r\n")
+                pending = None
+        elif b'"' in line and line.count(b'"') % 2:
+            pending = line
+        else:
+            line = line.rstrip(b"\r\n")
+            if line:
+                yield line
+    if pending is not None:
+        yield pending.rstrip(b"\r\n")
+
+
+def _csv_blocks(f, block_bytes: int) -> Iterator[List[bytes]]:
+    """Read a CSV file's records (without line endings) in blocks of about block_bytes"""
+    while True:
+        data = f.read(block_bytes)
+        if not data:
+            return
+        data += f.readline()  # finish the last line
+        if b'"' in data:
+            # Don't end the block inside a quoted field
+            while data.count(b'"') % 2:
+                line = f.readline()
+                if not line:
+                    break
+                data += line
+            yield list(_csv_records(data.splitlines(keepends=True)))
+        else:
+            if b"\r" in data:
+                data = data.replace(b"\r\n", b"\n")
+            yield [line for line in data.split(b"\n") if line]
+
+
+class Block:
+    """A block of extract rows: ids and hashes of its valid rows in file order, and the rows that were parsed"""
+
+    def __init__(
+        self,
+        ids: np.ndarray,
+        hashes: np.ndarray,
+        line_hashes: np.ndarray,
+        parsed: Optional[pd.DataFrame],
+        rejected_ids: np.ndarray,
+        rejected: int
+    ):
+        self.ids = ids
+        self.hashes = hashes
+        self.line_hashes = line_hashes  # 0 where the row has no raw line (XLSX)
+        self.parsed = parsed  # canonical columns plus _hash
+        self.rejected_ids = rejected_ids
+        self.rejected = rejected
+
+
+class SourceSync:
+    """Keeps the portfolio in sync with the CSV/XLSX extracts dropped into a directory.
+
+    Extracts are streamed a block at a time: CSV as blocks of raw lines,
+    XLSX as chunks of rows from an openpyxl read-only sheet. Rows are
+    parsed with explicit dtypes, reduced to canonical typed columns and
+    hashed, and the hashes diffed against those of the current policies,
+    which are kept between syncs and only recomputed for policies written
+    since. A CSV line seen verbatim at the last sync, for a policy not
+    written since, is known to match without being parsed, so a re-sync
+    parses only new and changed lines. Only changed rows are kept in
+    memory. Inserts, updates and deletes (policies in no extract) are then
+    applied in one atomic swap, which invalidates caches and indexes like
+    any other write. Later rows win over earlier rows with the same id;
+    malformed rows are rejected and leave their policy as it is.
+    """
+
+    def __init__(
+        self, data_service: DataService, directory: str, chunk_size: int = 100000, block_bytes: int = 16 * 2 ** 20
+    ):
+        self.data_service = data_service
+        self.directory = directory
+        self.chunk_size = chunk_size  # XLSX rows per chunk
+        self.block_bytes = block_bytes  # CSV bytes per block
+        # Sorted ids and canonical row hashes of the policies as of data version self._version
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._hashes = np.zeros(0, dtype=np.uint64)
+        self._metric_names: Optional[Tuple[str, ...]] = None
+        self._version = 0
+        # Sorted hashes of the CSV lines the policies were last synced from, and their ids
+        self._line_hashes = np.zeros(0, dtype=np.uint64)
+        self._line_ids = np.zeros(0, dtype=np.int64)
+        self._lock = threading.Lock()
+
+    def files(self) -> List[str]:
+        """The extracts to sync, in name order"""
+        names = sorted(name for name in os.listdir(self.directory) if name.lower().endswith(EXTENSIONS))
+        return [os.path.join(self.directory, name) for name in names]
+
+    def sync(self) -> Dict[str, Any]:
+        """Apply the differences between the extracts and the current policies; returns a summary"""
+        with self._lock:
+            started = time.perf_counter()
+            paths = self.files()
+            headers = {path: self._header(path) for path in paths}
+            metric_names = tuple(sorted({
+                column[len(METRIC_PREFIX):] for columns in headers.values() for column in columns
+                if column.startswith(METRIC_PREFIX)
+            }))
+            with stage("source_sync.store_hashes"):
+                since, written = self._refresh_hashes(metric_names)
+            store_ids, store_hashes = self._ids, self._hashes
+
+            with stage("source_sync.diff"):
+                blocks: List[Block] = []
+                changed: List[pd.DataFrame] = []
+                parsed = 0
+                for path in paths:
+                    read = self._read_xlsx if path.lower().endswith(".xlsx") else self._read_csv
+                    for block in read(path, headers[path], metric_names, written):
+                        if block.parsed is not None:
+                            parsed += len(block.parsed) + block.rejected
+                            stored = self._lookup(store_ids, store_hashes, block.parsed["id"].to_numpy())
+                            differs = stored != block.parsed["_hash"].to_numpy()
+                            if differs.any():
+                                changed.append(block.parsed[differs])
+                            block.parsed = None  # keep only the ids and hashes of unchanged rows
+                        blocks.append(block)
+
+                all_ids = np.concatenate([np.zeros(0, dtype=np.int64)] + [block.ids for block in blocks])
+                last = self._last_rows(all_ids)
+                ids = all_ids[last]
+                hashes = np.concatenate([np.zeros(0, dtype=np.uint64)] + [block.hashes for block in blocks])[last]
+                line_hashes = np.concatenate(
+                    [np.zeros(0, dtype=np.uint64)] + [block.line_hashes for block in blocks]
+                )[last]
+                rejected = sum(block.rejected for block in blocks)
+                rejected_ids = np.concatenate([np.zeros(0, dtype=np.int64)] + [block.rejected_ids for block in blocks])
+                rows = len(all_ids) + rejected
+                del blocks, all_ids
+                if not len(ids) and len(store_ids):
+                    raise ValueError("The extracts hold no valid rows; refusing to delete every policy")
+
+                changes = pd.concat(changed, ignore_index=True) if changed else None
+                if changes is not None:
+                    # Keep only each id's last row, and drop it if that row matches the store after all
+                    changes = changes.drop_duplicates("id", keep="last")
+                    final = self._lookup(ids, hashes, changes["id"].to_numpy())
+                    stored = self._lookup(store_ids, store_hashes, changes["id"].to_numpy())
+                    changes = changes[(changes["_hash"].to_numpy() == final) & (stored != final)]
+                    changes = changes if len(changes) else None
+
+                # Policies whose rows were rejected are left as they are, not deleted
+                listed = np.isin(store_ids, ids)
+                kept = ~listed & np.isin(store_ids, rejected_ids)
+                deleted = store_ids[~listed & ~kept]
+                inserted = updated = 0
+                if changes is not None:
+                    inserted = int((~np.isin(changes["id"].to_numpy(), store_ids)).sum())
+                    updated = len(changes) - inserted
+
+            with stage("source_sync.apply"):
+                table = self._table(changes, metric_names) if changes is not None else PolicyTable(capacity=1)
+                applied = self.data_service.apply_changes(table, deleted.tolist())
+                # Unless something else was written meanwhile, the hashes below are current as of our write
+                if self.data_service.version == since + bool(applied):
+                    since = self.data_service.version
+
+            # The store now holds the extracts plus the policies of rejected rows; anything
+            # written meanwhile is at a version after `since`, so it is rehashed next time
+            unchanged = len(ids) - inserted - updated
+            from_lines = line_hashes != 0
+            order = np.argsort(line_hashes[from_lines])
+            self._line_hashes, self._line_ids = line_hashes[from_lines][order], ids[from_lines][order]
+            if kept.any():
+                ids, hashes = np.concatenate([ids, store_ids[kept]]), np.concatenate([hashes, store_hashes[kept]])
+                order = np.argsort(ids)
+                ids, hashes = ids[order], hashes[order]
+            self._ids, self._hashes = ids, hashes  # _last_rows leaves them in id order
+            self._version = since
+
+            SYNCED_ROWS.labels("inserted").inc(inserted)
+            SYNCED_ROWS.labels("updated").inc(updated)
+            SYNCED_ROWS.labels("unchanged").inc(unchanged)
+            SYNCED_ROWS.labels("rejected").inc(rejected)
+            SYNCED_DELETES.inc(len(deleted))
+            PARSED_ROWS.inc(parsed)
+            return {
+                "files": [os.path.basename(path) for path in paths],
+                "rows": rows,
+                "parsed": parsed,
+                "inserted": inserted,
+                "updated": updated,
+                "deleted": len(deleted),
+                "unchanged": unchanged,
+                "rejected": rejected,
+                "seconds": round(time.perf_counter() - started, 3)
+            }
+
+    # Reading
+
+    @staticmethod
+    def _header(path: str) -> List[str]:
+        if path.lower().endswith(".xlsx"):
+            import openpyxl
+            workbook = openpyxl.load_workbook(path, read_only=True)
+            try:
+                header = next(workbook.active.iter_rows(max_row=1, values_only=True), ())
+            finally:
+                workbook.close()
+            columns = [str(column) for column in header if column is not None]
+        else:
+            columns = list(pd.read_csv(path, nrows=0).columns)
+        missing = [column for column in SOURCE_COLUMNS if column not in columns]
+        if missing:
+            raise ValueError(f"{os.path.basename(path)} is missing columns: {', '.join(missing)}")
+        return columns
+
+    def _read_csv(
+        self, path: str, columns: List[str], metric_names: Sequence[str], written: Optional[np.ndarray]
+    ) -> Iterator[Block]:
+        """Stream a CSV extract, parsing only the lines not seen verbatim at the last sync"""
+        metric_columns = [column for column in columns if column.startswith(METRIC_PREFIX)]
+        dtype = {**SOURCE_DTYPES, **{column: str for column in metric_columns}}
+        # Empty strings stay strings; only the numbers and dates read empty fields as missing
+        na_values = {column: [""] for column in ["id", "budget"] + DATE_COLUMNS + metric_columns}
+        # Without the writes since the last sync, no line can be trusted to match
+        known_hashes = self._line_hashes if written is not None else np.zeros(0, dtype=np.uint64)
+
+        with open(path, "rb") as f:
+            header = f.readline()
+            # The same line under another header means something else
+            salt = np.uint64(hash(header.rstrip(b"\r\n")) & 0xFFFFFFFFFFFFFFFF)
+            for lines in _csv_blocks(f, self.block_bytes):
+                line_hashes = np.fromiter(map(hash, lines), dtype=np.int64, count=len(lines)).view(np.uint64) ^ salt
+                line_hashes[line_hashes == 0] = 1  # 0 means "no line"
+
+                ids = np.zeros(len(lines), dtype=np.int64)
+                known = np.zeros(len(lines), dtype=bool)
+                if len(known_hashes):
+                    # Look the block up in hash order, which is far kinder to the cache
+                    order = np.argsort(line_hashes)
+                    pos = np.empty(len(lines), dtype=np.int64)
+                    pos[order] = np.minimum(np.searchsorted(known_hashes, line_hashes[order]), len(known_hashes) - 1)
+                    known = known_hashes[pos] == line_hashes
+                    ids[known] = self._line_ids[pos[known]]
+                    known[known] = ~np.isin(ids[known], written)
+
+                hashes = self._lookup(self._ids, self._hashes, ids)
+                valid = known.copy()
+                parsed, rejected_ids = None, np.zeros(0, dtype=np.int64)
+                misses = np.flatnonzero(~known)
+                if len(misses):
+                    chunk = pd.read_csv(
+                        io.BytesIO(header + b"\n".join([lines[i] for i in misses.tolist()]) + b"\n"),
+                        usecols=SOURCE_COLUMNS + metric_columns, dtype=dtype, keep_default_na=False,
+                        na_values=na_values
+                    )
+                    frame, parsed_valid, rejected_ids = self._canonical(chunk, metric_names)
+                    parsed = frame.assign(_hash=self._hash(frame))
+                    rows = misses[parsed_valid]
+                    ids[rows] = parsed["id"].to_numpy()
+                    hashes[rows] = parsed["_hash"].to_numpy()
+                    valid[rows] = True
+                yield Block(
+                    ids[valid], hashes[valid], line_hashes[valid], parsed, rejected_ids, len(lines) - int(valid.sum())
+                )
+
+    def _read_xlsx(
+        self, path: str, columns: List[str], metric_names: Sequence[str], written: Optional[np.ndarray]
+    ) -> Iterator[Block]:
+        """Stream an XLSX extract's first sheet; every row is parsed"""
+        import openpyxl
+        workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = [None if column is None else str(column) for column in next(rows, ())]
+            while True:
+                records = list(itertools.islice(rows, self.chunk_size))
+                if not records:
+                    break
+                chunk = pd.DataFrame.from_records(records, columns=header)
+                frame, valid, rejected_ids = self._canonical(chunk, metric_names)
+                parsed = frame.assign(_hash=self._hash(frame))
+                yield Block(
+                    parsed["id"].to_numpy(), parsed["_hash"].to_numpy(), np.zeros(len(frame), dtype=np.uint64),
+                    parsed, rejected_ids, len(chunk) - len(frame)
+                )
+        finally:
+            workbook.close()
+
+    @staticmethod
+    def _strings(column: pd.Series) -> np.ndarray:
+        values = column.to_numpy(dtype=object)
+        if pd.api.types.infer_dtype(values, skipna=False) != "string":
+            # Empty cells, and numbers typed into text columns (XLSX)
+            values = np.array(["" if value is None or value != value else str(value) for value in values], dtype=object)
+        return values
+
+    @staticmethod
+    def _numbers(column: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+        """A column as floats, parsed exactly like float(); blanks and malformed values are NaN, the latter flagged"""
+        malformed = np.zeros(len(column), dtype=bool)
+        if column.dtype.kind in "biuf":
+            return column.to_numpy(dtype=np.float64), malformed
+        values = column.to_numpy(dtype=object)
+        try:
+            # pd.to_numeric can be an ulp off, which would make every sync see changes
+            return values.astype(np.float64), malformed
+        except (TypeError, ValueError):
+            pass
+        numbers = np.full(len(values), np.nan)
+        for i, value in enumerate(values.tolist()):
+            if value is None or value != value or value == "":
+                continue
+            try:
+                numbers[i] = float(value)
+            except (TypeError, ValueError):
+                malformed[i] = True
+        return numbers, malformed
+
+    def _canonical(
+        self, chunk: pd.DataFrame, metric_names: Sequence[str]
+    ) -> Tuple[pd.DataFrame, np.ndarray, np.ndarray]:
+        """The chunk's valid rows as canonical typed columns, which rows those are, and the ids of rejected rows"""
+        ids, _ = self._numbers(chunk["id"])
+        strings = {column: self._strings(chunk[column]) for column in STRING_COLUMNS}
+        status = pd.Series(strings["status"]).map(STATUS_CODES).to_numpy(dtype=np.float64)
+        unknown = np.isnan(status)
+        if unknown.any():
+            status[unknown] = pd.Series(strings["status"][unknown]).str.strip().str.lower().map(STATUS_CODES)
+        budget, _ = self._numbers(chunk["budget"])
+        dates = {
+            column: pd.to_datetime(chunk[column], format="ISO8601", errors="coerce") for column in DATE_COLUMNS
+        }
+
+        whole_id = np.mod(ids, 1) == 0  # False for NaN too
+        valid = whole_id & ~np.isnan(status) & ~np.isnan(budget)
+        valid &= (strings["name"] != "") & (strings["category"] != "")
+        for column in DATE_COLUMNS:
+            if column not in OPTIONAL_COLUMNS:
+                valid &= dates[column].notna().to_numpy()
+        # Metrics may be left empty, but not filled with something that isn't a number
+        metrics = {}
+        for name in metric_names:
+            column = METRIC_PREFIX + name
+            if column in chunk.columns:
+                metrics[column], malformed = self._numbers(chunk[column])
+                valid &= ~malformed
+
+        count = int(valid.sum())
+        frame = {
+            "id": ids[valid].astype(np.int64),
+            "name": strings["name"][valid],
+            "description": strings["description"][valid],
+            "category": strings["category"][valid],
+            "status": status[valid].astype(np.int8),
+            "budget": budget[valid]
+        }
+        for column in DATE_COLUMNS:
+            frame[column] = _local_epoch(dates[column][valid])
+        frame["other_metrics"] = np.zeros(count, dtype=np.int64)
+        for name in metric_names:
+            column = METRIC_PREFIX + name
+            frame[column] = metrics[column][valid] if column in metrics else np.full(count, np.nan)
+
+        return pd.DataFrame(frame), valid, ids[~valid & whole_id].astype(np.int64)
+
+    # Hashing
+
+    @staticmethod
+    def _hash(frame: pd.DataFrame) -> np.ndarray:
+        """One 64-bit hash per row of a canonical frame"""
+        for column in frame.columns:
+            values = frame[column].to_numpy()
+            if values.dtype == np.float64:
+                # Floats hash by their bits: use one NaN, and +0.0 for -0.0
+                frame[column] = np.where(np.isnan(values), np.nan, values + 0.0)
+        return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+    def _table_frame(self, table: PolicyTable, rows: np.ndarray, metric_names: Sequence[str]) -> pd.DataFrame:
+        """Canonical columns of table rows, matching _canonical's for the same policies"""
+        row_list = rows.tolist()
+        vocab = table.metric_vocab.names[:table.metrics.shape[1]]
+        values = table.metrics[rows]
+        present = ~np.isnan(values)
+        columns = {name: j for j, name in enumerate(vocab)}
+        others = np.ones(len(vocab), dtype=bool)
+        others[[columns[name] for name in metric_names if name in columns]] = False
+
+        frame = {
+            "id": table.ids[rows],
+            "name": np.array([table.names[row] for row in row_list], dtype=object),
+            "description": np.array([table.descriptions[row] for row in row_list], dtype=object),
+            "category": np.array(table.categories.names + [""], dtype=object)[table.category[rows]],
+            "status": table.status[rows],
+            "budget": table.budget[rows]
+        }
+        for column, source in zip(DATE_COLUMNS, ("start_ts", "end_ts", "created_ts", "updated_ts")):
+            frame[column] = getattr(table, source)[rows]
+        frame["other_metrics"] = present[:, others].sum(axis=1).astype(np.int64)
+        for name in metric_names:
+            j = columns.get(name)
+            frame[METRIC_PREFIX + name] = values[:, j] if j is not None else np.full(len(rows), np.nan)
+        return pd.DataFrame(frame)
+
+    def _refresh_hashes(self, metric_names: Tuple[str, ...]) -> Tuple[int, Optional[np.ndarray]]:
+        """Bring the stored hashes up to date with the current policies
+
+        Returns the data version they reflect, and the ids written since the
+        last sync, or None when every policy had to be rehashed.
+        """
+        data_service = self.data_service
+        version = data_service.version  # read before the table, so later writes are rehashed next time
+        table = data_service.table
+
+        written = None
+        if metric_names == self._metric_names:
+            written = np.unique(np.array(
+                [policy_id for _, policy_id, _ in data_service.get_changes_since(self._version)], dtype=np.int64
+            ))
+            if len(written) > len(self._ids) // 2 + 1000:
+                written = None  # cheaper to start over
+
+        if written is None:
+            rows = table.alive_rows()
+            ids, hashes = table.ids[rows], self._hash(self._table_frame(table, rows, metric_names))
+        else:
+            keep = ~np.isin(self._ids, written)
+            rows = np.array(
+                [row for row in (table.row_of.get(policy_id) for policy_id in written.tolist()) if row is not None],
+                dtype=np.int64
+            )
+            ids = np.concatenate([self._ids[keep], table.ids[rows]])
+            hashes = np.concatenate([self._hashes[keep], self._hash(self._table_frame(table, rows, metric_names))])
+
+        order = np.argsort(ids)
+        self._ids, self._hashes = ids[order], hashes[order]
+        self._metric_names = metric_names
+        self._version = version
+        return version, written
+
+    @staticmethod
+    def _lookup(sorted_ids: np.ndarray, hashes: np.ndarray, ids: np.ndarray) -> np.ndarray:
+        """Hash stored for each id, 0 where it has none"""
+        if not len(sorted_ids):
+            return np.zeros(len(ids), dtype=np.uint64)
+        pos = np.minimum(np.searchsorted(sorted_ids, ids), len(sorted_ids) - 1)
+        return np.where(sorted_ids[pos] == ids, hashes[pos], np.uint64(0))
+
+    @staticmethod
+    def _last_rows(ids: np.ndarray) -> np.ndarray:
+        """Index of each distinct id's last row, in id order"""
+        _, first_from_end = np.unique(ids[::-1], return_index=True)
+        return len(ids) - 1 - first_from_end
+
+    # Applying
+
+    @staticmethod
+    def _table(changes: pd.DataFrame, metric_names: Sequence[str]) -> PolicyTable:
+        category_codes, categories = pd.factorize(changes["category"])
+        return PolicyTable.from_columns(
+            ids=changes["id"].to_numpy(),
+            names=changes["name"].tolist(),
+            descriptions=changes["description"].tolist(),
+            categories=list(categories),
+            category_codes=category_codes,
+            status_codes=changes["status"].to_numpy(),
+            budget=changes["budget"].to_numpy(),
+            start_ts=changes["start_date"].to_numpy(),
+            end_ts=changes["end_date"].to_numpy(),
+            created_ts=changes["created_at"].to_numpy(),
+            updated_ts=changes["updated_at"].to_numpy(),
+            metric_names=list(metric_names),
+            metric_values=changes[[METRIC_PREFIX + name for name in metric_names]].to_numpy(dtype=np.float64)
+        )
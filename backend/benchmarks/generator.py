@@ -0,0 +1,162 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app.models.schemas import Policy, PolicyStatus
+from app.services.policy_store import NO_END, STATUS_CODES, PolicyTable
+
+CATEGORIES = ["Healthcare", "Education", "Infrastructure", "Environment", "Economic"]
+STATUSES = [PolicyStatus.ACTIVE, PolicyStatus.COMPLETED, PolicyStatus.DRAFT]
+BASE_REGIONS = ["North", "South", "East", "West", "Central"]
+
+# (name, low, high) matching the ranges used by DataService's mock data
+BASE_METRICS = [
+    ("employment_rate", 5, 15),
+    ("satisfaction_score", 60, 90),
+    ("cost_efficiency", 70, 95)
+]
+
+DAY = np.timedelta64(1, "D")
+
+
+def region_names(n_regions: int) -> List[str]:
+    """Get n region names, extending the standard five with numbered regions"""
+    return BASE_REGIONS[:n_regions] + [f"Region {i}" for i in range(len(BASE_REGIONS) + 1, n_regions + 1)]
+
+
+def metric_specs(n_metrics: int) -> List[tuple]:
+    """Get (name, low, high) for n target metrics, extending the standard three"""
+    extra = [(f"metric_{i}", 10, 100) for i in range(len(BASE_METRICS) + 1, n_metrics + 1)]
+    return BASE_METRICS[:n_metrics] + extra
+
+
+def generate_portfolio(
+    n_policies: int,
+    n_metrics: int = 3,
+    n_regions: int = 5,
+    seed: int = 42,
+    now: Optional[datetime] = None
+) -> Dict[str, object]:
+    """Generate a columnar synthetic portfolio with the same distributions as the mock data"""
+    rng = np.random.default_rng(seed)
+    now64 = np.datetime64(now or datetime.now(), "us")
+
+    start_dates = now64 - rng.integers(30, 366, n_policies) * DAY
+    has_end = rng.random(n_policies) > 0.3
+    end_dates = start_dates + rng.integers(90, 731, n_policies) * DAY
+
+    specs = metric_specs(n_metrics)
+    metric_values = np.empty((n_policies, len(specs)))
+    for j, (_, low, high) in enumerate(specs):
+        metric_values[:, j] = rng.uniform(low, high, n_policies)
+
+    return {
+        "id": np.arange(1, n_policies + 1),
+        "category": rng.integers(0, len(CATEGORIES), n_policies),
+        "name_category": rng.integers(0, len(CATEGORIES), n_policies),
+        "status": rng.integers(0, len(STATUSES), n_policies),
+        "budget": rng.uniform(100000, 5000000, n_policies),
+        "start_date": start_dates,
+        "end_date": end_dates,
+        "has_end": has_end,
+        "created_at": start_dates - 30 * DAY,
+        "updated_at": now64 - rng.integers(0, 31, n_policies) * DAY,
+        "metric_names": [name for name, _, _ in specs],
+        "metric_values": metric_values,
+        "regions": region_names(n_regions)
+    }
+
+
+def _epoch(values: np.ndarray) -> np.ndarray:
+    """Convert naive local datetime64 values to epoch seconds, as PolicyTable stores them"""
+    naive_seconds = values.astype("datetime64[s]").astype(np.int64)
+    offset = int(datetime.now().astimezone().utcoffset().total_seconds())
+    return naive_seconds - offset
+
+
+def to_table(portfolio: Dict[str, object]) -> PolicyTable:
+    """Build a PolicyTable straight from the generated columns"""
+    ids = portfolio["id"]
+    categories = portfolio["category"]
+    name_categories = portfolio["name_category"].tolist()
+    end_ts = np.where(portfolio["has_end"], _epoch(portfolio["end_date"]), NO_END)
+    status_codes = np.array([STATUS_CODES[s.value] for s in STATUSES], dtype=np.int8)[portfolio["status"]]
+    descriptions = [f"Comprehensive {c.lower()} policy aimed at improving outcomes" for c in CATEGORIES]
+
+    return PolicyTable.from_columns(
+        ids=ids,
+        names=[f"Policy {i}: {CATEGORIES[c]} Initiative" for i, c in zip(ids.tolist(), name_categories)],
+        descriptions=[descriptions[c] for c in categories.tolist()],
+        categories=CATEGORIES,
+        category_codes=categories,
+        status_codes=status_codes,
+        budget=portfolio["budget"],
+        start_ts=_epoch(portfolio["start_date"]),
+        end_ts=end_ts,
+        created_ts=_epoch(portfolio["created_at"]),
+        updated_ts=_epoch(portfolio["updated_at"]),
+        metric_names=portfolio["metric_names"],
+        metric_values=portfolio["metric_values"]
+    )
+
+
+def to_policies(portfolio: Dict[str, object]) -> List[Policy]:
+    """Materialize Policy objects from a generated portfolio without per-field validation"""
+    ids = portfolio["id"].tolist()
+    categories = [CATEGORIES[c] for c in portfolio["category"].tolist()]
+    name_categories = [CATEGORIES[c] for c in portfolio["name_category"].tolist()]
+    statuses = [STATUSES[s] for s in portfolio["status"].tolist()]
+    budgets = portfolio["budget"].tolist()
+    start_dates = portfolio["start_date"].tolist()
+    end_dates = portfolio["end_date"].tolist()
+    has_end = portfolio["has_end"].tolist()
+    created = portfolio["created_at"].tolist()
+    updated = portfolio["updated_at"].tolist()
+    metric_names = portfolio["metric_names"]
+    metric_values = portfolio["metric_values"].tolist()
+
+    return [
+        Policy.model_construct(
+            id=ids[i],
+            name=f"Policy {ids[i]}: {name_categories[i]} Initiative",
+            description=f"Comprehensive {categories[i].lower()} policy aimed at improving outcomes",
+            category=categories[i],
+            start_date=start_dates[i],
+            end_date=end_dates[i] if has_end[i] else None,
+            budget=budgets[i],
+            target_metrics=dict(zip(metric_names, metric_values[i])),
+            status=statuses[i],
+            created_at=created[i],
+            updated_at=updated[i]
+        )
+        for i in range(len(ids))
+    ]
+
+
+def write_training_history(path: str, n_rows: int, chunk_size: int = 1000000, seed: int = 42) -> str:
+    """Write a synthetic historical risk dataset as CSV, chunk by chunk.
+
+    Features follow RiskPredictor's definitions; the label is a noisy
+    weighted score of the features cut into four risk levels.
+    """
+    from app.services.feature_store import FEATURE_NAMES, STATUS_FEATURES
+    from app.services.risk_training import LABEL_COLUMN
+
+    rng = np.random.default_rng(seed)
+    status_values = np.array(sorted(set(STATUS_FEATURES)))
+    written = 0
+    while written < n_rows:
+        n = min(chunk_size, n_rows - written)
+        budget = rng.uniform(0.02, 1.0, n)
+        days = np.minimum(1.0, rng.integers(0, 730, n) / 365)
+        metrics_count = rng.integers(1, 6, n)
+        budget_per_metric = np.minimum(1.0, budget * 5 / metrics_count)
+        status = status_values[rng.integers(0, len(status_values), n)]
+        score = (0.35 * budget + 0.25 * (1 - days) + 0.15 * (1 - metrics_count / 5)
+                 + 0.15 * budget_per_metric + 0.1 * (1 - status) + rng.normal(0, 0.08, n))
+        frame = pd.DataFrame(dict(zip(FEATURE_NAMES, [budget, days, metrics_count / 5, budget_per_metric, status])))
+        frame[LABEL_COLUMN] = np.digitize(score, [0.3, 0.45, 0.6]).astype(np.int8)
+        frame.to_csv(path, mode="w" if written == 0 else "a", header=written == 0, index=False, float_format="%.5f")
+        written += n
+    return path
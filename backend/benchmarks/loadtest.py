@@ -0,0 +1,302 @@
+"""Drive the API with concurrent mixed traffic and report per-route latency percentiles.
+
+Run from the backend directory, either in-process against the ASGI app or
+against a running server:
+
+    python -m benchmarks.loadtest --concurrency 32 --duration 20
+    python -m benchmarks.loadtest --url http://localhost:8000 --mix dashboard=1,detail=3,filter=1
+    python -m benchmarks.loadtest --sweep 1,2,4,8,16,32,64 --duration 10 --output loadtest.json
+    python -m benchmarks.loadtest --open-loop --sweep 50,100,200,400 --duration 10
+
+Each virtual user repeatedly picks a page from the traffic mix and issues
+that page's requests the way the frontend does: the dashboard polls
+metrics and the policy list, the PolicyDetail page loads the policy,
+impact, risk and recommendations in parallel and then the report, and the
+policies page posts filters. With --open-loop, page views instead arrive
+as a Poisson process at the given rates (pages/s), whether or not earlier
+ones have finished.
+
+Latency is measured from when a request was due, not from when its
+coroutine first ran: the page's arrival (or a user's wake-up) time, or for
+a request that follows others, when they completed. Time spent waiting for
+a busy event loop therefore counts, as it does for a real client.
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+DEFAULT_MIX = {"dashboard": 0.4, "detail": 0.4, "filter": 0.2}
+CATEGORIES = ["Healthcare", "Education", "Infrastructure", "Environment", "Economic"]
+STATUSES = ["active", "completed", "draft"]
+
+
+class RouteStats:
+    """Latencies and error counts collected per route template"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def request(
+        self, client: httpx.AsyncClient, route: str, method: str, url: str, scheduled: float, **kwargs
+    ):
+        """Issue a request due at `scheduled` (a perf_counter time) and record its latency from then"""
+        try:
+            response = await client.request(method, url, **kwargs)
+            failed = response.status_code >= 400
+        except httpx.HTTPError:
+            failed = True
+        self.latencies[route].append(time.perf_counter() - scheduled)
+        if failed:
+            self.errors[route] += 1
+
+    def summary(self, duration: float) -> Dict[str, Dict[str, Any]]:
+        routes = {}
+        for route, samples in sorted(self.latencies.items()):
+            timings = np.array(samples) * 1000
+            routes[route] = {
+                "requests": len(samples),
+                "throughput_rps": round(len(samples) / duration, 2),
+                "error_rate": round(self.errors[route] / len(samples), 4),
+                "p50_ms": round(float(np.percentile(timings, 50)), 3),
+                "p95_ms": round(float(np.percentile(timings, 95)), 3),
+                "p99_ms": round(float(np.percentile(timings, 99)), 3),
+                "max_ms": round(float(timings.max()), 3)
+            }
+        return routes
+
+
+async def dashboard_page(client, stats: RouteStats, policy_ids: List[int], scheduled: float):
+    await asyncio.gather(
+        stats.request(client, "GET /api/dashboard/metrics", "GET", "/api/dashboard/metrics", scheduled),
+        stats.request(client, "GET /api/policies", "GET", "/api/policies", scheduled)
+    )
+
+
+async def detail_page(client, stats: RouteStats, policy_ids: List[int], scheduled: float):
+    policy_id = random.choice(policy_ids)
+    base = f"/api/policies/{policy_id}"
+    await asyncio.gather(
+        stats.request(client, "GET /api/policies/{id}", "GET", base, scheduled),
+        stats.request(client, "GET /api/policies/{id}/impact", "GET", f"{base}/impact", scheduled),
+        stats.request(client, "POST /api/policies/{id}/predict-risk", "POST", f"{base}/predict-risk", scheduled),
+        stats.request(client, "GET /api/policies/{id}/recommendations", "GET", f"{base}/recommendations", scheduled)
+    )
+    await stats.request(client, "GET /api/policies/{id}/report", "GET", f"{base}/report", time.perf_counter())
+
+
+async def filter_page(client, stats: RouteStats, policy_ids: List[int], scheduled: float):
+    params = {"category": random.choice(CATEGORIES), "status": random.choice(STATUSES)}
+    await stats.request(client, "POST /api/policies/filter", "POST", "/api/policies/filter", scheduled, params=params)
+
+
+PAGES = {"dashboard": dashboard_page, "detail": detail_page, "filter": filter_page}
+
+
+async def monitor_loop_lag(samples: List[float], stop: asyncio.Event, interval: float = 0.01):
+    """Measure how late the event loop wakes a sleeping task"""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, loop.time() - expected))
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    policy_ids: List[int],
+    concurrency: int,
+    duration: float,
+    mix: Dict[str, float],
+    think_time: float = 0.0,
+    rate: Optional[float] = None
+) -> Dict[str, Any]:
+    """Run `concurrency` closed-loop virtual users, or open-loop arrivals at `rate` pages/s, for `duration` seconds"""
+    stats = RouteStats()
+    pages = list(mix)
+    weights = [mix[p] for p in pages]
+    deadline = time.perf_counter() + duration
+    page_views = 0
+
+    async def view(scheduled: float):
+        nonlocal page_views
+        page = random.choices(pages, weights)[0]
+        await PAGES[page](client, stats, policy_ids, scheduled)
+        page_views += 1
+
+    async def user():
+        scheduled = time.perf_counter()
+        while scheduled < deadline:
+            await view(scheduled)
+            scheduled = time.perf_counter()
+            if think_time:
+                pause = random.expovariate(1 / think_time)
+                await asyncio.sleep(pause)
+                scheduled += pause
+
+    async def arrivals():
+        # Start each page view at its arrival time, however many are still running
+        views = []
+        due = time.perf_counter()
+        while due < deadline:
+            await asyncio.sleep(max(0.0, due - time.perf_counter()))
+            while due <= time.perf_counter() and due < deadline:
+                views.append(asyncio.create_task(view(due)))
+                due += random.expovariate(rate)
+        await asyncio.gather(*views)
+
+    lag_samples: List[float] = []
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(monitor_loop_lag(lag_samples, stop))
+    started = time.perf_counter()
+    if rate:
+        await arrivals()
+    else:
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await monitor
+
+    routes = stats.summary(elapsed)
+    all_latencies = np.concatenate([np.array(s) for s in stats.latencies.values()]) * 1000 if routes else np.zeros(1)
+    total_requests = sum(r["requests"] for r in routes.values())
+    total_errors = sum(stats.errors.values())
+    lag = np.array(lag_samples or [0.0]) * 1000
+    return {
+        **({"arrival_rate": rate} if rate else {"concurrency": concurrency}),
+        "duration_s": round(elapsed, 3),
+        "page_views": page_views,
+        "requests": total_requests,
+        "throughput_rps": round(total_requests / elapsed, 2),
+        "error_rate": round(total_errors / total_requests, 4) if total_requests else 0,
+        "p50_ms": round(float(np.percentile(all_latencies, 50)), 3),
+        "p95_ms": round(float(np.percentile(all_latencies, 95)), 3),
+        "p99_ms": round(float(np.percentile(all_latencies, 99)), 3),
+        "event_loop_lag_ms": {
+            "p50": round(float(np.percentile(lag, 50)), 3),
+            "p99": round(float(np.percentile(lag, 99)), 3),
+            "max": round(float(lag.max()), 3)
+        },
+        "routes": routes
+    }
+
+
+def find_knee(levels: List[Dict[str, Any]], min_gain: float = 0.1, load: str = "concurrency") -> Optional[float]:
+    """Find the load level (concurrency, or arrival rate) after which more load stops adding throughput.
+
+    The knee is the last level before relative throughput growth falls
+    below `min_gain` times the relative growth in load.
+    """
+    for previous, current in zip(levels, levels[1:]):
+        load_growth = current[load] / previous[load] - 1
+        throughput_growth = current["throughput_rps"] / previous["throughput_rps"] - 1 if previous["throughput_rps"] else 0
+        if throughput_growth < min_gain * load_growth:
+            return previous[load]
+    return None
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        page, _, weight = part.partition("=")
+        if page not in PAGES:
+            raise argparse.ArgumentTypeError(f"unknown page '{page}', expected one of {', '.join(PAGES)}")
+        mix[page] = float(weight or 1)
+    return mix
+
+
+async def run(args) -> Dict[str, Any]:
+    app_main = None
+    if args.url:
+        def make_client(concurrency: int) -> httpx.AsyncClient:
+            limits = httpx.Limits(max_connections=max(concurrency, 100))
+            return httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits)
+
+        async with make_client(1) as client:
+            response = await client.get("/api/policies")
+            policy_ids = [p["id"] for p in response.json()]
+    else:
+        from app import main as app_main
+        from benchmarks.run import load_portfolio
+
+        def make_client(concurrency: int) -> httpx.AsyncClient:
+            transport = httpx.ASGITransport(app=app_main.app)
+            return httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=args.timeout)
+
+        if args.size:
+            load_portfolio(app_main, args.size, n_metrics=3, n_regions=5, seed=args.seed)
+        policy_ids = app_main.data_service.get_policy_ids()
+        await app_main.app.router.startup()
+
+    if args.open_loop:
+        levels = [float(r) for r in args.sweep.split(",")] if args.sweep else [args.rate]
+    else:
+        levels = [int(c) for c in args.sweep.split(",")] if args.sweep else [args.concurrency]
+    load = "arrival_rate" if args.open_loop else "concurrency"
+    results = []
+    try:
+        for level in levels:
+            concurrency = int(level) if not args.open_loop else args.concurrency
+            async with make_client(concurrency) as client:
+                result = await run_load(
+                    client, policy_ids, concurrency, args.duration, args.mix, args.think_time,
+                    rate=level if args.open_loop else None
+                )
+            results.append(result)
+            print(
+                f"{load}={level:>6g}  rps={result['throughput_rps']:>9.1f}  p50={result['p50_ms']:>8.2f} ms  "
+                f"p95={result['p95_ms']:>8.2f} ms  p99={result['p99_ms']:>8.2f} ms  errors={result['error_rate']:.2%}  "
+                f"loop lag p99={result['event_loop_lag_ms']['p99']:.2f} ms",
+                file=sys.stderr
+            )
+    finally:
+        if app_main is not None:
+            await app_main.app.router.shutdown()
+
+    knee = find_knee(results, load=load) if len(results) > 1 else None
+    return {"mix": args.mix, "levels": results, f"knee_{load}": knee}
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Mixed-traffic load test for the analytics API")
+    parser.add_argument("--url", help="base URL of a running server; omit to drive the app in-process")
+    parser.add_argument("--concurrency", type=int, default=16, help="number of virtual users")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per load level")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="page weights, e.g. dashboard=2,detail=5,filter=1")
+    parser.add_argument("--think-time", type=float, default=0.0, help="mean pause between page views (seconds)")
+    parser.add_argument("--open-loop", action="store_true", help="start page views at --rate per second instead of running users")
+    parser.add_argument("--rate", type=float, default=50.0, help="open loop: page views per second")
+    parser.add_argument("--sweep", help="comma-separated concurrency levels (open loop: arrival rates) for a saturation sweep")
+    parser.add_argument("--size", type=int, help="in-process only: load a synthetic portfolio of this size")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--output", help="write the full results as JSON")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args))
+
+    load = "arrival_rate" if args.open_loop else "concurrency"
+    for level in report["levels"]:
+        print(f"\n{load}={level[load]}")
+        for route, r in level["routes"].items():
+            print(f"  {route:<44} n={r['requests']:>7}  rps={r['throughput_rps']:>8.1f}  p50={r['p50_ms']:>8.2f}  "
+                  f"p95={r['p95_ms']:>8.2f}  p99={r['p99_ms']:>8.2f} ms  errors={r['error_rate']:.2%}")
+    if report[f"knee_{load}"] is not None:
+        print(f"\nthroughput knee at {load} {report[f'knee_{load}']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""Measure resident bytes per policy for Policy objects versus the columnar PolicyTable.
+
+Run from the backend directory:
+
+    python -m benchmarks.memory --sizes 10000,100000
+"""
+import argparse
+import gc
+import json
+import sys
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from benchmarks.generator import generate_portfolio, to_policies, to_table
+
+
+def allocated_bytes(build: Callable[[], Any]) -> int:
+    """Bytes still allocated after build() returns, with its result kept alive"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return after - before
+
+
+def measure_size(size: int, n_metrics: int, seed: int) -> Dict[str, Any]:
+    portfolio = generate_portfolio(size, n_metrics=n_metrics, seed=seed)
+    policies_bytes = allocated_bytes(lambda: to_policies(portfolio))
+    table_bytes = allocated_bytes(lambda: to_table(portfolio))
+    return {
+        "size": size,
+        "policy_objects_bytes_per_policy": round(policies_bytes / size, 1),
+        "policy_table_bytes_per_policy": round(table_bytes / size, 1),
+        "reduction": round(policies_bytes / table_bytes, 2) if table_bytes else None
+    }
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare memory per policy of Policy objects and PolicyTable")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="comma-separated portfolio sizes")
+    parser.add_argument("--metrics", type=int, default=3, help="target metrics per policy")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="optional JSON output file")
+    args = parser.parse_args(argv)
+
+    results = [measure_size(int(s), args.metrics, args.seed) for s in args.sizes.split(",")]
+    for r in results:
+        print(
+            f"{r['size']:>9}  Policy objects {r['policy_objects_bytes_per_policy']:>8.1f} B/policy  "
+            f"PolicyTable {r['policy_table_bytes_per_policy']:>7.1f} B/policy  ({r['reduction']}x smaller)"
+        )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""Measure metric-observation ingestion throughput, in the service and through the HTTP route.
+
+Run from the backend directory:
+
+    python -m benchmarks.observations --batch-sizes 1000,10000,100000 --batches 20
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from typing import Any, Dict, List
+
+import httpx
+import numpy as np
+
+from benchmarks.generator import BASE_METRICS, BASE_REGIONS, generate_portfolio, to_table
+
+
+def make_batch(rng: np.random.Generator, size: int, n_policies: int, start_ts: float) -> Dict[str, list]:
+    metric_names = [name for name, _, _ in BASE_METRICS]
+    return {
+        "policy_ids": rng.integers(1, n_policies + 1, size).tolist(),
+        "regions": [BASE_REGIONS[i] for i in rng.integers(0, len(BASE_REGIONS), size)],
+        "metrics": [metric_names[i] for i in rng.integers(0, len(metric_names), size)],
+        "timestamps": (start_ts + np.arange(size)).tolist(),
+        "values": rng.normal(50, 5, size).round(3).tolist()
+    }
+
+
+async def bench(main, batch_size: int, batches: int, n_policies: int, seed: int) -> Dict[str, Any]:
+    rng = np.random.default_rng(seed)
+    payloads = [make_batch(rng, batch_size, n_policies, 1.7e9 + i * batch_size) for i in range(batches)]
+    store = main.observation_store
+
+    started = time.perf_counter()
+    for payload in payloads:
+        store.ingest(payload["policy_ids"], payload["regions"], payload["metrics"], payload["timestamps"], payload["values"])
+    service_seconds = time.perf_counter() - started
+
+    bodies = [json.dumps(payload).encode() for payload in payloads]
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=120) as client:
+        started = time.perf_counter()
+        for body in bodies:
+            response = await client.post("/api/observations", content=body, headers={"content-type": "application/json"})
+            response.raise_for_status()
+        route_seconds = time.perf_counter() - started
+
+    total = batch_size * batches
+    return {
+        "batch_size": batch_size,
+        "observations": total,
+        "series": store.size,
+        "service_obs_per_sec": round(total / service_seconds),
+        "route_obs_per_sec": round(total / route_seconds)
+    }
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark metric-observation ingestion")
+    parser.add_argument("--batch-sizes", default="1000,10000,100000")
+    parser.add_argument("--batches", type=int, default=20)
+    parser.add_argument("--policies", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="optional JSON output file")
+    args = parser.parse_args(argv)
+
+    from app import main as app_main
+    app_main.data_service.load_table(to_table(generate_portfolio(args.policies, seed=args.seed)))
+
+    results = []
+    for batch_size in [int(s) for s in args.batch_sizes.split(",")]:
+        result = asyncio.run(bench(app_main, batch_size, args.batches, args.policies, args.seed))
+        results.append(result)
+        print(
+            f"batch {batch_size:>7}  service {result['service_obs_per_sec']:>9} obs/s  "
+            f"route {result['route_obs_per_sec']:>9} obs/s  ({result['series']} series)"
+        )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+"""Benchmark the analytics services and API routes over synthetic portfolios.
+
+Run from the backend directory:
+
+    python -m benchmarks.run --sizes 20,1000,100000 --output bench.json
+    python -m benchmarks.run --sizes 20,1000 --baseline bench.json --threshold 0.2
+
+Results are written as JSON; with --baseline, any benchmark whose median
+latency grew by more than the threshold is flagged and the exit code is 1.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List
+
+import httpx
+import numpy as np
+
+from benchmarks.generator import generate_portfolio, to_table
+
+
+def summarize(name: str, size: int, samples: List[float]) -> Dict[str, Any]:
+    """Summarize per-call timings (seconds) into a result row"""
+    timings = np.array(samples) * 1000
+    return {
+        "name": name,
+        "size": size,
+        "calls": len(samples),
+        "mean_ms": round(float(timings.mean()), 4),
+        "p50_ms": round(float(np.percentile(timings, 50)), 4),
+        "p95_ms": round(float(np.percentile(timings, 95)), 4),
+        "ops_per_sec": round(1000 / float(timings.mean()), 2) if timings.mean() > 0 else None
+    }
+
+
+def measure(fn: Callable[[int], Any], min_calls: int = 5, max_calls: int = 1000, time_budget: float = 1.0) -> List[float]:
+    """Time repeated calls of fn(i) after one warm-up call, within a time budget"""
+    fn(0)
+    samples = []
+    started = time.perf_counter()
+    while len(samples) < max_calls and (len(samples) < min_calls or time.perf_counter() - started < time_budget):
+        t0 = time.perf_counter()
+        fn(len(samples))
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+async def measure_async(fn, min_calls: int = 5, max_calls: int = 500, time_budget: float = 1.0) -> List[float]:
+    """Async counterpart of measure() for in-process ASGI requests"""
+    await fn(0)
+    samples = []
+    started = time.perf_counter()
+    while len(samples) < max_calls and (len(samples) < min_calls or time.perf_counter() - started < time_budget):
+        t0 = time.perf_counter()
+        await fn(len(samples))
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def load_portfolio(main, size: int, n_metrics: int, n_regions: int, seed: int) -> List[Any]:
+    """Generate a portfolio and load it into the app's shared services"""
+    portfolio = generate_portfolio(size, n_metrics=n_metrics, n_regions=n_regions, seed=seed)
+    for service in (main.data_service, main.impact_analyzer, main.risk_predictor):
+        service.regions = portfolio["regions"]
+    main.data_service.load_table(to_table(portfolio))
+    main.similarity_index.rebuild()  # don't time queries against the previous portfolio's tree
+    return main.data_service.head(size)
+
+
+def bench_services(main, size: int, policies: List[Any], budget: float) -> List[Dict[str, Any]]:
+    rng = np.random.default_rng(0)
+    sample = [policies[i] for i in rng.integers(0, len(policies), 256)]
+    pick = lambda i: sample[i % len(sample)]
+
+    data_service = main.data_service
+    impacts = [main.impact_analyzer.analyze(p) for p in sample]
+    risks = [main.risk_predictor.predict(p) for p in sample]
+    recommendations = [main.recommendation_engine.generate(p) for p in sample]
+
+    benches = {
+        "DataService.get_policy": lambda i: data_service.get_policy(pick(i).id),
+        "DataService.filter_policies[category]": lambda i: data_service.filter_policies(category="Healthcare"),
+        "DataService.filter_policies[status+budget]": lambda i: data_service.filter_policies(status="active", min_budget=1000000, max_budget=4000000),
+        "DataService.filter_policies[search]": lambda i: data_service.filter_policies(search_term="education"),
+        "DataService.filter_rows[active_on]": lambda i: data_service.filter_rows(active_on=date.today() - timedelta(days=i % 365)),
+        "DataService.filter_rows[ending_within_days]": lambda i: data_service.filter_rows(ending_within_days=7),
+        "DataService.get_dashboard_metrics": lambda i: data_service.get_dashboard_metrics(),
+        "ImpactAnalyzer.analyze": lambda i: main.impact_analyzer.analyze(pick(i)),
+        "ImpactAnalyzer.get_regional_impact": lambda i: main.impact_analyzer.get_regional_impact(pick(i)),
+        "RiskPredictor.predict": lambda i: main.risk_predictor.predict(pick(i)),
+        "RiskPredictor.predict_batch[256]": lambda i: main.risk_predictor.predict_batch(sample),
+        "RecommendationEngine.generate": lambda i: main.recommendation_engine.generate(pick(i)),
+        "ReportGenerator.generate": lambda i: main.report_generator.generate(
+            pick(i), impacts[i % len(sample)], risks[i % len(sample)], recommendations[i % len(sample)]
+        ),
+    }
+    return [summarize(name, size, measure(fn, time_budget=budget)) for name, fn in benches.items()]
+
+
+async def bench_routes(main, size: int, policies: List[Any], budget: float) -> List[Dict[str, Any]]:
+    rng = np.random.default_rng(1)
+    ids = [int(policies[i].id) for i in rng.integers(0, len(policies), 256)]
+    pick = lambda i: ids[i % len(ids)]
+    # 40 budgets x 25 end dates x 10 metric targets = 10k scenarios
+    sweep = {
+        "budget_multipliers": np.linspace(0.5, 1.5, 40).tolist(),
+        "end_date_shift_days": list(range(0, 375, 15)),
+        "metric_target_multipliers": np.linspace(0.8, 1.2, 10).tolist()
+    }
+
+    routes = {
+        "GET /api/policies/{id}": lambda c, i: c.get(f"/api/policies/{pick(i)}"),
+        "GET /api/policies/{id}/impact": lambda c, i: c.get(f"/api/policies/{pick(i)}/impact"),
+        "POST /api/policies/{id}/predict-risk": lambda c, i: c.post(f"/api/policies/{pick(i)}/predict-risk"),
+        "GET /api/policies/{id}/report": lambda c, i: c.get(f"/api/policies/{pick(i)}/report"),
+        "GET /api/policies/{id}/regional-impact": lambda c, i: c.get(f"/api/policies/{pick(i)}/regional-impact"),
+        "GET /api/policies/{id}/similar": lambda c, i: c.get(f"/api/policies/{pick(i)}/similar", params={"k": 10}),
+        "POST /api/policies/{id}/scenarios (10k)": lambda c, i: c.post(f"/api/policies/{pick(i)}/scenarios", json=sweep),
+        "POST /api/policies/filter": lambda c, i: c.post("/api/policies/filter", params={"category": "Healthcare", "status": "active"}),
+        "GET /api/dashboard/metrics": lambda c, i: c.get("/api/dashboard/metrics"),
+        "GET /api/dashboard/executive-overview": lambda c, i: c.get("/api/dashboard/executive-overview"),
+    }
+    if size <= 10000:
+        # Serializing the whole portfolio is only meaningful at small sizes
+        routes["GET /api/policies"] = lambda c, i: c.get("/api/policies")
+
+    results = []
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        for name, route in routes.items():
+            async def call(i, route=route):
+                response = await route(client, i)
+                response.raise_for_status()
+            results.append(summarize(name, size, await measure_async(call, time_budget=budget)))
+    return results
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """Flag benchmarks whose median latency regressed beyond the threshold"""
+    previous = {(r["name"], r["size"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        before = previous.get((result["name"], result["size"]))
+        if not before or not before["p50_ms"]:
+            continue
+        ratio = result["p50_ms"] / before["p50_ms"]
+        result["baseline_p50_ms"] = before["p50_ms"]
+        result["change_ratio"] = round(ratio, 3)
+        if ratio > 1 + threshold:
+            regressions.append(result)
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark analytics services and API routes")
+    parser.add_argument("--sizes", default="20,1000,10000", help="comma-separated portfolio sizes")
+    parser.add_argument("--metrics", type=int, default=3, help="target metrics per policy")
+    parser.add_argument("--regions", type=int, default=5, help="number of regions")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--time-budget", type=float, default=1.0, help="seconds spent per benchmark")
+    parser.add_argument("--skip-routes", action="store_true", help="only run service benchmarks")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", help="previous results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed median slowdown, e.g. 0.2 = 20%%")
+    args = parser.parse_args(argv)
+
+    from app import main as app_main
+
+    results = []
+    for size in [int(s) for s in args.sizes.split(",")]:
+        t0 = time.perf_counter()
+        policies = load_portfolio(app_main, size, args.metrics, args.regions, args.seed)
+        results.append(summarize("generator.load_portfolio", size, [time.perf_counter() - t0]))
+        print(f"size={size}: generated in {results[-1]['mean_ms']:.1f} ms", file=sys.stderr)
+
+        results.extend(bench_services(app_main, size, policies, args.time_budget))
+        if not args.skip_routes:
+            results.extend(asyncio.run(bench_routes(app_main, size, policies, args.time_budget)))
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "metrics": args.metrics,
+            "regions": args.regions,
+            "seed": args.seed
+        },
+        "results": results,
+        "regressions": [(r["name"], r["size"]) for r in regressions]
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for r in results:
+        flag = "  REGRESSION" if r in regressions else ""
+        print(f"{r['size']:>9}  {r['name']:<48} p50={r['p50_ms']:>10.3f} ms  p95={r['p95_ms']:>10.3f} ms{flag}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
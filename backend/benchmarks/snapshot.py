@@ -0,0 +1,113 @@
+"""Measure the per-worker memory cost of serving a shared snapshot versus private copies.
+
+Run from the backend directory:
+
+    python -m benchmarks.snapshot --size 1000000 --workers 4
+
+Publishes a synthetic portfolio (table, features and the mock risk model)
+once, then starts --workers processes that each load it and touch every
+page, either memory-mapped from the snapshot ("shared") or read into
+private memory ("private", what each worker held before snapshots). For
+each process the growth of unique (USS) and proportional (PSS) memory
+from before to after the load is reported, from /proc/self/smaps_rollup.
+"""
+import argparse
+import json
+import multiprocessing
+import sys
+import tempfile
+from typing import Any, Dict, List
+
+import numpy as np
+
+from benchmarks.generator import generate_portfolio, to_table
+
+
+def _memory_kb() -> Dict[str, int]:
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return {"uss": fields["Private_Clean"] + fields["Private_Dirty"], "pss": fields["Pss"]}
+
+
+def _worker(directory: str, mode: str, loaded, release, results) -> None:
+    from app.services.snapshot_store import SnapshotStore
+
+    store = SnapshotStore(directory)
+    before = _memory_kb()
+    snapshot = store.load()
+    arrays = [getattr(snapshot.table, column) for column in ("ids", "budget", "status", "category", "start_ts", "end_ts", "created_ts", "updated_ts", "metrics")]
+    arrays += [snapshot.table.names.blob, snapshot.table.descriptions.blob, snapshot.scaled, snapshot.days_remaining]
+    arrays += list(snapshot.attribution.arrays().values())
+    if mode == "private":
+        arrays = [np.array(array) for array in arrays]
+    # Touch every page, as serving a full scan would
+    checksum = sum(float(np.asarray(array, dtype=np.float64).sum()) for array in arrays if array.size)
+    loaded.wait()  # PSS splits shared pages among the processes mapping them, so measure once all have
+    after = _memory_kb()
+    results.put({key: after[key] - before[key] for key in after})
+    release.wait()
+    del checksum
+
+
+def measure(directory: str, mode: str, workers: int) -> Dict[str, Any]:
+    context = multiprocessing.get_context("spawn")
+    loaded, release, results = context.Barrier(workers + 1), context.Event(), context.Queue()
+    processes = [context.Process(target=_worker, args=(directory, mode, loaded, release, results)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    loaded.wait()
+    growth = [results.get() for _ in processes]
+    release.set()
+    for process in processes:
+        process.join()
+    return {
+        "mode": mode,
+        "workers": workers,
+        "uss_mb_per_worker": round(sum(g["uss"] for g in growth) / workers / 1024, 1),
+        "pss_mb_total": round(sum(g["pss"] for g in growth) / 1024, 1)
+    }
+
+
+def publish(directory: str, size: int, seed: int) -> float:
+    from app.services.data_service import DataService
+    from app.services.feature_store import RiskFeatureStore
+    from app.services.risk_predictor import RiskPredictor
+    from app.services.snapshot_store import SnapshotStore
+
+    data_service = DataService()
+    data_service.load_table(to_table(generate_portfolio(size, seed=seed)))
+    predictor = RiskPredictor()
+    feature_store = RiskFeatureStore(data_service, predictor.scaler)
+    store = SnapshotStore(directory)
+    with store.writer_lock():
+        version = store.publish(data_service.table, feature_store, predictor.attribution, predictor.scaler)
+    snapshot = store.load(version)
+    return sum(getattr(value, "nbytes", 0) for value in vars(snapshot.table).values()) / 2 ** 20
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Per-worker memory of shared snapshots vs private copies")
+    parser.add_argument("--size", type=int, default=1000000, help="policies in the portfolio")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="optional JSON output file")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        table_mb = publish(directory, args.size, args.seed)
+        results = [measure(directory, mode, args.workers) for mode in ("private", "shared")]
+    print(f"{args.size} policies, numeric columns {table_mb:.1f} MB")
+    for r in results:
+        print(f"{r['mode']:>8}  {r['workers']} workers  USS +{r['uss_mb_per_worker']:>7.1f} MB/worker  PSS +{r['pss_mb_total']:>7.1f} MB total")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"size": args.size, "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
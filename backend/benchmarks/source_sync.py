@@ -0,0 +1,127 @@
+"""Measure syncing policies from CSV extracts: a cold first sync, then re-syncs of a lightly changed extract.
+
+Run from the backend directory:
+
+    python -m benchmarks.source_sync --size 2000000 --change 0.01
+
+Writes the generated portfolio as a CSV extract and syncs it into the
+service (nothing changes, but every stored row is hashed once). Then
+--change of the rows are rewritten (mostly updates, plus some inserts and
+deletes) and the extract is re-synced, timed; a second changed extract is
+re-synced under tracemalloc for its peak memory.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.generator import generate_portfolio, to_table
+from app.services.policy_store import NO_END, STATUSES, PolicyTable
+from app.services.source_sync import METRIC_PREFIX
+
+
+def _local_iso(ts: np.ndarray) -> np.ndarray:
+    """Epoch seconds to naive local ISO strings (empty for NO_END), as the extracts hold dates"""
+    missing = ts == NO_END
+    ts = np.where(missing, 0, ts)
+    hours, inverse = np.unique(ts // 3600, return_inverse=True)
+    offsets = np.array([time.localtime(hour * 3600).tm_gmtoff for hour in hours.tolist()], dtype=np.int64)
+    wall = (ts + offsets[inverse]).astype("datetime64[s]")
+    return np.where(missing, "", np.datetime_as_string(wall, unit="s"))
+
+
+def write_extract(table: PolicyTable, path: str, chunk_rows: int = 500000) -> None:
+    """Write a table's live policies as a CSV extract"""
+    rows = table.alive_rows()
+    metric_names = table.metric_vocab.names[:table.metrics.shape[1]]
+    statuses = np.array([status.value for status in STATUSES], dtype=object)
+    categories = np.array(table.categories.names, dtype=object)
+    for start in range(0, len(rows), chunk_rows):
+        part = rows[start:start + chunk_rows]
+        row_list = part.tolist()
+        frame = pd.DataFrame({
+            "id": table.ids[part],
+            "name": [table.names[row] for row in row_list],
+            "description": [table.descriptions[row] for row in row_list],
+            "category": categories[table.category[part]],
+            "status": statuses[table.status[part]],
+            "budget": table.budget[part],
+            "start_date": _local_iso(table.start_ts[part]),
+            "end_date": _local_iso(table.end_ts[part]),
+            "created_at": _local_iso(table.created_ts[part]),
+            "updated_at": _local_iso(table.updated_ts[part]),
+            **{METRIC_PREFIX + name: table.metrics[part, j] for j, name in enumerate(metric_names)}
+        })
+        frame.to_csv(path, mode="w" if start == 0 else "a", header=start == 0, index=False)
+
+
+def changed_table(table: PolicyTable, fraction: float, seed: int) -> PolicyTable:
+    """A copy with `fraction` of the policies changed: 80% updated budgets, 10% deleted, 10% new"""
+    rng = np.random.default_rng(seed)
+    copy = table.copy()
+    n = len(copy)
+    picked = rng.choice(n, int(n * fraction), replace=False)
+    updates, deletes = picked[:int(len(picked) * 0.8)], picked[int(len(picked) * 0.8):int(len(picked) * 0.9)]
+    copy.budget[updates] = rng.uniform(100000, 5000000, len(updates))
+    for policy_id in copy.ids[deletes].tolist():
+        copy.delete(policy_id)
+    next_id = int(copy.ids[:copy.size].max()) + 1
+    for i, row in enumerate(picked[int(len(picked) * 0.9):].tolist()):
+        record = copy.record(row).to_policy()
+        copy.append(record.model_copy(update={"id": next_id + i, "name": f"Policy {next_id + i}: New Initiative"}))
+    return copy
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark syncing policies from CSV extracts")
+    parser.add_argument("--size", type=int, default=2000000)
+    parser.add_argument("--change", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="optional JSON output file")
+    args = parser.parse_args(argv)
+
+    from app import main as app_main
+    from app.services.source_sync import SourceSync
+
+    data_service = app_main.data_service
+    table = to_table(generate_portfolio(args.size, seed=args.seed))
+    data_service.load_table(table)
+    report: Dict[str, Any] = {"size": args.size, "change": args.change}
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "policies.csv")
+        started = time.perf_counter()
+        write_extract(table, path)
+        report["extract_mb"] = round(os.path.getsize(path) / 2 ** 20, 1)
+        print(f"wrote {args.size} policies ({report['extract_mb']} MB) in {time.perf_counter() - started:.1f} s")
+
+        sync = SourceSync(data_service, directory)
+        report["cold"] = sync.sync()
+        print(f"cold sync:   {report['cold']}")
+
+        write_extract(changed_table(data_service.table, args.change, args.seed + 1), path)
+        report["resync"] = sync.sync()
+        print(f"re-sync:     {report['resync']}")
+
+        write_extract(changed_table(data_service.table, args.change, args.seed + 2), path)
+        tracemalloc.start()
+        summary = sync.sync()
+        report["resync_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 1)
+        tracemalloc.stop()
+        print(f"re-sync:     {summary} (traced, peak {report['resync_peak_mb']} MB)")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""Benchmark the chunked risk-model training pipeline.
+
+Run from the backend directory:
+
+    python -m benchmarks.training --sizes 1000000,10000000 --output training.json
+
+Each size gets a synthetic CSV (cached in --data-dir) and is trained in a
+fresh process so that its peak resident memory can be reported on its own.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from benchmarks.generator import write_training_history
+
+
+def _train(path: str, options: Dict[str, Any], artifact_dir: str, results) -> None:
+    from app.services.risk_training import RiskModelTrainer, save_artifact
+
+    started = time.perf_counter()
+    model, scaler, metadata = RiskModelTrainer(**options).train(path)
+    artifact = save_artifact(model, scaler, metadata, artifact_dir)
+    results.put({
+        "rows": metadata["rows"],
+        "trees": metadata["n_estimators"],
+        "chunks": metadata["chunks"],
+        "fit_rows_per_sec": metadata["timing"]["rows_per_second"],
+        "end_to_end_rows_per_sec": round(metadata["rows"] / (time.perf_counter() - started), 1),
+        "scan_seconds": metadata["timing"]["scan_seconds"],
+        "fit_seconds": metadata["timing"]["fit_seconds"],
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "artifact_mb": round(os.path.getsize(os.path.join(artifact, "model.pkl")) / 2 ** 20, 1),
+        "holdout": metadata["holdout"]
+    })
+
+
+def bench_size(size: int, data_dir: str, options: Dict[str, Any], seed: int) -> Dict[str, Any]:
+    path = os.path.join(data_dir, f"risk_history_{size}_{seed}.csv")
+    if not os.path.exists(path):
+        t0 = time.perf_counter()
+        write_training_history(path, size, seed=seed)
+        print(f"size={size}: wrote {path} in {time.perf_counter() - t0:.1f} s", file=sys.stderr)
+
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    with tempfile.TemporaryDirectory() as artifact_dir:
+        process = context.Process(target=_train, args=(path, options, artifact_dir, results))
+        process.start()
+        result = results.get()
+        process.join()
+    return {"size": size, "csv_mb": round(os.path.getsize(path) / 2 ** 20, 1), **result}
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark chunked risk-model training")
+    parser.add_argument("--sizes", default="1000000,10000000", help="comma-separated row counts")
+    parser.add_argument("--data-dir", default=tempfile.gettempdir(), help="where generated CSVs are cached")
+    parser.add_argument("--chunk-size", type=int, default=500000)
+    parser.add_argument("--trees-per-chunk", type=int, default=5)
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="optional JSON output file")
+    args = parser.parse_args(argv)
+
+    options = {"chunk_size": args.chunk_size, "trees_per_chunk": args.trees_per_chunk, "n_jobs": args.n_jobs, "seed": args.seed}
+    results = []
+    for size in [int(s) for s in args.sizes.split(",")]:
+        result = bench_size(size, args.data_dir, options, args.seed)
+        results.append(result)
+        print(
+            f"{size:>10} rows  fit {result['fit_rows_per_sec']:>10.0f} rows/s  end-to-end {result['end_to_end_rows_per_sec']:>10.0f} rows/s  "
+            f"peak RSS {result['peak_rss_mb']:>7.1f} MB  trees {result['trees']:>4}  holdout {result['holdout']}"
+        )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"options": options, "cpus": os.cpu_count(), "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""Compare JSON and Arrow IPC responses for the policy list: bytes on the wire, encode and decode time.
+
+Run from the backend directory (needs pyarrow):
+
+    python -m benchmarks.wire_format --sizes 1000,100000,1000000
+
+"Encode" is the time from sending the request to receiving the whole
+body through the ASGI app; "decode" is what a data-science client does
+next, turning the body into a pandas DataFrame.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from typing import Any, Dict, List
+
+import httpx
+import pandas as pd
+
+from benchmarks.generator import generate_portfolio, to_table
+
+FORMATS = {"json": "application/json", "arrow": "application/vnd.apache.arrow.stream"}
+
+
+def decode(fmt: str, body: bytes) -> pd.DataFrame:
+    if fmt == "arrow":
+        import pyarrow as pa
+        return pa.ipc.open_stream(body).read_pandas()
+    return pd.DataFrame(json.loads(body))
+
+
+async def bench(main, path: str, repeat: int) -> List[Dict[str, Any]]:
+    transport = httpx.ASGITransport(app=main.app)
+    results = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=600) as client:
+        for fmt, media_type in FORMATS.items():
+            encode_times, decode_times = [], []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                response = await client.get(path, headers={"accept": media_type})
+                response.raise_for_status()
+                encode_times.append(time.perf_counter() - started)
+                assert response.headers["content-type"].startswith(media_type), response.headers["content-type"]
+
+                started = time.perf_counter()
+                frame = decode(fmt, response.content)
+                decode_times.append(time.perf_counter() - started)
+            results.append({
+                "format": fmt,
+                "rows": len(frame),
+                "bytes": len(response.content),
+                "encode_ms": round(min(encode_times) * 1000, 1),
+                "decode_ms": round(min(decode_times) * 1000, 1)
+            })
+    return results
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark JSON vs Arrow IPC responses")
+    parser.add_argument("--sizes", default="1000,100000,1000000")
+    parser.add_argument("--path", default="/api/policies")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="optional JSON output file")
+    args = parser.parse_args(argv)
+
+    from app import main as app_main
+    from app.services.arrow_encoder import pa
+    if pa is None:
+        print("pyarrow is not available; Arrow responses are disabled", file=sys.stderr)
+        return 1
+
+    report = []
+    for size in [int(s) for s in args.sizes.split(",")]:
+        app_main.data_service.load_table(to_table(generate_portfolio(size, seed=args.seed)))
+        results = asyncio.run(bench(app_main, args.path, args.repeat))
+        report.append({"size": size, "results": results})
+        for r in results:
+            print(
+                f"{size:>8} policies  {r['format']:>5}  {r['bytes'] / 2 ** 20:>8.1f} MB  "
+                f"encode {r['encode_ms']:>9.1f} ms  decode {r['decode_ms']:>9.1f} ms"
+            )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
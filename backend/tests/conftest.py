@@ -0,0 +1,29 @@
+import asyncio
+
+import httpx
+import pytest
+
+
+@pytest.fixture(scope="session")
+def app_main():
+    from app import main
+    return main
+
+
+@pytest.fixture(scope="session")
+def api(app_main):
+    """Send one request to the ASGI app in-process, without starting its background services"""
+    def request(method: str, url: str, **kwargs) -> httpx.Response:
+        async def send():
+            transport = httpx.ASGITransport(app=app_main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.request(method, url, **kwargs)
+        return asyncio.run(send())
+    return request
+
+
+@pytest.fixture(scope="session")
+def trained_predictor():
+    """The mock-trained risk model, trained once for the session"""
+    from app.services.risk_predictor import RiskPredictor
+    return RiskPredictor()
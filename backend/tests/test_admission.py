@@ -0,0 +1,123 @@
+import asyncio
+
+import httpx
+import pytest
+from starlette.responses import PlainTextResponse
+
+from app.middleware.admission import AdmissionMiddleware
+from app.services.admission import AdmissionController, CostClass
+
+
+@pytest.mark.parametrize("method, path, cost_class", [
+    ("GET", "/api/policies", "heavy"),
+    ("GET", "/api/policies/by-category/Healthcare", "heavy"),
+    ("GET", "/api/policies/by-status/active", "heavy"),
+    ("POST", "/api/policies/filter", "heavy"),
+    ("GET", "/api/policies/12/report", "heavy"),
+    ("POST", "/api/policies", "standard"),
+    ("GET", "/api/policies/12", "cheap"),
+    ("GET", "/api/dashboard/metrics", "cheap"),
+    ("POST", "/api/policies/12/predict-risk", "standard"),
+    ("GET", "/api/health", None),
+])
+def test_routes_map_to_cost_classes(method, path, cost_class):
+    classified = AdmissionController().classify(method, path)
+    assert (classified.name if classified else None) == cost_class
+
+
+def admitted_app(controller: AdmissionController, gate: asyncio.Event):
+    """A bare ASGI app behind the admission middleware: /slow holds its slot until the gate opens"""
+    async def app(scope, receive, send):
+        if scope["path"] == "/fail":
+            raise RuntimeError("handler failed")
+        if scope["path"] == "/slow":
+            await gate.wait()
+        await PlainTextResponse("ok")(scope, receive, send)
+    return AdmissionMiddleware(app, controller)
+
+
+def client_for(app) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+def single_class(max_queue: int, max_wait: float) -> AdmissionController:
+    cost_class = CostClass("standard", cost=1, priority=0, max_queue=max_queue, max_wait=max_wait, service_seconds=0.001)
+    return AdmissionController(max_concurrency=1, classes=[cost_class], rules=[])
+
+
+def test_clients_out_of_tokens_get_429():
+    controller = AdmissionController(client_rate=1.0, client_burst=10, client_header="X-Forwarded-For")
+
+    async def run():
+        async with client_for(admitted_app(controller, asyncio.Event())) as client:
+            first = {"X-Forwarded-For": "10.0.0.1, 192.168.0.1"}
+            assert (await client.get("/api/policies/1/report", headers=first)).status_code == 200
+            throttled = await client.get("/api/policies/1/report", headers=first)
+            assert throttled.status_code == 429
+            assert throttled.headers["Retry-After"] == "10"  # a heavy request costs 10 tokens at 1/s
+            cheap = await client.get("/api/policies/1", headers=first)
+            assert (cheap.status_code, cheap.headers["Retry-After"]) == (429, "1")
+            # Buckets are per client
+            assert (await client.get("/api/policies/1/report", headers={"X-Forwarded-For": "10.0.0.2"})).status_code == 200
+
+    asyncio.run(run())
+
+
+def test_full_queues_and_expired_waits_are_shed_with_503():
+    controller = single_class(max_queue=1, max_wait=0.2)
+
+    async def run():
+        gate = asyncio.Event()
+        async with client_for(admitted_app(controller, gate)) as client:
+            holding = asyncio.ensure_future(client.get("/slow"))
+            await asyncio.sleep(0.05)
+            queued = asyncio.ensure_future(client.get("/fast"))
+            await asyncio.sleep(0.05)
+            assert (controller.in_flight, len(controller.default_class.waiters)) == (1, 1)
+
+            full = await client.get("/fast")
+            assert full.status_code == 503 and int(full.headers["Retry-After"]) >= 1
+            timed_out = await queued  # still no slot after max_wait
+            assert timed_out.status_code == 503 and "Retry-After" in timed_out.headers
+            assert len(controller.default_class.waiters) == 0
+
+            gate.set()
+            assert (await holding).status_code == 200
+
+    asyncio.run(run())
+
+
+def test_slots_are_released_after_each_request():
+    controller = single_class(max_queue=10, max_wait=5.0)
+
+    async def run():
+        gate = asyncio.Event()
+        async with client_for(admitted_app(controller, gate)) as client:
+            holding = asyncio.ensure_future(client.get("/slow"))
+            await asyncio.sleep(0.05)
+            waiting = [asyncio.ensure_future(client.get("/fast")) for _ in range(3)]
+            await asyncio.sleep(0.05)
+            assert len(controller.default_class.waiters) == 3
+            gate.set()
+            assert [r.status_code for r in await asyncio.gather(holding, *waiting)] == [200] * 4
+            assert controller.in_flight == controller.default_class.in_flight == 0
+
+            # A failing handler gives its slot back too
+            with pytest.raises(RuntimeError):
+                await client.get("/fail")
+            assert controller.in_flight == 0
+
+            # So does a queued client that goes away
+            gate.clear()
+            holding = asyncio.ensure_future(client.get("/slow"))
+            await asyncio.sleep(0.05)
+            abandoned = asyncio.ensure_future(client.get("/fast"))
+            await asyncio.sleep(0.05)
+            abandoned.cancel()
+            await asyncio.sleep(0.05)
+            assert len(controller.default_class.waiters) == 0
+            gate.set()
+            assert (await holding).status_code == 200
+            assert controller.in_flight == 0
+
+    asyncio.run(run())
@@ -0,0 +1,50 @@
+import pytest
+
+from app.services import arrow_encoder
+from app.services.arrow_encoder import ARROW_STREAM
+
+
+def test_json_without_pyarrow(api, app_main, monkeypatch):
+    monkeypatch.setattr(arrow_encoder, "pa", None)
+    response = api("GET", "/api/policies", headers={"Accept": ARROW_STREAM})
+    assert response.headers["content-type"] == "application/json"
+    assert len(response.json()) == app_main.data_service.count()
+
+
+class TestWithPyarrow:
+    @pytest.fixture(autouse=True)
+    def pa(self):
+        return pytest.importorskip("pyarrow", exc_type=ImportError)
+
+    @pytest.mark.parametrize("accept, arrow", [
+        (ARROW_STREAM, True),
+        (f"{ARROW_STREAM}, application/json;q=0.5", True),
+        (f"application/json, {ARROW_STREAM};q=0.9", False),
+        (f"{ARROW_STREAM};q=0", False),
+        ("application/json", False),
+        ("*/*", False),
+        (None, False),
+    ])
+    def test_accept_negotiation(self, accept, arrow):
+        assert arrow_encoder.accepts_arrow(accept) is arrow
+
+    def test_policies_as_ipc_stream_or_json(self, api, app_main, pa):
+        response = api("GET", "/api/policies", headers={"Accept": ARROW_STREAM})
+        assert response.headers["content-type"] == ARROW_STREAM
+        assert response.headers["vary"] == "Accept"
+        table = pa.ipc.open_stream(response.content).read_all()
+        assert table.num_rows == app_main.data_service.count()
+        assert table.column("id").to_pylist() == app_main.data_service.get_policy_ids()
+
+        for headers in ({"Accept": "application/json"}, {}):
+            response = api("GET", "/api/policies", headers=headers)
+            assert response.headers["content-type"] == "application/json"
+            assert [policy["id"] for policy in response.json()] == app_main.data_service.get_policy_ids()
+
+    def test_analytics_as_ipc_stream(self, api, app_main, pa):
+        policy_id = app_main.data_service.get_policy_ids()[0]
+        response = api("GET", f"/api/policies/{policy_id}/regional-comparison", headers={"Accept": ARROW_STREAM})
+        assert response.headers["content-type"] == ARROW_STREAM
+        table = pa.ipc.open_stream(response.content).read_all()
+        assert sorted(table.column("region").to_pylist()) == sorted(app_main.data_service.regions)
+        assert api("GET", f"/api/policies/{policy_id}/regional-comparison").json()["policy_id"] == policy_id
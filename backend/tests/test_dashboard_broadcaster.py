@@ -0,0 +1,82 @@
+import asyncio
+import json
+from datetime import datetime
+
+from app.models.schemas import PolicyCreate
+from app.services.dashboard_broadcaster import DROPPED, DashboardBroadcaster
+from app.services.data_service import DataService
+
+
+def parse(message: bytes) -> dict:
+    fields = dict(line.split(": ", 1) for line in message.decode().strip().split("\n"))
+    return {"id": int(fields["id"]), "event": fields["event"], "data": json.loads(fields["data"])}
+
+
+def new_policy(name: str) -> PolicyCreate:
+    return PolicyCreate(name=name, description=f"{name} description", category="Environment",
+                        start_date=datetime(2024, 1, 1), budget=750000.0, target_metrics={"air_quality": 3.0})
+
+
+def test_subscribers_get_a_snapshot_then_updates():
+    data_service = DataService()
+
+    async def run():
+        broadcaster = DashboardBroadcaster(data_service, tick_interval=0.01)
+        broadcaster.start()
+        stream = broadcaster.stream(broadcaster.subscribe())
+        snapshot = parse(await anext(stream))
+        assert (snapshot["event"], snapshot["id"]) == ("snapshot", data_service.version)
+        assert len(snapshot["data"]["policies"]) == data_service.count()
+
+        created = data_service.create_policy(new_policy("Streamed"))
+        update = parse(await asyncio.wait_for(anext(stream), 5))
+        assert (update["event"], update["id"]) == ("update", data_service.version)
+        assert [policy["id"] for policy in update["data"]["upserted"]] == [created.id]
+        assert update["data"]["deleted"] == []
+        assert update["data"]["metrics"]["total_policies"] == data_service.count()
+
+        # A client reconnecting with the current version skips the snapshot
+        resumed = broadcaster.stream(broadcaster.subscribe(), last_event_id=str(data_service.version))
+        waiting = asyncio.ensure_future(anext(resumed))
+        await asyncio.sleep(0.05)
+        created = data_service.create_policy(new_policy("Streamed again"))
+        for update in (await asyncio.wait_for(waiting, 5), await asyncio.wait_for(anext(stream), 5)):
+            update = parse(update)
+            assert (update["event"], update["id"]) == ("update", data_service.version)
+            assert [policy["id"] for policy in update["data"]["upserted"]] == [created.id]
+            assert update["data"]["metrics"]["total_policies"] == data_service.count()
+
+        await broadcaster.stop()
+        assert broadcaster.subscribers == set()
+        for events in (stream, resumed):
+            assert await anext(events, None) is None
+
+    asyncio.run(run())
+
+
+def test_slow_and_disconnected_subscribers_are_removed():
+    data_service = DataService()
+
+    async def run():
+        broadcaster = DashboardBroadcaster(data_service, queue_size=2, max_subscribers=2)
+        slow, fast = broadcaster.subscribe(), broadcaster.subscribe()
+        assert broadcaster.subscribe() is None  # at capacity
+        slow_stream, fast_stream = broadcaster.stream(slow), broadcaster.stream(fast)
+        await anext(slow_stream)
+        await anext(fast_stream)
+
+        dropped = DROPPED.labels().value
+        for i in range(3):
+            broadcaster.publish(f"id: {i}\nevent: update\ndata: {{}}\n\n".encode())
+            assert parse(await anext(fast_stream))["id"] == i
+        # The slow one fell behind: its stream ends and its slot is freed
+        assert DROPPED.labels().value == dropped + 1
+        assert broadcaster.subscribers == {fast}
+        assert await anext(slow_stream, None) is None
+
+        # A client that goes away closes its stream, which unsubscribes it
+        await fast_stream.aclose()
+        assert broadcaster.subscribers == set()
+        assert broadcaster.subscribe() is not None
+
+    asyncio.run(run())
@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app.models.schemas import PolicyCreate
+from app.services import risk_predictor as risk_predictor_module
+from app.services.data_service import DataService
+from app.services.feature_store import RiskFeatureStore
+from app.services.policy_store import NO_END, SECONDS_PER_DAY, PolicyTable, to_epoch
+from benchmarks.generator import generate_portfolio, to_table
+
+
+def freeze_now(monkeypatch, now: datetime):
+    """Make the predictor's per-policy feature extraction see `now`"""
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return now
+
+    monkeypatch.setattr(risk_predictor_module, "datetime", FrozenDatetime)
+
+
+def assert_matches_extraction(store: RiskFeatureStore, predictor, now: datetime):
+    table = store.data_service.table
+    rows = table.alive_rows()
+    policies = table.records(rows)
+    expected = predictor.scaler.transform([predictor._extract_features(policy) for policy in policies])
+    np.testing.assert_allclose(store.scaled[rows], expected.astype(np.float32), rtol=1e-6, atol=1e-6)
+    now_ts = to_epoch(now)
+    ends = table.end_ts[rows]
+    np.testing.assert_array_equal(
+        store.days_remaining[rows], np.where(ends == NO_END, np.nan, (ends - now_ts) // SECONDS_PER_DAY)
+    )
+
+
+def test_stored_features_match_per_policy_extraction(trained_predictor, monkeypatch):
+    now = datetime.now().replace(microsecond=0)
+    freeze_now(monkeypatch, now)
+    data_service = DataService()
+    data_service.load_table(to_table(generate_portfolio(300, n_metrics=6, seed=8)))
+    store = RiskFeatureStore(data_service, trained_predictor.scaler)
+    store.refresh_time_features(to_epoch(now))
+    assert_matches_extraction(store, trained_predictor, now)
+
+    # Appends, in-place and through a table swap, updates and deletes
+    for i, metrics in enumerate([{}, {"a": 1.0}, {f"m{j}": 1.0 for j in range(7)}]):
+        data_service.create_policy(PolicyCreate(
+            name=f"New {i}", description="", category="Economic", start_date=now - timedelta(days=100 * i),
+            end_date=now + timedelta(days=30) if i else None, budget=2e6 * i + 1.0, target_metrics=metrics
+        ))
+    changes = PolicyTable()
+    for policy_id in (1, 2, 3):
+        policy = data_service.get_policy(policy_id).to_policy()
+        changes.append(policy.model_copy(update={"budget": 9e6, "status": "archived", "target_metrics": {}}))
+    data_service.apply_changes(changes, [4, 5])
+    assert store.table is data_service.table
+    assert_matches_extraction(store, trained_predictor, now)
+
+    # The daily refresh moves days running and remaining for every row
+    later = now + timedelta(days=40)
+    freeze_now(monkeypatch, later)
+    store.refresh_time_features(to_epoch(later))
+    assert store.as_of_day == to_epoch(later) // SECONDS_PER_DAY
+    assert_matches_extraction(store, trained_predictor, later)
@@ -0,0 +1,89 @@
+import random
+
+import numpy as np
+
+from app.services.interval_index import IntervalIndex
+from app.services.policy_store import NO_END, PolicyTable
+
+DAY = 86400
+
+
+def random_interval(rng: random.Random):
+    start = rng.randrange(0, 400) * DAY + rng.choice([0, 1, DAY - 1])
+    r = rng.random()
+    if r < 0.2:
+        end = NO_END
+    elif r < 0.25:
+        end = start - DAY  # ends before it starts: never active
+    else:
+        end = start + rng.choice([0, rng.randrange(0, 200) * DAY])
+    return start, end
+
+
+def write(table: PolicyTable, row: int, interval):
+    table.start_ts[row], table.end_ts[row] = interval
+
+
+def brute_overlapping(table: PolicyTable, start_ts: int, end_ts: int) -> list:
+    rows = table.alive_rows()
+    starts, ends = table.start_ts[rows], table.end_ts[rows]
+    open_ended = ends == NO_END
+    return rows[(starts <= end_ts) & (open_ended | ((ends >= start_ts) & (ends >= starts)))].tolist()
+
+
+def brute_ending(table: PolicyTable, start_ts: int, end_ts: int) -> list:
+    rows = table.alive_rows()
+    ends = table.end_ts[rows]
+    return rows[(ends != NO_END) & (ends >= start_ts) & (ends <= end_ts)].tolist()
+
+
+def alive(table: PolicyTable, rows: np.ndarray) -> list:
+    return rows[table.alive[rows]].tolist()
+
+
+def test_queries_match_brute_force_through_writes():
+    rng = random.Random(7)
+    for trial in range(60):
+        n = rng.randrange(1, 300)
+        table = PolicyTable(capacity=n)
+        table.size = n
+        table.ids[:n] = np.arange(1, n + 1)
+        table.alive[:n] = True
+        table.row_of = {i + 1: i for i in range(n)}
+        for row in range(n):
+            write(table, row, random_interval(rng))
+        index = IntervalIndex(max_delta=rng.choice([0, 5, 4096]))
+
+        for step in range(8):
+            # Updates, appends and deletes since the last query go to the delta
+            changed = []
+            for _ in range(rng.randrange(0, 12)):
+                action = rng.random()
+                if action < 0.5 and len(table.row_of):
+                    policy_id = rng.choice(list(table.row_of))
+                    write(table, table.row_of[policy_id], random_interval(rng))
+                elif action < 0.8:
+                    policy_id = int(table.ids[:table.size].max(initial=0)) + 1
+                    table._reserve(table.size + 1)
+                    row = table.size
+                    table.size += 1
+                    table.ids[row], table.alive[row] = policy_id, True
+                    table.row_of[policy_id] = row
+                    write(table, row, random_interval(rng))
+                elif len(table.row_of):
+                    policy_id = rng.choice(list(table.row_of))
+                    table.delete(policy_id)
+                changed.append(policy_id)
+            if changed:
+                index.changed(table, changed)
+
+            low = rng.randrange(-10, 650) * DAY + rng.choice([0, 1, DAY - 1])
+            high = low + rng.choice([0, DAY - 1, rng.randrange(0, 100) * DAY])
+            assert alive(table, index.overlapping(table, low, high)) == brute_overlapping(table, low, high)
+            assert alive(table, index.ending_between(table, low, high)) == brute_ending(table, low, high)
+
+
+def test_filter_accepts_the_extreme_days(api):
+    for day in ("0001-01-01", "9999-12-31"):
+        response = api("POST", f"/api/policies/filter?active_on={day}")
+        assert response.status_code == 200
@@ -0,0 +1,95 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from app.models.schemas import JobCreate, JobStatus, JobType
+from app.services.job_service import JobResultStore, JobService
+
+
+def echo(policy_ids):
+    return [{"policy_id": policy_id} for policy_id in policy_ids]
+
+
+def make_service(directory, handler=echo, **kwargs) -> JobService:
+    return JobService(
+        handlers={"report": handler}, policy_ids_provider=lambda: [5, 4, 3, 2, 1],
+        store=JobResultStore(str(directory)), **kwargs
+    )
+
+
+def wait_for(service: JobService, job_id: str, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        job = service.get(job_id)
+        if job.status in (JobStatus.COMPLETED, JobStatus.FAILED):
+            return job
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_submit_poll_result(tmp_path):
+    service = make_service(tmp_path)
+    job = service.submit(JobCreate(job_type=JobType.REPORT, policy_ids=[3, 1, 2, 1], chunk_size=2))
+    assert (job.status, job.total) == (JobStatus.QUEUED, 3)
+
+    done = wait_for(service, job.id)
+    assert (done.status, done.processed, done.progress) == (JobStatus.COMPLETED, 3, 1.0)
+    assert done.result == {"count": 3, "results": [{"policy_id": 1}, {"policy_id": 2}, {"policy_id": 3}]}
+    # The whole portfolio when no ids are given
+    assert wait_for(service, service.submit(JobCreate(job_type=JobType.REPORT)).id).result["count"] == 5
+
+
+def test_identical_submissions_share_a_job(tmp_path):
+    release = threading.Event()
+
+    def blocked(policy_ids):
+        release.wait(10)
+        return echo(policy_ids)
+
+    service = make_service(tmp_path, handler=blocked)
+    first = service.submit(JobCreate(job_type=JobType.REPORT, policy_ids=[1, 2, 3]))
+    # The dedup key is the sha1 of the job type and the sorted, distinct ids
+    key = hashlib.sha1(json.dumps({"job_type": "report", "policy_ids": [1, 2, 3]}).encode()).hexdigest()
+    assert service._in_flight == {key: first.id}
+    assert service.submit(JobCreate(job_type=JobType.REPORT, policy_ids=[3, 2, 1, 1])).id == first.id
+    other = service.submit(JobCreate(job_type=JobType.REPORT, policy_ids=[1, 2]))
+    assert other.id != first.id
+
+    release.set()
+    wait_for(service, first.id)
+    wait_for(service, other.id)
+    # Once finished, the same submission runs again
+    assert service.submit(JobCreate(job_type=JobType.REPORT, policy_ids=[1, 2, 3])).id != first.id
+
+
+def test_polls_are_answered_from_the_store(tmp_path):
+    service = make_service(tmp_path, max_jobs=1)
+    first = service.submit(JobCreate(job_type=JobType.REPORT, policy_ids=[1]))
+    wait_for(service, first.id)
+    second = service.submit(JobCreate(job_type=JobType.REPORT, policy_ids=[2]))
+    wait_for(service, second.id)
+    assert first.id not in service._jobs  # trimmed from the registry
+
+    job = service.get(first.id)
+    assert (job.status, job.result) == (JobStatus.COMPLETED, {"count": 1, "results": [{"policy_id": 1}]})
+    # As does another worker process sharing the directory, which never ran the job
+    job = make_service(tmp_path).get(second.id)
+    assert (job.status, job.result["results"]) == (JobStatus.COMPLETED, [{"policy_id": 2}])
+    assert service.get("unknown") is None
+
+
+def test_store_evicts_the_oldest_records(tmp_path):
+    store = JobResultStore(str(tmp_path), max_entries=3)
+    for job_id, age in (("a", 10), ("b", 30), ("c", 20)):
+        store.save(job_id, {"job": {"id": job_id}})
+        mtime = time.time() - age
+        os.utime(os.path.join(tmp_path, f"{job_id}.json"), (mtime, mtime))
+
+    store.save("d", {"job": {"id": "d"}})
+    assert store.load("b") is None
+    store.save("e", {"job": {"id": "e"}})
+    assert store.load("c") is None
+    assert [store.load(job_id)["job"]["id"] for job_id in "ade"] == ["a", "d", "e"]
+    assert sorted(os.listdir(tmp_path)) == ["a.json", "d.json", "e.json"]
@@ -0,0 +1,94 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from app.models.schemas import PolicyCreate
+from app.services.data_service import DataService
+from app.services.observation_store import ObservationStore
+
+
+def test_out_of_range_policy_ids_are_rejected(api, app_main):
+    policy_id = app_main.data_service.get_policy_ids()[0]
+    ids = [policy_id, 2 ** 70, -2 ** 70, -1, 2 ** 40]
+    batch = {
+        "policy_ids": ids,
+        "regions": ["North"] * len(ids),
+        "metrics": ["employment_rate"] * len(ids),
+        "timestamps": [1.7e9] * len(ids),
+        "values": [50.0] * len(ids)
+    }
+    response = api("POST", "/api/observations", json=batch)
+    assert response.status_code == 200
+    assert (response.json()["accepted"], response.json()["rejected"]) == (1, 4)
+
+
+def make_store(**kwargs):
+    data_service = DataService()
+    policy = data_service.create_policy(PolicyCreate(
+        name="Observed", description="Observed policy", category="Economic", start_date=datetime(2024, 1, 1),
+        budget=1e6, target_metrics={"employment_rate": 50.0}
+    ))
+    return ObservationStore(data_service, **kwargs), policy.id
+
+
+def ingest(store: ObservationStore, policy_id: int, regions: list, timestamps, values) -> dict:
+    n = len(values)
+    return store.ingest(np.full(n, policy_id), regions, ["employment_rate"] * n, timestamps, values)
+
+
+def test_statistics_match_the_whole_history():
+    store, policy_id = make_store(ewma_alpha=0.2)
+    rng = np.random.default_rng(4)
+    history = {"North": [], "South": []}
+    for batch in range(3):
+        regions = rng.choice(list(history), 40).tolist()
+        timestamps = batch * 1000 + rng.permutation(40).astype(float)  # in time order only across batches
+        values = rng.normal(50, 5, 40)
+        ingest(store, policy_id, regions, timestamps, values)
+        for region, timestamp, value in zip(regions, timestamps, values):
+            history[region].append((timestamp, value))
+
+    series = {item["region"]: item for item in store.series(policy_id)}
+    for region, points in history.items():
+        values = np.array([value for _, value in sorted(points)])
+        ewma = values[0]
+        for value in values[1:]:
+            ewma = 0.2 * value + 0.8 * ewma
+        assert series[region]["count"] == len(values)
+        assert series[region]["mean"] == pytest.approx(values.mean(), abs=1e-4)
+        assert series[region]["std"] == pytest.approx(values.std(ddof=1), abs=1e-4)
+        assert series[region]["ewma"] == pytest.approx(ewma, abs=1e-4)
+        assert series[region]["target"] == 50.0
+
+
+def test_outliers_and_leaving_the_target_are_flagged():
+    store, policy_id = make_store(min_count=5, z_threshold=3.0, target_tolerance=0.25)
+    steady = 50 + np.tile([-1.0, 1.0], 10)
+    assert ingest(store, policy_id, ["North"] * 20, np.arange(20.0), steady)["anomaly_count"] == 0
+
+    result = ingest(store, policy_id, ["North"], [20.0], [500.0])
+    assert sorted(anomaly["kind"] for anomaly in result["anomalies"]) == ["off_target", "outlier"]
+    outlier = next(anomaly for anomaly in result["anomalies"] if anomaly["kind"] == "outlier")
+    assert (outlier["policy_id"], outlier["value"], outlier["expected"]) == (policy_id, 500.0, 50.0)
+
+    # Off-target is flagged on leaving the band, not again while the series stays out of it
+    result = ingest(store, policy_id, ["North"], [21.0], [200.0])
+    assert [anomaly["kind"] for anomaly in result["anomalies"]] == []
+    assert store.series(policy_id)[0]["off_target"]
+
+
+def test_too_many_names_leave_the_vocabularies_unchanged():
+    store, policy_id = make_store()
+    n = 65536 + 1
+    regions = [f"region-{i}" for i in range(n)]
+    with pytest.raises(ValueError):
+        ingest(store, policy_id, regions, np.zeros(n), np.ones(n))
+    assert len(store.regions) == len(store.metric_names) == store.size == 0
+
+    # Names on rejected rows are never added
+    result = store.ingest(np.full(n, 10 ** 9), regions, ["employment_rate"] * n, np.zeros(n), np.ones(n))
+    assert (result["accepted"], result["rejected"], len(store.regions)) == (0, n, 0)
+
+    assert ingest(store, policy_id, ["North"], [0.0], [1.0])["accepted"] == 1
+    assert store.regions.names == ["North"]
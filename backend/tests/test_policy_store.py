@@ -0,0 +1,106 @@
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app.models.schemas import Policy, PolicyStatus
+from app.services.policy_store import PolicyTable
+
+CATEGORIES = ["Healthcare", "Education", "Infrastructure"]
+METRICS = ["employment_rate", "gdp_growth", "literacy_rate", "air_quality"]
+
+
+def make_policy(policy_id: int, rng: random.Random, **fields) -> Policy:
+    start = datetime(2024, 1, 1) + timedelta(days=rng.randrange(365), seconds=rng.randrange(86400))
+    values = dict(
+        id=policy_id,
+        name=f"Policy {policy_id}",
+        description=rng.choice(["Improve outcomes", "Ünïcode — description", ""]),
+        category=rng.choice(CATEGORIES),
+        start_date=start,
+        end_date=start + timedelta(days=rng.randrange(30, 700)) if rng.random() < 0.7 else None,
+        budget=round(rng.uniform(1e5, 5e6), 2),
+        target_metrics={name: round(rng.uniform(0, 100), 3) for name in rng.sample(METRICS, rng.randrange(len(METRICS)))},
+        status=rng.choice(list(PolicyStatus)),
+        created_at=start - timedelta(days=30),
+        updated_at=start + timedelta(days=1)
+    )
+    values.update(fields)
+    return Policy(**values)
+
+
+def as_dict(policy) -> dict:
+    data = policy.model_dump()
+    data["status"] = PolicyStatus(data["status"])
+    return data
+
+
+def contents(table: PolicyTable) -> list:
+    """The table's live policies as dicts, in row order"""
+    return [as_dict(record.to_policy()) for record in table.records(table.alive_rows())]
+
+
+def test_append_update_delete_round_trip():
+    rng = random.Random(1)
+    policies = [make_policy(i, rng) for i in range(1, 51)]
+    table = PolicyTable(capacity=4)
+    for policy in policies:
+        table.append(policy)
+
+    policies[10] = make_policy(11, rng, target_metrics={"new_metric": 1.5})
+    table.update(table.row_of[11], policies[10])
+    assert table.delete(20) is not None
+    assert table.delete(999) is None
+    expected = [as_dict(p) for p in policies if p.id != 20]
+
+    assert len(table) == 49
+    assert contents(table) == expected
+    assert table.record(table.row_of[11]).target_metrics == {"new_metric": 1.5}
+    copy = table.copy()
+    assert contents(copy) == expected
+    assert copy.size == 49 and list(copy.row_of) == [p["id"] for p in expected]
+
+
+def test_merged_matches_applying_changes_one_by_one():
+    rng = random.Random(2)
+    for trial in range(20):
+        table = PolicyTable()
+        expected = {}
+        for i in range(1, rng.randrange(1, 40)):
+            policy = make_policy(i, rng)
+            table.append(policy)
+            expected[i] = as_dict(policy)
+        for policy_id in rng.sample(sorted(expected), rng.randrange(len(expected) + 1) // 3):
+            table.delete(policy_id)
+            del expected[policy_id]
+
+        changes = PolicyTable()
+        changed_ids = rng.sample(sorted(expected), rng.randrange(len(expected) + 1) // 2) + [100 + trial, 200 + trial]
+        for policy_id in changed_ids:
+            policy = make_policy(policy_id, rng, category=rng.choice(CATEGORIES + ["Environment"]))
+            if rng.random() < 0.3:
+                policy = policy.model_copy(update={"target_metrics": {f"metric_{trial}": 2.0}})
+            changes.append(policy)
+        remaining = [policy_id for policy_id in expected if policy_id not in changed_ids]
+        deleted_ids = rng.sample(remaining, len(remaining) // 4) + [999]
+
+        merged = table.merged(changes, deleted_ids)
+
+        order = [policy_id for policy_id in expected if policy_id not in deleted_ids]
+        order += [policy_id for policy_id in changed_ids if policy_id not in expected]
+        for policy_id in changed_ids:
+            expected[policy_id] = as_dict(changes.record(changes.row_of[policy_id]).to_policy())
+        assert contents(merged) == [expected[policy_id] for policy_id in order]
+        assert {policy_id: row for row, policy_id in enumerate(order)} == merged.row_of
+        # The source tables are left as they were
+        assert np.isin(changed_ids[-2:], table.ids[:table.size]).sum() == 0
+
+
+def test_merged_with_no_changes_is_a_compacted_copy():
+    rng = random.Random(3)
+    table = PolicyTable()
+    for i in range(1, 6):
+        table.append(make_policy(i, rng))
+    table.delete(3)
+    assert contents(table.merged(PolicyTable(capacity=1), [])) == contents(table)
+    assert contents(table.merged(PolicyTable(capacity=1), [1, 2, 4, 5])) == []
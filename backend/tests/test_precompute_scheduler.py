@@ -0,0 +1,62 @@
+import time
+from datetime import datetime
+
+from app.models.schemas import PolicyCreate
+from app.services.analytics_cache import AnalyticsCache
+from app.services.data_service import DataService
+from app.services.feature_store import RiskFeatureStore
+from app.services.impact_analyzer import ImpactAnalyzer
+from app.services.precompute_scheduler import PrecomputeScheduler
+from app.services.recommendation_engine import RecommendationEngine
+from app.services.report_generator import ReportGenerator
+from app.services.risk_predictor import RiskPredictor
+
+
+def make_scheduler(trained_predictor: RiskPredictor) -> PrecomputeScheduler:
+    data_service = DataService()
+    predictor = RiskPredictor(load_model=False)
+    predictor.use_model(trained_predictor.attribution, trained_predictor.scaler, trained_predictor.model_metadata)
+    predictor.feature_store = RiskFeatureStore(data_service, predictor.scaler)
+    return PrecomputeScheduler(
+        data_service, ImpactAnalyzer(), predictor, RecommendationEngine(), ReportGenerator(), AnalyticsCache(),
+        max_policies_per_second=100000, poll_interval=0.05
+    )
+
+
+def new_policy(name: str, **fields) -> PolicyCreate:
+    values = dict(name=name, description=f"{name} description", category="Education",
+                  start_date=datetime(2024, 1, 1), budget=500000.0, target_metrics={"literacy_rate": 2.0})
+    values.update(fields)
+    return PolicyCreate(**values)
+
+
+def wait_until(condition, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def warmed(scheduler: PrecomputeScheduler, policy_id: int) -> bool:
+    version = scheduler.data_service.get_policy_version(policy_id)
+    return scheduler.cache.get("report", policy_id, version) is not None
+
+
+def test_a_failing_policy_does_not_stop_warming(trained_predictor):
+    scheduler = make_scheduler(trained_predictor)
+    data_service = scheduler.data_service
+    scheduler.start()
+    try:
+        # No target metrics makes the impact insights fail; it shares a batch with a good policy
+        failing = data_service.create_policy(new_policy("No metrics", target_metrics={}))
+        good = data_service.create_policy(new_policy("Good"))
+        wait_until(lambda: scheduler.status()["pending_policies"] == 0 and scheduler.failed_policies == 1)
+        assert warmed(scheduler, good.id) and not warmed(scheduler, failing.id)
+
+        # The loop is still running and warms later changes
+        later = data_service.create_policy(new_policy("Later"))
+        wait_until(lambda: warmed(scheduler, later.id))
+        assert scheduler.status()["pending_policies"] == 0
+        assert scheduler.status()["failed_policies"] == 1
+    finally:
+        scheduler.stop()
@@ -0,0 +1,53 @@
+import sys
+import time
+
+from app.services.profiler import RequestProfiler
+
+TOKEN = "profile-secret"
+
+
+def wait_for_profile(profiler: RequestProfiler, profile_id: str, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while profiler.get(profile_id) is None:
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+    return profiler.get(profile_id)
+
+
+def test_end_does_not_wait_for_the_sampler():
+    profiler = RequestProfiler(admin_token=TOKEN, interval=0.5)
+    profile, sampler = profiler.begin("GET", "/slow", sys._getframe())
+    assert profiler.begin("GET", "/other", sys._getframe()) is None  # one capture at a time
+
+    started = time.perf_counter()
+    profiler.end(profile, sampler)
+    assert time.perf_counter() - started < 0.1  # not a join on a 0.5s sampling interval
+    sampler.join(5)
+    assert wait_for_profile(profiler, profile.id).duration_ms > 0
+    session = profiler.begin("GET", "/next", sys._getframe())
+    assert session is not None
+    profiler.end(*session)
+    session[1].join(5)
+
+
+def test_profiles_are_captured_and_served_to_admins(api, app_main, monkeypatch):
+    monkeypatch.setattr(app_main.request_profiler, "admin_token", TOKEN)
+
+    for headers in ({}, {"X-Admin-Token": "wrong"}):
+        assert api("GET", "/api/admin/profiles", headers=headers).status_code == 403
+    assert "x-profile-id" not in api("GET", "/api/policies", headers={"X-Profile-Token": "wrong"}).headers
+
+    response = api("GET", "/api/policies", headers={"X-Profile-Token": TOKEN})
+    assert response.status_code == 200
+    profile_id = response.headers["x-profile-id"]
+    wait_for_profile(app_main.request_profiler, profile_id)
+
+    admin = {"X-Admin-Token": TOKEN}
+    listed = api("GET", "/api/admin/profiles", headers=admin).json()
+    assert listed[0]["id"] == profile_id
+    assert (listed[0]["path"], listed[0]["route"], listed[0]["status"]) == ("/api/policies", "/api/policies", 200)
+    assert api("GET", f"/api/admin/profiles/{profile_id}", headers=admin).json()["profiles"][0]["type"] == "sampled"
+    collapsed = api("GET", f"/api/admin/profiles/{profile_id}?format=collapsed", headers=admin)
+    assert collapsed.headers["content-type"].startswith("text/plain")
+    assert api("GET", f"/api/admin/profiles/{profile_id}").status_code == 403
+    assert api("GET", "/api/admin/profiles/unknown", headers=admin).status_code == 404
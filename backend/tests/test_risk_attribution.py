@@ -0,0 +1,37 @@
+import warnings
+
+import numpy as np
+
+from app.services.risk_attribution import ForestAttribution
+from app.services.risk_predictor import RISK_LEVELS
+
+
+def samples(n: int, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).normal(0, 1.5, (n, 5))
+
+
+def test_traversal_matches_the_forest(trained_predictor):
+    model, attribution = trained_predictor.model, trained_predictor.attribution
+    X = samples(500)
+    leaves = attribution.leaves(X)
+    assert np.array_equal(leaves, attribution._leaves_by_tree(X.astype(np.float32)))
+    np.testing.assert_allclose(attribution.predict_proba(leaves), model.predict_proba(X), atol=1e-12)
+
+
+def test_bias_plus_contributions_is_the_predicted_severity(trained_predictor):
+    attribution = trained_predictor.attribution
+    X = samples(200, seed=1)
+    leaves = attribution.leaves(X)
+    severity = attribution.predict_proba(leaves) @ (attribution.classes / (len(RISK_LEVELS) - 1))
+    np.testing.assert_allclose(attribution.bias + attribution.contributions(leaves).sum(axis=1), severity, atol=1e-12)
+
+
+def test_loads_from_stored_arrays_without_warnings(trained_predictor):
+    arrays = trained_predictor.attribution.arrays()
+    arrays["bias"] = arrays["bias"].reshape(1)  # as a one-element array read back from disk
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        loaded = ForestAttribution.from_arrays(arrays)
+    assert loaded.bias == trained_predictor.attribution.bias
+    X = samples(50, seed=2)
+    assert np.array_equal(loaded.leaves(X), trained_predictor.attribution.leaves(X))
@@ -0,0 +1,52 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from app.services.feature_store import FEATURE_NAMES
+from app.services.risk_training import LABEL_COLUMN, RiskModelTrainer, load_artifact, save_artifact
+
+CHUNK = 200
+
+
+def write_history(path: str):
+    """Three chunks of outcomes; the middle one has no critical (3) rows"""
+    rng = np.random.default_rng(5)
+    frames = []
+    for labels in ([0, 1, 2, 3], [0, 1, 2], [0, 1, 2, 3]):
+        frame = pd.DataFrame(rng.random((CHUNK, len(FEATURE_NAMES))), columns=FEATURE_NAMES)
+        frame[LABEL_COLUMN] = rng.choice(labels, CHUNK)
+        frames.append(frame)
+    pd.concat(frames).to_csv(path, index=False)
+
+
+def test_trains_by_chunk_and_versions_artifacts(tmp_path):
+    data = os.path.join(tmp_path, "history.csv")
+    write_history(data)
+    trainer = RiskModelTrainer(
+        chunk_size=CHUNK, trees_per_chunk=3, max_depth=4, min_samples_leaf=2, holdout_fraction=0.1, n_jobs=1
+    )
+    model, scaler, metadata = trainer.train(data)
+
+    assert metadata["chunks"] == 3
+    assert model.n_estimators == len(model.estimators_) == 3 * 3 == metadata["n_estimators"]
+    assert model.classes_.tolist() == metadata["classes"] == [0, 1, 2, 3]
+    # Every tree, including those fitted on the chunk without class 3, predicts all four classes
+    assert all(estimator.tree_.value.shape[2] == 4 for estimator in model.estimators_)
+    assert metadata["rows"] == 3 * CHUNK
+    assert metadata["trained_rows"] + metadata["holdout_rows"] == 3 * CHUNK
+    assert model.predict_proba(scaler.transform(np.random.default_rng(0).random((5, len(FEATURE_NAMES))))).shape == (5, 4)
+
+    output = os.path.join(tmp_path, "models")
+    first = save_artifact(model, scaler, metadata, output)
+    second = save_artifact(model, scaler, {**metadata, "note": "retrained"}, output)
+    assert (os.path.basename(first), os.path.basename(second)) == ("v1", "v2")
+    assert sorted(os.listdir(output)) == ["v1", "v2"]  # no staging directories left behind
+
+    loaded, loaded_scaler, loaded_metadata = load_artifact(output)
+    assert (loaded_metadata["version"], loaded_metadata["note"]) == (2, "retrained")
+    assert len(loaded_metadata["sha256"]) == 64
+    X = scaler.transform(np.random.default_rng(1).random((20, len(FEATURE_NAMES))))
+    np.testing.assert_array_equal(loaded.predict_proba(X), model.predict_proba(X))
+    np.testing.assert_array_equal(loaded_scaler.mean_, scaler.mean_)
+    assert load_artifact(first)[2]["version"] == 1
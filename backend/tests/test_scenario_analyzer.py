@@ -0,0 +1,40 @@
+from datetime import datetime
+
+from app.models.schemas import PolicyCreate
+
+
+def test_sweep_scores_every_combination(api, app_main):
+    policy_id = app_main.data_service.get_policy_ids()[0]
+    grid = {"budget_multipliers": [0.5, 1.0, 2.0], "end_date_shift_days": [-30, 0, 30], "metric_target_multipliers": [1.0, 1.5]}
+    response = api("POST", f"/api/policies/{policy_id}/scenarios", json=grid)
+    assert response.status_code == 200
+    sweep = response.json()
+    assert sweep["scenario_count"] == len(sweep["scenarios"]) == 18
+    first = sweep["scenarios"][0]
+    assert (first["budget_multiplier"], first["end_date_shift_days"], first["metric_target_multiplier"]) == (0.5, -30, 1.0)
+
+
+def test_sweep_rejects_out_of_range_grids(api, app_main):
+    policy_id = app_main.data_service.get_policy_ids()[0]
+    url = f"/api/policies/{policy_id}/scenarios"
+    assert api("POST", url, json={"end_date_shift_days": [10 ** 7]}).status_code == 422
+    assert api("POST", url, json={"end_date_shift_days": [0, -36501]}).status_code == 422
+    assert api("POST", url, json={"end_date_shift_days": []}).status_code == 422
+    assert api("POST", url, json={"budget_multipliers": [1.0, -0.5]}).status_code == 422
+    assert api("POST", url, json={"metric_target_multipliers": [-1.0]}).status_code == 422
+    assert api("POST", url, json={"budget_multipliers": [0.0], "metric_target_multipliers": [0.0]}).status_code == 200
+
+    too_many = int(app_main.scenario_analyzer.max_scenarios ** 0.5) + 1
+    grid = {"budget_multipliers": [1.0 + i for i in range(too_many)], "metric_target_multipliers": [1.0 + i for i in range(too_many)]}
+    assert api("POST", url, json=grid).status_code == 400
+    assert api("POST", "/api/policies/999999999/scenarios", json={}).status_code == 404
+
+
+def test_sweep_rejects_shifts_past_the_last_representable_date(api, app_main):
+    record = app_main.data_service.create_policy(PolicyCreate(
+        name="Far future", description="Ends late", category="Healthcare",
+        start_date=datetime(2024, 1, 1), end_date=datetime(9990, 1, 1), budget=100000.0
+    ))
+    url = f"/api/policies/{record.id}/scenarios"
+    assert api("POST", url, json={"end_date_shift_days": [36500]}).status_code == 400
+    assert api("POST", url, json={"end_date_shift_days": [-36500, 0]}).status_code == 200
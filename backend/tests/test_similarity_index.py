@@ -0,0 +1,70 @@
+import numpy as np
+
+from app.models.schemas import PolicyCreate
+from app.services.data_service import DataService
+from app.services.feature_store import RiskFeatureStore
+from app.services.policy_store import PolicyTable
+from app.services.similarity_index import SimilarityIndex
+from benchmarks.generator import generate_portfolio, to_table
+
+K = 5
+
+
+def brute_force(index: SimilarityIndex, policy_id: int) -> list:
+    """The K nearest other policies by scanning every live policy's features"""
+    store, table = index.feature_store, index.data_service.table
+    rows = table.alive_rows()
+    n_features = store.scaled.shape[1]
+    vectors = np.zeros((len(rows), n_features + index._category_slots))
+    vectors[:, :n_features] = store.scaled[rows]
+    vectors[np.arange(len(rows)), n_features + table.category[rows]] = index.category_weight
+    ids = table.ids[rows]
+    distances = np.linalg.norm(vectors - vectors[ids == policy_id], axis=1)
+    order = [i for i in np.argsort(distances, kind="stable").tolist() if ids[i] != policy_id][:K]
+    return [(int(ids[i]), float(distances[i])) for i in order]
+
+
+def assert_matches_brute_force(index: SimilarityIndex):
+    policy_ids = index.data_service.get_policy_ids()
+    for policy_id, found in zip(policy_ids, index.similar(policy_ids, k=K)):
+        expected = brute_force(index, policy_id)
+        np.testing.assert_allclose([d for _, d in found], [d for _, d in expected], atol=1e-5)
+        assert [i for i, _ in found] == [i for i, _ in expected]
+
+
+def test_queries_match_brute_force_through_writes(trained_predictor):
+    data_service = DataService()
+    data_service.load_table(to_table(generate_portfolio(300, seed=3)))
+    feature_store = RiskFeatureStore(data_service, trained_predictor.scaler)
+    index = SimilarityIndex(data_service, feature_store, max_delta=10000, leaf_size=8)
+    assert_matches_brute_force(index)
+
+    # New policies go to the delta buffer
+    rng = np.random.default_rng(0)
+    records = data_service.table.records(data_service.table.alive_rows()[:20])
+    created = [
+        data_service.create_policy(PolicyCreate(**{
+            **record.to_policy().model_dump(include=set(PolicyCreate.model_fields)),
+            "name": f"New {i}", "budget": float(rng.uniform(1e5, 5e6))
+        })).id
+        for i, record in enumerate(records)
+    ]
+    assert len(index._delta) == 20
+    assert_matches_brute_force(index)
+
+    # Update and delete policies both in the tree and in the delta
+    changes = PolicyTable()
+    for policy_id in [1, 2, 3, 50, 120] + created[:5]:
+        policy = data_service.get_policy(policy_id).to_policy()
+        changes.append(policy.model_copy(update={"budget": float(rng.uniform(1e5, 5e6))}))
+    deleted = [10, 11, 200] + created[5:8]
+    data_service.apply_changes(changes, deleted)
+    assert index._n_stale == 8
+    assert index.similar(deleted) == [None] * len(deleted)
+    assert all(policy_id not in {i for i, _ in found} for found in index.similar([4, 60, created[10]], k=K)
+               for policy_id in deleted)
+    assert_matches_brute_force(index)
+
+    index.rebuild()
+    assert not index._delta
+    assert_matches_brute_force(index)
@@ -0,0 +1,54 @@
+import asyncio
+import threading
+import time
+
+import httpx
+
+
+def test_concurrent_identical_calls_compute_once(app_main):
+    policy = app_main.data_service.get_policy(app_main.data_service.get_policy_ids()[0])
+    calls = []
+
+    def compute(policy):
+        calls.append(policy.id)
+        time.sleep(0.1)
+        return {"policy_id": policy.id}
+
+    async def call_all():
+        return await asyncio.gather(*[app_main._analytics("single_flight_test", policy, compute) for _ in range(20)])
+
+    cache = app_main.analytics_cache
+    hits, misses = cache.hits, cache.misses
+    results = asyncio.run(call_all())
+    assert len(calls) == 1 and all(result is results[0] for result in results)
+    # One lookup per call: the shared computation does not count a second miss
+    assert (cache.hits - hits, cache.misses - misses) == (0, 20)
+
+    assert asyncio.run(app_main._analytics("single_flight_test", policy, compute)) is results[0]
+    assert len(calls) == 1 and cache.hits - hits == 1
+
+
+def test_failure_probability_requests_share_one_computation(app_main, monkeypatch):
+    policy_id = app_main.data_service.get_policy_ids()[1]
+    calls = []
+    lock = threading.Lock()
+
+    def predict(policy):
+        with lock:
+            calls.append(policy.id)
+        time.sleep(0.1)
+        return 42.0
+
+    monkeypatch.setattr(app_main.risk_predictor, "predict_failure_probability", predict)
+
+    async def request_all():
+        transport = httpx.ASGITransport(app=app_main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*[
+                client.get(f"/api/policies/{policy_id}/failure-probability") for _ in range(10)
+            ])
+
+    responses = asyncio.run(request_all())
+    assert [response.status_code for response in responses] == [200] * 10
+    assert calls == [policy_id]
+    assert responses[0].json()["failure_probability"] == 42.0
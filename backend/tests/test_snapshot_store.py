@@ -0,0 +1,92 @@
+import threading
+from datetime import datetime
+
+from app.models.schemas import PolicyCreate
+from app.services.data_service import DataService
+from app.services.feature_store import RiskFeatureStore
+from app.services.policy_store import StringColumn
+from app.services.risk_predictor import RiskPredictor
+from app.services.snapshot_store import SnapshotStore, SnapshotSync
+
+
+def make_worker(directory: str, predictor: RiskPredictor = None, **kwargs) -> SnapshotSync:
+    """The services of one worker process, synced through a snapshot directory"""
+    store = SnapshotStore(directory)
+    data_service = DataService()
+    if predictor is None:
+        # As app.main does: a worker starting after the first one takes the model from the snapshot
+        snapshot = store.load()
+        predictor = RiskPredictor(load_model=False)
+        predictor.use_model(snapshot.attribution, snapshot.scaler, snapshot.manifest["model_metadata"])
+    predictor.feature_store = RiskFeatureStore(data_service, predictor.scaler)
+    return SnapshotSync(store, data_service, predictor, poll_interval=3600, **kwargs)
+
+
+def new_policy(name: str) -> PolicyCreate:
+    return PolicyCreate(name=name, description=f"{name} description", category="Healthcare",
+                        start_date=datetime(2024, 1, 1), budget=250000.0, target_metrics={"employment_rate": 1.0})
+
+
+def policies(sync: SnapshotSync) -> list:
+    return [record.to_policy().model_dump() for record in sync.data_service.get_all_policies()]
+
+
+def test_workers_share_published_versions(tmp_path, trained_predictor):
+    first = make_worker(str(tmp_path), trained_predictor)
+    first.start()
+    second = make_worker(str(tmp_path))
+    second.start()
+    assert first.snapshot.version == second.snapshot.version == 1
+    assert policies(second) == policies(first)
+    assert isinstance(second.data_service.table.names, StringColumn)
+
+    created = first.write(lambda: first.data_service.create_policy(new_policy("Shared")))
+    assert first.snapshot.version == 2
+    assert second.refresh()
+    assert second.snapshot.manifest["changed_ids"] == [created.id]
+    assert second.data_service.get_policy(created.id).name == "Shared"
+    assert policies(second) == policies(first)
+    # The new policy's features are published with it
+    assert second.risk_predictor.predict(second.data_service.get_policy(created.id)).policy_id == created.id
+
+    # Writes from the other worker start from the latest version
+    second.write(lambda: second.data_service.create_policy(new_policy("Second")))
+    assert first.refresh()
+    assert [p["name"] for p in policies(first)[-2:]] == ["Shared", "Second"]
+
+
+def test_concurrent_writes_are_published_together(tmp_path, trained_predictor):
+    sync = make_worker(str(tmp_path), trained_predictor, batch_window=0.05)
+    sync.start()
+    results, errors = [], []
+
+    def create(i: int):
+        results.append(sync.write(lambda: sync.data_service.create_policy(new_policy(f"Batch {i}"))).id)
+
+    def fail():
+        try:
+            sync.write(lambda: 1 / 0)
+        except ZeroDivisionError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=create, args=(i,)) for i in range(8)] + [threading.Thread(target=fail)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(results)) == 8 and len(errors) == 1
+    assert sync.snapshot.version < 1 + 8  # fewer versions than writes
+    names = {record.name for record in sync.data_service.get_all_policies()}
+    assert {f"Batch {i}" for i in range(8)} <= names
+    reader = make_worker(str(tmp_path))
+    reader.start()
+    assert policies(reader) == policies(sync)
+
+
+def test_write_without_changes_publishes_nothing(tmp_path, trained_predictor):
+    sync = make_worker(str(tmp_path), trained_predictor)
+    sync.start()
+    assert sync.write(lambda: "unchanged") == "unchanged"
+    assert sync.store.current_version() == 1
+    assert isinstance(sync.data_service.table.names, StringColumn)
@@ -0,0 +1,82 @@
+import os
+
+import pandas as pd
+import pytest
+
+from app.services.data_service import DataService
+from app.services.source_sync import METRIC_PREFIX, SourceSync
+from benchmarks.generator import generate_portfolio, to_table
+from benchmarks.source_sync import changed_table, write_extract
+
+
+def make_service(size: int = 200) -> DataService:
+    table = to_table(generate_portfolio(size, seed=11))
+    # Cents, which survive the 15 significant digits XLSX writers keep
+    table.budget[:] = table.budget.round(2)
+    table.metrics[:] = table.metrics.round(2)
+    data_service = DataService()
+    data_service.load_table(table)
+    return data_service
+
+
+def policies(table) -> dict:
+    return {record.id: record.to_policy().model_dump() for record in table.records(table.alive_rows())}
+
+
+def test_resync_applies_only_the_differences(tmp_path):
+    data_service = make_service()
+    path = os.path.join(tmp_path, "policies.csv")
+    write_extract(data_service.table, path)
+    sync = SourceSync(data_service, str(tmp_path), block_bytes=4096)
+    summary = sync.sync()
+    assert (summary["rows"], summary["unchanged"], summary["rejected"]) == (200, 200, 0)
+    assert summary["inserted"] == summary["updated"] == summary["deleted"] == 0
+
+    # 20 changed rows: 16 new budgets, 2 deletes and 2 inserts
+    expected = changed_table(data_service.table, 0.1, seed=5)
+    write_extract(expected, path)
+    summary = sync.sync()
+    assert (summary["inserted"], summary["updated"], summary["deleted"], summary["unchanged"]) == (2, 16, 2, 182)
+    assert summary["parsed"] == 18  # the unchanged lines are matched without parsing
+    assert policies(data_service.table) == policies(expected)
+
+    summary = sync.sync()
+    assert (summary["parsed"], summary["unchanged"]) == (0, 200)
+
+
+def malformed_extract(data_service: DataService, directory: str, extension: str) -> pd.DataFrame:
+    """The portfolio as an extract with three malformed rows and one updated budget"""
+    csv_path = os.path.join(directory, "policies.csv")
+    write_extract(data_service.table, csv_path)
+    frame = pd.read_csv(csv_path, keep_default_na=False, na_values={"end_date": [""]}, float_precision="round_trip")
+    metric = next(column for column in frame.columns if column.startswith(METRIC_PREFIX))
+    for column in ("id", "budget", metric):
+        frame[column] = frame[column].astype(object)
+    frame.loc[0, "budget"] = "abc"
+    frame.loc[1, "id"] = "x"
+    frame.loc[2, metric] = "n/a"
+    frame.loc[3, "budget"] = 12345.5
+    if extension == ".xlsx":
+        os.remove(csv_path)
+        frame.to_excel(os.path.join(directory, "policies.xlsx"), index=False)
+    else:
+        frame.to_csv(csv_path, index=False)
+    return frame
+
+
+@pytest.mark.parametrize("extension", [".csv", ".xlsx"])
+def test_malformed_values_reject_their_rows(tmp_path, extension):
+    data_service = make_service(50)
+    before = policies(data_service.table)
+    ids = list(before)
+    malformed_extract(data_service, str(tmp_path), extension)
+
+    summary = SourceSync(data_service, str(tmp_path)).sync()
+    assert (summary["rows"], summary["rejected"], summary["updated"]) == (50, 3, 1)
+    # Rejected rows keep their policies, unless they have no usable id to tell which
+    assert summary["deleted"] == 1
+    after = policies(data_service.table)
+    assert ids[1] not in after
+    assert after[ids[0]] == before[ids[0]] and after[ids[2]] == before[ids[2]]
+    assert after[ids[3]]["budget"] == 12345.5
+    assert all(after[policy_id] == before[policy_id] for policy_id in ids[4:])
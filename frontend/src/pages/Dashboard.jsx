@@ -1,19 +1,52 @@
-import React, { useState, useEffect } from 'react'
+import React, { useState, useEffect, useRef } from 'react'
 import { Link } from 'react-router-dom'
-import { getDashboardMetrics, getPolicies } from '../services/api'
+import { getDashboardMetrics, getPolicies, subscribeDashboard } from '../services/api'
 import MetricCard from '../components/MetricCard'
 import PolicyChart from '../components/PolicyChart'
 import RecentActivities from '../components/RecentActivities'
 import './Dashboard.css'
 
+const applyPolicyDelta = (policies, upserted, deleted) => {
+  const removed = new Set([...deleted, ...upserted.map((p) => p.id)])
+  return [...policies.filter((p) => !removed.has(p.id)), ...upserted].sort((a, b) => a.id - b.id)
+}
+
 function Dashboard() {
   const [metrics, setMetrics] = useState(null)
   const [policies, setPolicies] = useState([])
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState(null)
+  const versionRef = useRef(-1)
 
   useEffect(() => {
-    loadData()
+    const unsubscribe = subscribeDashboard({
+      onSnapshot: (snapshot) => {
+        versionRef.current = snapshot.version
+        setMetrics(snapshot.metrics)
+        setPolicies(snapshot.policies)
+        setError(null)
+        setLoading(false)
+      },
+      onUpdate: (update) => {
+        // Updates queued before our snapshot are already reflected in it
+        if (update.version <= versionRef.current) return
+        versionRef.current = update.version
+        setMetrics((prev) => ({ ...prev, ...update.metrics }))
+        if (update.policies_reset) {
+          getPolicies().then((res) => setPolicies(res.data)).catch(console.error)
+          return
+        }
+        setPolicies((prev) => applyPolicyDelta(prev, update.upserted, update.deleted))
+      },
+      onError: () => {
+        // EventSource reconnects on its own; only fall back to a plain load if nothing arrived yet
+        if (versionRef.current < 0) {
+          versionRef.current = 0
+          loadData()
+        }
+      }
+    })
+    return unsubscribe
   }, [])
 
   const loadData = async () => {
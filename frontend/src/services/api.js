@@ -18,5 +18,17 @@ export const getRecommendations = (id) => api.get(`/api/policies/${id}/recommend
 export const getExecutiveReport = (id) => api.get(`/api/policies/${id}/report`)
 export const getDashboardMetrics = () => api.get('/api/dashboard/metrics')
 
+// Server-sent dashboard updates: a 'snapshot' event on connect, then 'update' deltas.
+// Returns a function that closes the stream.
+export const subscribeDashboard = ({ onSnapshot, onUpdate, onError }) => {
+  const source = new EventSource(`${API_BASE_URL}/api/dashboard/stream`)
+  source.addEventListener('snapshot', (event) => onSnapshot(JSON.parse(event.data)))
+  source.addEventListener('update', (event) => onUpdate(JSON.parse(event.data)))
+  if (onError) {
+    source.onerror = onError
+  }
+  return () => source.close()
+}
+
 
 export default api